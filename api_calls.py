@@ -1,85 +1,263 @@
 # api_calls.py
 
-import openai
-
-# Function to generate module sequence using GPT-4
-def generate_module_sequence(input_instruction, api_key):
-    # Initialize OpenAI API key
-    openai.api_key = api_key
-
-    # Elaborate prompt to guide GPT-4
-    prompt = f"""
-You are an AI assistant that converts natural language instructions into a sequence of module calls with appropriate parameters.
-
-**Available Modules:**
-
-1. **pick**:
-   - **Parameters**:
-     - container: A dictionary with the following keys:
-       - type: The type of container (e.g., "beaker", "test tube").
-       - size: Any size information if provided; otherwise, "null"
-       - content name: Name of the contents (e.g., "copper sulphate solution") if specified, otherwise "null" (**note: "null" is not the same as "empty", treat "empty" as a content name)
-       - content color: Color of the contents (e.g., "blue") if specified, otherwise "null"
-       - content volume: Volume of the content if specified, otherwise "null"
-       - landmark: A landmark if specified; otherwise "null".
-   - **Usage**:
-     
-pick(container={{type: ..., size: ..., content name: ..., content color: ..., content volume: ..., landmark: ...}})
-
-
-2. **pour**:
-   - **Parameters**:
-     - original_container: A dictionary similar to the container in pick.
-     - destination_container: A dictionary for the destination container. Use "active container" if not specified.
-     - volume: The volume to pour; use "all" if not specified.
-   - **Usage**:
-     
-pour(original_container={{...}}, conten, destination_container={{...}}, volume=...)
-
-
-3. **place**:
-   - **Parameters**:
-     - container: A dictionary similar to the container in pick.
-     - destination_location: The destination location if an (x, y, z) coordinate is provided; otherwise, "none".
-     - landmark: A landmark if specified; otherwise, "null".
-   - **Usage**: 
-     
-place(container={{...}}, destination_location=..., landmark=...)
-
-
-4. **moveto**:
-   - **Parameters**:
-     - original_container: A dictionary similar to the container in pick.
-     - destination: The destination if an (x, y, z) coordinate is provided; otherwise, "null".
-     - landmark: A landmark if specified; otherwise, "null".
-   - **Usage**:
-     
-moveto(original_container={{...}}, destination=..., landmark=...)
-
-
-**Instructions:**
-
-- **Extract as much information as possible** from the input instruction to fill the parameters.
-- **If a parameter is not specified**, use the default values as described.
-- **Do not query any external data sources**; rely solely on the input instruction.
-- **Handle negations** appropriately. If an action is negated in the instruction (e.g., "Do not pour"), do not include that module in the sequence.
-- **Sequence the modules** in the order that makes sense based on the instruction.
-
-**Now, process the following instruction and generate the module sequence:**
-
-\"\"\"{input_instruction}\"\"\"
-"""
-
-    # Call GPT-4 to generate the module sequence
-    response = openai.ChatCompletion.create(
-        model='gpt-4',
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=500,
-        temperature=0.0,
-        n=1,
-        stop=None
-    )
-
-    # Extract and return the generated module sequence
-    module_sequence = response['choices'][0]['message']['content'].strip()
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_backends
+import metrics
+import module_grammar
+import prompt_builder
+import response_cache
+
+# openai and intent_classifier (numpy) are imported on first use to keep startup fast
+
+MODEL_NAME = llm_backends.OPENAI_MODEL
+# Bump whenever the prompt in prompt_builder changes so cached responses from the old prompt are not reused
+PROMPT_VERSION = 2
+# Sections of a long instruction are sent in parallel by up to this many threads
+PROMPT_WORKERS = int(os.environ.get('RAS_PROMPT_WORKERS', 4))
+# Generated sequences are checked against module_grammar and invalid steps re-prompted (set RAS_VALIDATE_MODULES=0 to skip)
+VALIDATE_MODULES = os.environ.get('RAS_VALIDATE_MODULES', '1') != '0'
+MAX_REPAIR_ATTEMPTS = int(os.environ.get('RAS_MAX_REPAIR_ATTEMPTS', 2))
+
+# Function to read the text of a response, reporting answers cut off at max_tokens
+def response_text(response, prompt_request):
+    metrics.record_usage(response)
+    choice = response['choices'][0]
+    if choice.get('finish_reason') == 'length':
+        print(f"Error: module sequence truncated at {prompt_request.max_tokens} tokens")
+    return choice['message']['content'].strip()
+
+# Function to cap a request timeout by the time left before a time.monotonic() deadline, raising TimeoutError once it has passed
+# The cap is rounded up to whole seconds so BatchingBackend can still group requests that share a deadline
+def time_left(deadline, request_timeout=None):
+    if deadline is None:
+        return request_timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError('deadline passed before the request was sent')
+    remaining = math.ceil(remaining)
+    return remaining if request_timeout is None else min(request_timeout, remaining)
+
+# Function to send one planned request, retrying with a larger budget when the answer is cut off
+# No round trip is started after the deadline, so a caller that gave up stops holding its worker thread
+def complete(prompt_request, request_timeout=None, backend=None, api_key=None, deadline=None):
+    backend = llm_backends.get_backend(backend)
+    grammar = prompt_request.grammar if backend.supports_grammar else None
+    while True:
+        timeout = time_left(deadline, request_timeout)
+        with metrics.span('llm_request'):
+            response = backend.complete(prompt_request.messages, prompt_request.max_tokens, timeout, api_key, grammar)
+        if response['choices'][0].get('finish_reason') != 'length' or not prompt_request.grow():
+            return response_text(response, prompt_request)
+        metrics.record_usage(response)
+
+# Function to send one planned request without blocking the event loop
+async def acomplete(prompt_request, request_timeout=None, backend=None, api_key=None):
+    backend = llm_backends.get_backend(backend)
+    grammar = prompt_request.grammar if backend.supports_grammar else None
+    while True:
+        with metrics.span('llm_request'):
+            response = await backend.acomplete(prompt_request.messages, prompt_request.max_tokens, request_timeout, api_key, grammar)
+        if response['choices'][0].get('finish_reason') != 'length' or not prompt_request.grow():
+            return response_text(response, prompt_request)
+        metrics.record_usage(response)
+
+# Function to send planned requests (the sections of one instruction) and merge the answers in order
+def complete_all(requests, request_timeout=None, backend=None, api_key=None, deadline=None):
+    if len(requests) == 1:
+        return complete(requests[0], request_timeout, backend, api_key, deadline)
+    with ThreadPoolExecutor(max_workers=min(PROMPT_WORKERS, len(requests))) as executor:
+        sequences = list(executor.map(lambda prompt_request: complete(prompt_request, request_timeout, backend, api_key, deadline), requests))
+    return prompt_builder.merge_sequences(sequences)
+
+# Function to plan the repair request for an invalid step, with the steps around it as context
+def plan_step_repair(step, steps, instruction):
+    previous = steps[step.index - 1].text if step.index > 0 else None
+    following = steps[step.index + 1].text if step.index + 1 < len(steps) else None
+    return prompt_builder.plan_repair(step.text, step.errors, instruction, previous, following)
+
+# Function to check a repair answer; returns the valid call text, or None and the step to try again with
+def check_repair(answer, step):
+    repaired = module_grammar.validate_sequence(answer)
+    if repaired and repaired[0].valid:
+        return repaired[0].text, step
+    if repaired:
+        return None, module_grammar.Step(step.index, repaired[0].text, None, repaired[0].errors)
+    return None, module_grammar.Step(step.index, step.text, None, ['the answer contained no module call'])
+
+# Function to regenerate one invalid step; returns (call text or None, round trips used)
+def repair_step(step, steps, instruction, api_key, backend=None, request_timeout=None, deadline=None):
+    for attempt in range(1, MAX_REPAIR_ATTEMPTS + 1):
+        answer = complete(plan_step_repair(step, steps, instruction), request_timeout, backend, api_key, deadline)
+        text, step = check_repair(answer, step)
+        if text is not None:
+            return text, attempt
+    return None, MAX_REPAIR_ATTEMPTS
+
+async def arepair_step(step, steps, instruction, api_key, backend=None, request_timeout=None):
+    for attempt in range(1, MAX_REPAIR_ATTEMPTS + 1):
+        answer = await acomplete(plan_step_repair(step, steps, instruction), request_timeout, backend, api_key)
+        text, step = check_repair(answer, step)
+        if text is not None:
+            return text, attempt
+    return None, MAX_REPAIR_ATTEMPTS
+
+# Function to put repaired steps back in place, drop the unrepairable ones and record the outcome
+def apply_repairs(steps, invalid, repairs, generate_round_trips):
+    texts = [step.text for step in steps]
+    dropped = 0
+    for step, (text, attempts) in zip(invalid, repairs):
+        if text is None:
+            dropped += 1
+            print(f"Error: dropped step {step.index + 1} after {attempts} repair attempts: {'; '.join(step.errors)}")
+        texts[step.index] = text
+    outcome = 'failed' if dropped else 'repaired'
+    module_grammar.REPAIR_STATS.record_plan(outcome, generate_round_trips, sum(attempts for text, attempts in repairs), len(invalid), dropped)
+    return module_grammar.join_steps([text for text in texts if text is not None]), outcome
+
+# Function to validate a generated sequence and re-prompt only for the steps that fail; returns (sequence, outcome)
+def repair_module_sequence(module_sequence, instruction, api_key, backend=None, request_timeout=None, generate_round_trips=1, deadline=None):
+    steps = module_grammar.validate_sequence(module_sequence)
+    invalid = [step for step in steps if not step.valid]
+    if not invalid:
+        module_grammar.REPAIR_STATS.record_plan('valid', generate_round_trips)
+        return module_sequence, 'valid'
+    if len(invalid) == 1:
+        repairs = [repair_step(invalid[0], steps, instruction, api_key, backend, request_timeout, deadline)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(PROMPT_WORKERS, len(invalid))) as executor:
+            repairs = list(executor.map(lambda step: repair_step(step, steps, instruction, api_key, backend, request_timeout, deadline), invalid))
+    return apply_repairs(steps, invalid, repairs, generate_round_trips)
+
+async def arepair_module_sequence(module_sequence, instruction, api_key, backend=None, request_timeout=None, generate_round_trips=1):
+    steps = module_grammar.validate_sequence(module_sequence)
+    invalid = [step for step in steps if not step.valid]
+    if not invalid:
+        module_grammar.REPAIR_STATS.record_plan('valid', generate_round_trips)
+        return module_sequence, 'valid'
+    repairs = await asyncio.gather(*[arepair_step(step, steps, instruction, api_key, backend, request_timeout) for step in invalid])
+    return apply_repairs(steps, invalid, repairs, generate_round_trips)
+
+# Function to build the response cache key for an instruction and backend
+def cache_key_for(input_instruction, backend):
+    return response_cache.make_key(input_instruction, llm_backends.get_backend(backend).model, PROMPT_VERSION)
+
+# Function to generate module sequence, locally when possible and with GPT-4 otherwise
+# deadline (a time.monotonic() value) bounds every LLM round trip, repairs included; past it TimeoutError is raised
+@metrics.timed('generate_module_sequence')
+def generate_module_sequence(input_instruction, api_key, cache=None, use_cache=True, use_local=True, request_timeout=None, backend=None, deadline=None):
+    if not use_local:
+        return request_module_sequence(input_instruction, api_key, cache, use_cache, request_timeout, backend, deadline)
+
+    # Simple, high-confidence instructions are built without calling the LLM
+    import intent_classifier
+    classifier = intent_classifier.get_default_classifier()
+    module_sequence = classifier.build_module_sequence(input_instruction)
+    if module_sequence is not None:
+        metrics.INTENT_REQUESTS.inc(1, 'local')
+        return module_sequence
+    metrics.INTENT_REQUESTS.inc(1, 'llm')
+    start = time.perf_counter()
+    module_sequence = request_module_sequence(input_instruction, api_key, cache, use_cache, request_timeout, backend, deadline)
+    classifier.record_fallback(time.perf_counter() - start)
+    return module_sequence
+
+# Function to generate module sequence with an LLM backend (GPT-4 by default)
+def request_module_sequence(input_instruction, api_key, cache=None, use_cache=True, request_timeout=None, backend=None, deadline=None):
+    # Identical instructions at temperature 0 are answered from the cache
+    if use_cache:
+        cache = cache or response_cache.get_default_cache()
+        cache_key = cache_key_for(input_instruction, backend)
+        module_sequence = cache.get(cache_key)
+        if module_sequence is not None:
+            return module_sequence
+
+    # Long instructions become several requests, sent in parallel and merged in order
+    requests = prompt_builder.plan_requests(input_instruction)
+    module_sequence = complete_all(requests, request_timeout, backend, api_key, deadline)
+    outcome = 'valid'
+    if VALIDATE_MODULES:
+        module_sequence, outcome = repair_module_sequence(module_sequence, input_instruction, api_key, backend, request_timeout, len(requests), deadline)
+    # A sequence with dropped steps is returned but not cached
+    if use_cache and outcome != 'failed':
+        cache.set(cache_key, module_sequence)
     return module_sequence
+
+# Function to stream the module sequence as text deltas
+def stream_module_sequence(input_instruction, api_key, backend=None):
+    backend = llm_backends.get_backend(backend)
+    # Sections of a long instruction are streamed one after another so steps stay in order
+    requests = prompt_builder.plan_requests(input_instruction)
+    tokens = 0
+    for part, prompt_request in enumerate(requests):
+        grammar = prompt_request.grammar if backend.supports_grammar else None
+        response = backend.stream(prompt_request.messages, prompt_request.max_tokens, api_key, grammar)
+        if part:
+            yield '\n\n'
+        # Streamed responses carry no usage, so each content chunk is counted as one token
+        for chunk in response:
+            choice = chunk['choices'][0]
+            content = choice.get('delta', {}).get('content')
+            if content:
+                tokens += 1
+                yield content
+            if choice.get('finish_reason') == 'length':
+                print(f"Error: module sequence truncated at {prompt_request.max_tokens} tokens")
+    metrics.LLM_TOKENS.inc(tokens, 'completion')
+
+# Function to generate module sequence without blocking the event loop (used by async_app.py)
+@metrics.timed('generate_module_sequence')
+async def agenerate_module_sequence(input_instruction, api_key, cache=None, use_cache=True, use_local=True, request_timeout=None, backend=None):
+    start = time.perf_counter()
+    if use_local:
+        import intent_classifier
+        classifier = intent_classifier.get_default_classifier()
+        module_sequence = classifier.build_module_sequence(input_instruction)
+        if module_sequence is not None:
+            metrics.INTENT_REQUESTS.inc(1, 'local')
+            return module_sequence
+        metrics.INTENT_REQUESTS.inc(1, 'llm')
+
+    if use_cache:
+        cache = cache or response_cache.get_default_cache()
+        cache_key = cache_key_for(input_instruction, backend)
+        module_sequence = cache.get(cache_key)
+        if module_sequence is not None:
+            if use_local:
+                classifier.record_fallback(time.perf_counter() - start)
+            return module_sequence
+
+    requests = prompt_builder.plan_requests(input_instruction)
+    sequences = await asyncio.gather(*[acomplete(prompt_request, request_timeout, backend, api_key) for prompt_request in requests])
+    module_sequence = prompt_builder.merge_sequences(sequences)
+    outcome = 'valid'
+    if VALIDATE_MODULES:
+        module_sequence, outcome = await arepair_module_sequence(module_sequence, input_instruction, api_key, backend, request_timeout, len(requests))
+    if use_cache and outcome != 'failed':
+        cache.set(cache_key, module_sequence)
+    if use_local:
+        classifier.record_fallback(time.perf_counter() - start)
+    return module_sequence
+
+# Function to stream the module sequence as text deltas without blocking the event loop
+async def astream_module_sequence(input_instruction, api_key, backend=None):
+    backend = llm_backends.get_backend(backend)
+    requests = prompt_builder.plan_requests(input_instruction)
+    tokens = 0
+    for part, prompt_request in enumerate(requests):
+        if part:
+            yield '\n\n'
+        grammar = prompt_request.grammar if backend.supports_grammar else None
+        async for chunk in backend.astream(prompt_request.messages, prompt_request.max_tokens, api_key, grammar):
+            choice = chunk['choices'][0]
+            content = choice.get('delta', {}).get('content')
+            if content:
+                tokens += 1
+                yield content
+            if choice.get('finish_reason') == 'length':
+                print(f"Error: module sequence truncated at {prompt_request.max_tokens} tokens")
+    metrics.LLM_TOKENS.inc(tokens, 'completion')
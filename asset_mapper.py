@@ -1,127 +1,83 @@
-import yaml
-import re
-
-# Load containers from YAML file
-with open(r'Downloads/container_assets.yaml', 'r') as file:
-    containers_data = yaml.safe_load(file)
-containers = containers_data['containers']
-
-# Function to parse module calls
-def parse_module_call(module_call_str):
-    try:
-        # Extract the function name and parameters
-        match = re.match(r'(\w+)\((.*)\)', module_call_str.strip(), re.DOTALL)
-        if not match:
-            print(f"Error parsing module call '{module_call_str}': Invalid format")
-            return None, {}
-        func_name = match.group(1)
-        params_str = match.group(2)
-
-        # Split parameters at the top level
-        param_list = split_top_level(params_str)
-        params = {}
-        for param in param_list:
-            if '=' not in param:
-                continue
-            key, value = param.split('=', 1)
-            key = key.strip()
-            value = value.strip()
-            # Parse the value
-            parsed_value = parse_value(value)
-            params[key] = parsed_value
-        return func_name, params
-    except Exception as e:
-        print(f"Error parsing module call '{module_call_str}': {e}")
-        return None, {}
-
-# Function to split parameters at the top level
-def split_top_level(s):
-    result = []
-    bracket_level = 0
-    current = ''
-    for c in s:
-        if c == ',' and bracket_level == 0:
-            result.append(current)
-            current = ''
-        else:
-            current += c
-            if c in '([{':
-                bracket_level += 1
-            elif c in ')]}':
-                bracket_level -= 1
-    if current:
-        result.append(current)
-    return result
-
-# Function to parse individual values
-def parse_value(value_str):
-    value_str = value_str.strip()
-    # Handle dictionaries
-    if value_str.startswith('{') and value_str.endswith('}'):
-        return parse_dict(value_str)
-    # Handle tuples or lists
-    elif value_str.startswith('(') and value_str.endswith(')'):
-        return parse_tuple(value_str)
-    elif value_str.startswith('[') and value_str.endswith(']'):
-        return parse_list(value_str)
-    # Handle strings
-    elif (value_str.startswith("'") and value_str.endswith("'")) or (value_str.startswith('"') and value_str.endswith('"')):
-        return value_str[1:-1]
-    # Handle numbers
-    else:
-        try:
-            if '.' in value_str:
-                return float(value_str)
-            else:
-                return int(value_str)
-        except ValueError:
-            return value_str  # Return as string if not a number
-
-# Function to parse dictionaries
-def parse_dict(dict_str):
-    dict_str = dict_str.strip()[1:-1].strip()  # Remove braces
-    items = split_top_level(dict_str)
-    result = {}
-    for item in items:
-        if ':' not in item:
-            continue
-        key, value = item.split(':', 1)
-        key = key.strip().strip('\'"')  # Remove quotes from keys
-        value = value.strip()
-        result[key] = parse_value(value)
-    return result
-
-# Function to parse tuples
-def parse_tuple(tuple_str):
-    tuple_str = tuple_str.strip()[1:-1].strip()  # Remove parentheses
-    items = split_top_level(tuple_str)
-    return tuple(parse_value(item) for item in items)
-
-# Function to parse lists
-def parse_list(list_str):
-    list_str = list_str.strip()[1:-1].strip()  # Remove brackets
-    items = split_top_level(list_str)
-    return [parse_value(item) for item in items]
+import asset_store
+import metrics
+import spatial_index
+from container_index import ContainerIndex, ensure_index, first_match, normalize_key
+from module_parser import parse_calls
+from resolution_cache import RESOLUTION_CACHE
+
+# Lowest fuzzy score accepted when no container matches exactly
+MIN_FUZZY_SCORE = 0.6
+# Every described attribute must be at least this similar, so "sulphuric acid" does not pick the copper sulphate beaker
+MIN_ATTRIBUTE_SIMILARITY = 0.5
+# Parameter value the prompt uses for the container currently held (see module_grammar.py)
+ACTIVE_CONTAINER = 'active container'
+CONTAINER_PARAMS = ('container', 'original_container', 'destination_container')
 
 # Function to match container descriptions to actual containers
+@metrics.timed('match_container')
 def match_container(container_desc, containers):
-    # Remove fields with value 'null' or None
-    criteria = {k: v for k, v in container_desc.items() if v != 'null' and v is not None}
-    matching_containers = []
-    for container in containers:
-        match = all(
-            str(container.get(key, '')).lower() == str(value).lower()
-            for key, value in criteria.items()
-        )
-        if match:
-            matching_containers.append(container)
-    if len(matching_containers) == 1:
-        return matching_containers[0]
-    elif len(matching_containers) == 0:
+    # Only {key: value} descriptions can match; words such as "active container" are resolved by resolve_containers
+    if not isinstance(container_desc, dict):
         return None
-    else:
-        # Multiple matches; select the first one or implement additional logic
-        return matching_containers[0]
+    # A plain list gets a new index, and so a new cache token, on every call: its entries could never be hit
+    # One lookup is a linear scan; only the landmark and fuzzy fallbacks build an index
+    if not isinstance(containers, ContainerIndex):
+        container = first_match(containers, container_desc)
+        if container is not None:
+            return container
+        return find_similar_container(container_desc, ensure_index(containers))
+    # The same description recurs across steps and requests; see resolution_cache.py
+    return RESOLUTION_CACHE.resolve(container_desc, containers, lambda index: find_container(container_desc, index))
+
+# Function to resolve a description without the cache
+def find_container(container_desc, index):
+    # Fields with value 'null' or None are ignored by the index
+    # Multiple matches resolve to the first one in inventory order
+    container = index.match_one(container_desc)
+    if container is not None:
+        return container
+    return find_similar_container(container_desc, index)
+
+# Function to resolve a description that matches no container exactly: by landmark distance, then by fuzzy score
+def find_similar_container(container_desc, index):
+    container = None
+    if isinstance(container_desc, dict):
+        # "the beaker near the sink": take the closest candidate to the landmark instead of requiring the tag
+        container = nearest_to_landmark(container_desc, index)
+    if container is None:
+        # Fall back to the best fuzzy candidate ("test-tube", "light blue", ...)
+        candidates = index.fuzzy.rank(container_desc, k=1, min_similarity=MIN_ATTRIBUTE_SIMILARITY)
+        if candidates and candidates[0][0] >= MIN_FUZZY_SCORE:
+            container = candidates[0][1]
+            metrics.FUZZY_MATCHES.inc()
+    return container
+
+# Function to pick the container matching the other fields that is closest to the description's landmark
+# Containers farther than LANDMARK_MAX_DISTANCE are not near it, so the fuzzy fallback gets its turn
+def nearest_to_landmark(container_desc, index):
+    landmark = None
+    criteria = {}
+    for key, value in container_desc.items():
+        if normalize_key(key) == 'landmark':
+            landmark = value
+        else:
+            criteria[key] = value
+    point = spatial_index.landmark_position(landmark, index)
+    if point is None:
+        return None
+    nearest = index.nearest(criteria, point, 1, spatial_index.LANDMARK_MAX_DISTANCE)
+    if not nearest:
+        return None
+    metrics.LANDMARK_MATCHES.inc()
+    return nearest[0][1]
+
+# Function to return the k nearest (distance, container) pairs matching the criteria around a point
+def nearest_containers(criteria, point, containers, k=5):
+    return ensure_index(containers).nearest(criteria, point, k)
+
+# Function to return the top k (score, container) candidates for a description
+def rank_containers(container_desc, containers, k=5):
+    return ensure_index(containers).fuzzy.rank(container_desc, k)
 
 # Function to format parameters back into a string
 def format_parameters(params):
@@ -145,35 +101,92 @@ def format_parameters(params):
             formatted_params.append(f"{key}={value}")
     return ', '.join(formatted_params)
 
+# Function to check whether a parameter names the container currently held
+def is_active_container(value):
+    return isinstance(value, str) and value.strip().lower() == ACTIVE_CONTAINER
+
+# Function to return the container held after a module runs, given the one held before it
+# Containers are resolved {'id', 'aruco_id'} parameters; pick takes one and place puts it down
+def held_after(module_name, params, held):
+    if module_name == 'pick':
+        container = params.get('container')
+        if isinstance(container, dict) and container.get('id', 'unknown') != 'unknown':
+            return container
+        return None
+    if module_name == 'place':
+        return None
+    return held
+
+# Function to replace the container descriptions in a module's parameters with matched ids
+# "active container" resolves to held, the container picked up by an earlier step
+# Unmatched descriptions are appended to errors as messages when a list is given, printed otherwise
+def resolve_containers(module_name, params, containers, errors=None, held=None):
+    active = []
+    for param_name, param_value in params.items():
+        if param_name in CONTAINER_PARAMS:
+            if is_active_container(param_value):
+                active.append(param_name)
+                continue
+            matching_container = match_container(param_value, containers)
+            if matching_container:
+                params[param_name] = {
+                    'id': matching_container['id'],
+                    'aruco_id': str(matching_container['aruco_id']),
+                }
+            else:
+                unmatched_container(module_name, params, param_name, f"No matching container found for {param_name} in {module_name}", errors)
+    for param_name in active:
+        others = [params[name].get('id') for name in CONTAINER_PARAMS if name != param_name and isinstance(params.get(name), dict)]
+        if held is None:
+            unmatched_container(module_name, params, param_name, f"No container is held for {param_name} in {module_name}", errors)
+        elif held['id'] in others:
+            # pour(original_container=<held>, destination_container="active container") would pour a container into itself
+            unmatched_container(module_name, params, param_name, f"The held container {held['id']} cannot also be {param_name} in {module_name}", errors)
+        else:
+            params[param_name] = dict(held)
+    return params
+
+# Function to report a container parameter that could not be resolved and mark it unknown
+def unmatched_container(module_name, params, param_name, message, errors):
+    if errors is not None:
+        errors.append(message)
+    else:
+        print(message)
+    metrics.UNMATCHED_CONTAINERS.inc()
+    params[param_name] = {'id': 'unknown', 'aruco_id': 'unknown'}
+
 # Main processing
-def process_module_sequence(module_sequence, containers):
-    # Split the module sequence into individual module calls
-    module_calls = re.findall(r'(\w+\(.*?\))', module_sequence, re.DOTALL)
+# Calls that fail to parse and unmatched containers are appended to errors as messages when a list is given, printed otherwise
+def process_module_sequence(module_sequence, containers, errors=None):
+    # Parse the module sequence into individual module calls (failed calls are reported and skipped)
+    if errors is None:
+        module_calls = parse_calls(module_sequence)
+    else:
+        parse_errors = []
+        module_calls = parse_calls(module_sequence, errors=parse_errors)
+        errors.extend(f"Error parsing module call: {e}" for e in parse_errors)
+    # Build the container index once for the whole sequence
+    containers = ensure_index(containers)
     updated_module_sequence = ""
+    held = None
     for module_call in module_calls:
-        module_name, params = parse_module_call(module_call)
-        if not module_name:
-            continue  # Skip if parsing failed
+        module_name = module_call.name
+        params = module_call.params()
         # Process the parameters
-        for param_name, param_value in params.items():
-            if param_name in ['container', 'original_container', 'destination_container']:
-                matching_container = match_container(param_value, containers)
-                if matching_container:
-                    params[param_name] = {
-                        'id': matching_container['id'],
-                        'aruco_id': str(matching_container['aruco_id']),
-                    }
-                else:
-                    print(f"No matching container found for {param_name} in {module_name}")
-                    params[param_name] = {'id': 'unknown', 'aruco_id': 'unknown'}
+        resolve_containers(module_name, params, containers, errors=errors, held=held)
+        held = held_after(module_name, params, held)
         # Reconstruct the module call
         formatted_params = format_parameters(params)
         module_call_str = f"{module_name}({formatted_params})"
         updated_module_sequence += module_call_str + "\n\n"
     return updated_module_sequence.strip()
 
-# Sample module sequence as a string
-module_sequence = '''
+if __name__ == '__main__':
+    # Load containers from the shared asset store
+    containers = asset_store.get_store().index()
+
+    # Sample module sequence as a string
+    module_sequence = '''
 pick(container={type: "beaker", size: "null", content_name: "null", content_color: "blue", content_volume: "null", landmark: "null"})
 
 pour(original_container={type: "beaker", size: "null", content_name: "null", content_color: "blue", content_volume: "null", landmark: "null"}, destination_container={type: "beaker", size: "null", content_name: "empty", content_color: "null", content_volume: "null", landmark: "null"}, volume="half")
@@ -181,9 +194,9 @@ pour(original_container={type: "beaker", size: "null", content_name: "null", con
 place(container={type: "beaker", size: "null", content_name: "null", content_color: "blue", content_volume: "null", landmark: "null"}, destination_location=(1,2,3))
 '''
 
-# Run the processing
-final_module_sequence = process_module_sequence(module_sequence, containers)
+    # Run the processing
+    final_module_sequence = process_module_sequence(module_sequence, containers)
 
-# Output the final module sequence
-print("Final Module Sequence:")
-print(final_module_sequence)
+    # Output the final module sequence
+    print("Final Module Sequence:")
+    print(final_module_sequence)
@@ -0,0 +1,293 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+
+import metrics
+from container_index import ContainerIndex
+from models import COMPACT_CONTAINERS, compact_containers
+
+# Default inventory location, overridable with RAS_CONTAINER_ASSETS
+DEFAULT_ASSETS_PATH = os.environ.get('RAS_CONTAINER_ASSETS', os.path.join('Downloads', 'container_assets.yaml'))
+# Name for sharing one copy of the inventory between all processes on the machine (see shared_inventory.py)
+# Unset, every process loads its own copy
+SHARED_INVENTORY = os.environ.get('RAS_SHARED_INVENTORY', '')
+
+# Snapshot layout: magic, format version, source size, source mtime, source sha256, columns as JSON
+# JSON only holds data, so a tampered snapshot can at worst give wrong containers, never run code
+# (the sha256 only detects a stale snapshot: whoever can write the snapshot can write its header too)
+SNAPSHOT_MAGIC = b'RASC'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct('<4sIQQ32s')
+
+# Function to parse the inventory YAML (yaml is only imported when there is no usable snapshot)
+def parse_yaml(file):
+    import yaml
+    # Use the C YAML loader when PyYAML was built with libyaml
+    return yaml.load(file, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+# Function to hash the inventory file contents
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+# Function to convert a container list into columns
+# Columns holding only strings are stored as positions in one string table, so repeated values are read once
+def to_columns(containers):
+    keys = []
+    for container in containers:
+        for key in container:
+            if key not in keys:
+                keys.append(key)
+    columns = {}
+    absent = {}
+    strings = {}
+    string_columns = []
+    for key in keys:
+        if not isinstance(key, str):
+            # JSON would silently turn the key into a string
+            raise TypeError(f"container field {key!r} is not a string")
+        # Remember which rows did not have the field so absent fields stay absent
+        missing = [row for row, container in enumerate(containers) if key not in container]
+        if missing:
+            absent[key] = missing
+        if all(isinstance(container[key], str) for container in containers if key in container):
+            columns[key] = [strings.setdefault(container[key], len(strings)) if key in container else 0 for container in containers]
+            string_columns.append(key)
+        else:
+            columns[key] = [container.get(key) for container in containers]
+    return {'count': len(containers), 'columns': columns, 'absent': absent, 'strings': list(strings), 'string_columns': string_columns}
+
+# Function to convert columns back into a container list
+def from_columns(snapshot):
+    strings = snapshot['strings']
+    string_columns = set(snapshot['string_columns'])
+    containers = [{} for _ in range(snapshot['count'])]
+    for key, column in snapshot['columns'].items():
+        if key in string_columns:
+            column = [strings[value] for value in column]
+        for container, value in zip(containers, column):
+            container[key] = value
+        for row in snapshot['absent'].get(key, ()):
+            del containers[row][key]
+    return containers
+
+# Function to write a columnar snapshot next to the inventory file
+# Raises TypeError or ValueError for containers JSON cannot hold
+def write_snapshot(snapshot_path, containers, size, mtime_ns, digest):
+    payload = json.dumps(to_columns(containers), separators=(',', ':')).encode('utf-8')
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, size, mtime_ns, digest)
+    temp_path = f'{snapshot_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(header)
+        file.write(payload)
+    os.replace(temp_path, snapshot_path)
+
+# Function to point an existing snapshot at a touched but unmodified source file
+def write_snapshot_header(snapshot_path, size, mtime_ns, digest):
+    with open(snapshot_path, 'r+b') as file:
+        file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, size, mtime_ns, digest))
+
+# Function to read a snapshot header, or None if the snapshot is missing or stale
+def read_snapshot_header(snapshot_path):
+    try:
+        with open(snapshot_path, 'rb') as file:
+            header = file.read(SNAPSHOT_HEADER.size)
+    except OSError:
+        return None
+    if len(header) != SNAPSHOT_HEADER.size:
+        return None
+    magic, version, size, mtime_ns, digest = SNAPSHOT_HEADER.unpack(header)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        return None
+    return size, mtime_ns, digest
+
+# Function to load the containers from a snapshot
+def read_snapshot(snapshot_path):
+    with open(snapshot_path, 'rb') as file:
+        file.seek(SNAPSHOT_HEADER.size)
+        snapshot = json.loads(file.read())
+    return from_columns(snapshot)
+
+# Function to name the shared inventory of an inventory file
+def shared_name(path):
+    return f"{SHARED_INVENTORY}_{hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:12]}"
+
+# Lazily loaded, hot-reloading view of container_assets.yaml
+class AssetStore:
+    def __init__(self, path=DEFAULT_ASSETS_PATH, check_interval=1.0):
+        self.path = path
+        self.snapshot_path = path + '.snapshot'
+        self.check_interval = check_interval
+        self.version = 0
+        self._containers = None
+        self._index = None
+        self._index_version = None
+        self._stat = None
+        self._digest = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+        self._shared = None
+        self._writer = None
+        self._join_at = 0.0
+
+    # Function to return the current container list, reloading it if the file changed
+    def containers(self):
+        shared = self.shared()
+        if shared is not None:
+            return shared.containers()
+        if self._containers is None or time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+        return self._containers
+
+    # Function to return a ContainerIndex for the current inventory version
+    def index(self):
+        shared = self.shared()
+        if shared is not None:
+            return shared.index()
+        containers = self.containers()
+        with self._lock:
+            if self._index is None or self._index_version != self.version:
+                self._index = ContainerIndex(containers)
+                self._index_version = self.version
+            return self._index
+
+    # Function to join the shared inventory when RAS_SHARED_INVENTORY is set, returning a reader (None in the writer)
+    # The first process to join becomes the writer: it publishes the file at once and a watcher thread publishes every reload
+    # Until the writer has published, other processes load the file privately; every check_interval they try again,
+    # to attach or, if the writer has stopped, to take over from it
+    def shared(self):
+        if not SHARED_INVENTORY:
+            return None
+        with self._lock:
+            if self._writer is None and time.monotonic() >= self._join_at:
+                self._join_at = time.monotonic() + self.check_interval
+                self._join()
+            return self._shared
+
+    def _join(self):
+        from shared_inventory import SharedInventory, SharedInventoryWriter
+        name = shared_name(self.path)
+        try:
+            writer = SharedInventoryWriter(name)
+        except BlockingIOError:
+            if self._shared is None:
+                try:
+                    self._shared = SharedInventory(name, timeout=0)
+                    # The private copy is no longer needed
+                    self._containers = None
+                    self._index = None
+                    self._stat = None
+                except (FileNotFoundError, TimeoutError):
+                    # The writer is still loading the file
+                    pass
+                except ValueError as e:
+                    print(f"Error attaching shared inventory '{name}': {e}")
+            return
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+        self._writer = writer
+        if not self.refresh():
+            writer.publish(self._containers)
+        threading.Thread(target=self._watch, args=(writer,), daemon=True).start()
+
+    # Function to publish reloads from the writer process, whether or not it serves requests itself
+    def _watch(self, writer):
+        while self._writer is writer:
+            time.sleep(self.check_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error reloading '{self.path}': {e}")
+
+    # Function to leave the shared inventory (remove also deletes its segments, for the last process using them)
+    def close(self, remove=False):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close(remove)
+                self._writer = None
+            if self._shared is not None:
+                self._shared.close()
+                self._shared = None
+
+    # Function to reload the inventory if its mtime or contents changed
+    def refresh(self):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            stat = os.stat(self.path)
+            stat_key = (stat.st_size, stat.st_mtime_ns)
+            if self._containers is not None and stat_key == self._stat:
+                return False
+            header = read_snapshot_header(self.snapshot_path)
+            if header is not None and header[:2] == stat_key:
+                # The snapshot was compiled from this exact file, skip hashing it
+                digest = header[2]
+            else:
+                digest = file_digest(self.path)
+            if self._containers is not None and digest == self._digest:
+                # Touched but not modified
+                self._stat = stat_key
+                return False
+            containers = self._load(stat, digest, header)
+            if COMPACT_CONTAINERS:
+                # Normalize and intern the enum-like fields once, at load time
+                containers = compact_containers(containers)
+            self._apply(containers)
+            self._stat = stat_key
+            self._digest = digest
+            return True
+
+    # Function to load the snapshot, or parse the YAML and compile a new snapshot
+    @metrics.timed('load_assets')
+    def _load(self, stat, digest, header):
+        if header is not None and header[2] == digest:
+            try:
+                containers = read_snapshot(self.snapshot_path)
+                if header[:2] != (stat.st_size, stat.st_mtime_ns):
+                    write_snapshot_header(self.snapshot_path, stat.st_size, stat.st_mtime_ns, digest)
+                return containers
+            except Exception as e:
+                print(f"Error reading snapshot '{self.snapshot_path}': {e}")
+        with open(self.path, 'r') as file:
+            containers_data = parse_yaml(file)
+        containers = containers_data['containers']
+        try:
+            write_snapshot(self.snapshot_path, containers, stat.st_size, stat.st_mtime_ns, digest)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing snapshot '{self.snapshot_path}': {e}")
+        return containers
+
+    # Function to swap in a new container list, reusing unchanged containers
+    def _apply(self, containers):
+        if self._containers is not None:
+            previous = {container['id']: container for container in self._containers}
+            for position, container in enumerate(containers):
+                old = previous.get(container['id'])
+                if old is not None and old == container:
+                    containers[position] = old
+        self._containers = containers
+        self.version += 1
+        if self._writer is not None:
+            self._writer.publish(containers)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+# Function to get the shared store for an inventory file
+def get_store(path=None):
+    path = os.path.abspath(path or DEFAULT_ASSETS_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = AssetStore(path)
+        return store
+
+# Function to get the current container list from the shared store
+def load_containers(path=None):
+    return get_store(path).containers()
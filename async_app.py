@@ -0,0 +1,237 @@
+# async_app.py
+# Async (ASGI) serving mode for the routes in user_input_page.py
+# Run with: hypercorn async_app:app  (or any ASGI server)
+
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+
+import aiohttp
+import openai
+from quart import Quart, Response, render_template, request, jsonify
+from werkzeug.utils import secure_filename
+
+import api_calls
+import llm_backends
+import metrics
+import response_cache
+import streaming_pipeline
+from pdf_extraction import PDF_WORKERS, allowed_file, extract_text_from_pdf, iter_pdf_chunks
+
+app = Quart(__name__)
+
+# Configurations
+UPLOAD_FOLDER = 'uploads'
+app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+# Concurrency limits; requests beyond concurrency + queue limit get a 503
+# PDF_WORKERS comes from pdf_extraction, which owns the extraction process pool
+LLM_CONCURRENCY = int(os.environ.get('RAS_LLM_CONCURRENCY', 16))
+LLM_QUEUE_LIMIT = int(os.environ.get('RAS_LLM_QUEUE_LIMIT', 64))
+PDF_QUEUE_LIMIT = int(os.environ.get('RAS_PDF_QUEUE_LIMIT', 16))
+REQUEST_TIMEOUT = float(os.environ.get('RAS_BATCH_TIMEOUT', 60))
+BATCH_MAX_ITEMS = int(os.environ.get('RAS_BATCH_MAX_ITEMS', 100))
+# Model calls in flight across all batches; a batch is admitted through llm_limiter once, as one request
+BATCH_CONCURRENCY = int(os.environ.get('RAS_BATCH_CONCURRENCY', LLM_CONCURRENCY))
+RETRY_AFTER_SECONDS = 1
+
+# Error raised when a limiter's queue is full
+class Overloaded(Exception):
+    pass
+
+# Bounded concurrency with a bounded wait queue
+class Limiter:
+    def __init__(self, concurrency, queue_limit):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.queue_limit = queue_limit
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.semaphore.locked() and self.waiting >= self.queue_limit:
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+llm_limiter = Limiter(LLM_CONCURRENCY, LLM_QUEUE_LIMIT)
+pdf_limiter = Limiter(PDF_WORKERS, PDF_QUEUE_LIMIT)
+batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+http_session = None
+
+def overloaded_response():
+    response = jsonify({'error': 'Server is busy, try again shortly.'})
+    return response, 503, {'Retry-After': str(RETRY_AFTER_SECONDS)}
+
+@app.before_serving
+async def start_pools():
+    global http_session
+    # One pooled HTTP session for every model request
+    http_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=LLM_CONCURRENCY))
+
+@app.after_serving
+async def stop_pools():
+    await http_session.close()
+
+@app.before_request
+async def use_pooled_session():
+    openai.aiosession.set(http_session)
+
+@app.route('/')
+async def index():
+    return await render_template('UI_markup.html')
+
+@app.route('/upload', methods=['POST'])
+async def upload_file():
+    files = await request.files
+    if 'file' not in files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    file = files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    if file and allowed_file(file.filename):
+        filename = secure_filename(file.filename)
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        await file.save(file_path)
+        if request.args.get('stream'):
+            # Send page text as newline-delimited JSON while later pages are still being extracted
+            async def generate():
+                try:
+                    async with pdf_limiter.slot():
+                        chunks = iter_pdf_chunks(file_path)
+                        while True:
+                            chunk = await asyncio.to_thread(next, chunks, None)
+                            if chunk is None:
+                                break
+                            start_page, stop_page, text = chunk
+                            yield json.dumps({'start_page': start_page, 'stop_page': stop_page, 'content': text}) + '\n'
+                    yield json.dumps({'message': 'File uploaded successfully'}) + '\n'
+                except Overloaded:
+                    yield json.dumps({'error': 'Server is busy, try again shortly.'}) + '\n'
+                except Exception as e:
+                    yield json.dumps({'error': f"Error reading PDF: {str(e)}"}) + '\n'
+            return Response(generate(), mimetype='application/x-ndjson')
+        # Extract text from PDF; the pages are spread over pdf_extraction's process pool
+        try:
+            async with pdf_limiter.slot():
+                content = await asyncio.to_thread(extract_text_from_pdf, file_path)
+        except Overloaded:
+            return overloaded_response()
+        return jsonify({'message': 'File uploaded successfully', 'content': content})
+    else:
+        return jsonify({'error': 'Invalid file type'}), 400
+
+@app.route('/submit', methods=['POST'])
+async def submit_task():
+    data = await request.get_json()
+    rich_text = data.get('rich_text')
+    backend, openai_api_key, error = llm_backends.select_backend(data)
+    if error:
+        return error
+
+    if not rich_text:
+        return jsonify({'error': 'Rich-text instructions are required.'}), 400
+
+    try:
+        async with llm_limiter.slot():
+            module_sequence = await api_calls.agenerate_module_sequence(
+                input_instruction=rich_text,
+                api_key=openai_api_key,
+                request_timeout=REQUEST_TIMEOUT,
+                backend=backend
+            )
+        return jsonify({'module_sequence': module_sequence})
+    except Overloaded:
+        return overloaded_response()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/submit_batch', methods=['POST'])
+async def submit_batch():
+    data = await request.get_json()
+    instructions = data.get('instructions')
+    backend, openai_api_key, error = llm_backends.select_backend(data)
+    if error:
+        return error
+
+    if not isinstance(instructions, list) or not instructions:
+        return jsonify({'error': 'A non-empty list of instructions is required.'}), 400
+    if len(instructions) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'At most {BATCH_MAX_ITEMS} instructions per batch.'}), 400
+
+    async def generate(instruction):
+        async with batch_semaphore:
+            return await asyncio.wait_for(
+                api_calls.agenerate_module_sequence(instruction, openai_api_key, request_timeout=REQUEST_TIMEOUT, backend=backend),
+                REQUEST_TIMEOUT
+            )
+
+    # The whole batch is admitted or rejected once; its items then share batch_semaphore
+    # Identical instructions are generated once and share the result
+    tasks = {}
+    try:
+        async with llm_limiter.slot():
+            for instruction in instructions:
+                if not isinstance(instruction, str) or not instruction.strip():
+                    continue
+                key = response_cache.normalize_instruction(instruction)
+                if key not in tasks:
+                    tasks[key] = asyncio.ensure_future(generate(instruction))
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+    except Overloaded:
+        return overloaded_response()
+
+    results = []
+    for instruction in instructions:
+        if not isinstance(instruction, str) or not instruction.strip():
+            results.append({'error': 'Rich-text instructions are required.'})
+            continue
+        task = tasks[response_cache.normalize_instruction(instruction)]
+        error = task.exception()
+        if error is None:
+            results.append({'module_sequence': task.result()})
+        elif isinstance(error, asyncio.TimeoutError):
+            results.append({'error': f'Timed out after {REQUEST_TIMEOUT:g} seconds'})
+        else:
+            results.append({'error': str(error)})
+    return jsonify({'results': results})
+
+@app.route('/submit_stream', methods=['POST'])
+async def submit_task_stream():
+    data = await request.get_json()
+    rich_text = data.get('rich_text')
+    backend, openai_api_key, error = llm_backends.select_backend(data)
+    if error:
+        return error
+
+    if not rich_text:
+        return jsonify({'error': 'Rich-text instructions are required.'}), 400
+
+    # Send each resolved step as one JSON line as soon as the model finishes writing it
+    async def generate():
+        try:
+            async with llm_limiter.slot():
+                async for step in streaming_pipeline.astream_module_steps(rich_text, openai_api_key, backend=backend):
+                    yield json.dumps(step) + '\n'
+        except Overloaded:
+            yield json.dumps({'error': 'Server is busy, try again shortly.'}) + '\n'
+        except Exception as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+# Prometheus scrape endpoint with per-stage timings and pipeline counters
+@app.route('/metrics')
+async def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+if __name__ == '__main__':
+    app.run()
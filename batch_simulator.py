@@ -0,0 +1,267 @@
+import numpy as np
+
+# Pour volume modes
+POUR_HALF = 0
+POUR_ALL = 1
+POUR_AMOUNT = 2
+
+# Function to convert a position into an (x, y, z) triple, or None when it is not a coordinate
+def as_coordinate(value):
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        try:
+            return tuple(float(component) for component in value)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+# Function to convert a content volume into a float (NaN when unknown)
+def as_volume(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+# Function to turn (module_name, params) pairs into per-step operations on container rows
+# Destinations that are not (x, y, z) coordinates leave the position unchanged
+def compile_plan(modules, rows):
+    operations = []
+    for module_name, params in modules:
+        operation = None
+        if module_name in ('moveto', 'place'):
+            if module_name == 'moveto':
+                container_info = params.get('original_container')
+                destination = as_coordinate(params.get('destination'))
+            else:
+                container_info = params.get('container')
+                destination = as_coordinate(params.get('destination_location'))
+            if container_info and destination is not None:
+                row = rows.get(container_info.get('id'))
+                if row is not None:
+                    operation = ('move', row, destination)
+        elif module_name == 'pour':
+            original_container_info = params.get('original_container')
+            destination_container_info = params.get('destination_container')
+            volume = params.get('volume')
+            if original_container_info and destination_container_info:
+                orig_row = rows.get(original_container_info.get('id'))
+                dest_row = rows.get(destination_container_info.get('id'))
+                if orig_row is not None and dest_row is not None:
+                    if volume == 'half':
+                        mode, amount = POUR_HALF, 0.0
+                    elif volume == 'all':
+                        mode, amount = POUR_ALL, 0.0
+                    else:
+                        mode, amount = POUR_AMOUNT, as_volume(volume)
+                        if np.isnan(amount):
+                            amount = 0.0
+                    operation = ('pour', orig_row, dest_row, mode, amount)
+        operations.append(operation)
+    return operations
+
+# Starting inventory held as arrays indexed by container row
+class ArrayInventory:
+    def __init__(self, containers):
+        self.containers = list(containers)
+        self.ids = [container['id'] for container in self.containers]
+        self.rows = {}
+        for row, container_id in enumerate(self.ids):
+            self.rows.setdefault(container_id, row)
+        # Content names and colors are interned to small integers
+        self.strings = []
+        self.string_codes = {}
+        count = len(self.containers)
+        self.positions = np.full((count, 3), np.nan)
+        self.has_position = np.zeros(count, dtype=bool)
+        self.volumes = np.empty(count)
+        self.names = np.empty(count, dtype=np.int32)
+        self.colors = np.empty(count, dtype=np.int32)
+        for row, container in enumerate(self.containers):
+            position = as_coordinate(container.get('position'))
+            if position is not None:
+                self.positions[row] = position
+                self.has_position[row] = True
+            self.volumes[row] = as_volume(container.get('content_volume'))
+            self.names[row] = self.intern(container.get('content_name'))
+            self.colors[row] = self.intern(container.get('content_color'))
+
+    def intern(self, value):
+        code = self.string_codes.get(value)
+        if code is None:
+            code = self.string_codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    # Function to run one plan and return its trace
+    def simulate(self, modules):
+        return self.simulate_batch([modules])[0]
+
+    # Function to run many plans against this inventory in one pass
+    def simulate_batch(self, plans):
+        return BatchSimulation(self, plans).traces()
+
+# Runs several plans step by step, updating every plan's arrays together and recording only deltas
+class BatchSimulation:
+    def __init__(self, inventory, plans):
+        self.inventory = inventory
+        plan_count = len(plans)
+        compiled = [compile_plan(plan, inventory.rows) for plan in plans]
+        self.lengths = [len(operations) for operations in compiled]
+        self.module_names = [[module_name for module_name, _ in plan] for plan in plans]
+        positions = np.repeat(inventory.positions[np.newaxis], plan_count, axis=0)
+        has_position = np.repeat(inventory.has_position[np.newaxis], plan_count, axis=0)
+        volumes = np.repeat(inventory.volumes[np.newaxis], plan_count, axis=0)
+        names = np.repeat(inventory.names[np.newaxis], plan_count, axis=0)
+        colors = np.repeat(inventory.colors[np.newaxis], plan_count, axis=0)
+
+        self.moves = []
+        self.pours = []
+        for step in range(max(self.lengths, default=0)):
+            move_plans, move_rows, move_targets = [], [], []
+            pour_plans, orig_rows, dest_rows, modes, amounts = [], [], [], [], []
+            for plan, operations in enumerate(compiled):
+                if step >= len(operations) or operations[step] is None:
+                    continue
+                operation = operations[step]
+                if operation[0] == 'move':
+                    move_plans.append(plan)
+                    move_rows.append(operation[1])
+                    move_targets.append(operation[2])
+                else:
+                    pour_plans.append(plan)
+                    orig_rows.append(operation[1])
+                    dest_rows.append(operation[2])
+                    modes.append(operation[3])
+                    amounts.append(operation[4])
+
+            move = None
+            if move_plans:
+                plan_index = np.array(move_plans)
+                row_index = np.array(move_rows)
+                new_positions = np.array(move_targets)
+                move = (
+                    plan_index, row_index,
+                    positions[plan_index, row_index], has_position[plan_index, row_index], new_positions,
+                )
+                positions[plan_index, row_index] = new_positions
+                has_position[plan_index, row_index] = True
+            self.moves.append(move)
+
+            pour = None
+            if pour_plans:
+                plan_index = np.array(pour_plans)
+                orig_index = np.array(orig_rows)
+                dest_index = np.array(dest_rows)
+                mode = np.array(modes)
+                source = volumes[plan_index, orig_index]
+                transfer = np.where(mode == POUR_HALF, source / 2, np.where(mode == POUR_ALL, source, np.array(amounts)))
+                old_orig = source.copy()
+                old_dest = volumes[plan_index, dest_index]
+                old_name = names[plan_index, dest_index]
+                old_color = colors[plan_index, dest_index]
+                # Same order as future_positions.apply_module, so pouring into itself is a no-op
+                volumes[plan_index, orig_index] = old_orig - transfer
+                volumes[plan_index, dest_index] = volumes[plan_index, dest_index] + transfer
+                names[plan_index, dest_index] = names[plan_index, orig_index]
+                colors[plan_index, dest_index] = colors[plan_index, orig_index]
+                pour = (plan_index, orig_index, dest_index, old_orig, old_dest, transfer, old_name, old_color)
+            self.pours.append(pour)
+
+        self.final = (positions, has_position, volumes, names, colors)
+
+    def traces(self):
+        return [SimulationTrace(self, plan) for plan in range(len(self.lengths))]
+
+# Lazily reconstructable history of one plan
+class SimulationTrace:
+    def __init__(self, batch, plan):
+        self.batch = batch
+        self.plan = plan
+        self.inventory = batch.inventory
+        self.module_names = batch.module_names[plan]
+        self._cursor = None
+        self._cursor_step = -1
+
+    def __len__(self):
+        return len(self.module_names)
+
+    # Function to return (positions, has_position, volumes, names, colors) after the given step
+    # step -1 is the starting inventory; arrays are reused between calls, copy them to keep them
+    def state_at(self, step):
+        if step < -1 or step >= len(self):
+            raise IndexError(f"step {step} out of range for a {len(self)}-step plan")
+        if self._cursor is None:
+            inventory = self.inventory
+            self._cursor = (
+                inventory.positions.copy(), inventory.has_position.copy(), inventory.volumes.copy(),
+                inventory.names.copy(), inventory.colors.copy(),
+            )
+            self._cursor_step = -1
+        while self._cursor_step < step:
+            self._cursor_step += 1
+            self._apply(self._cursor_step, forward=True)
+        while self._cursor_step > step:
+            self._apply(self._cursor_step, forward=False)
+            self._cursor_step -= 1
+        return self._cursor
+
+    def _apply(self, step, forward):
+        positions, has_position, volumes, names, colors = self._cursor
+        move = self.batch.moves[step]
+        if move is not None:
+            mask = move[0] == self.plan
+            if mask.any():
+                rows = move[1][mask]
+                if forward:
+                    positions[rows] = move[4][mask]
+                    has_position[rows] = True
+                else:
+                    positions[rows] = move[2][mask]
+                    has_position[rows] = move[3][mask]
+        pour = self.batch.pours[step]
+        if pour is not None:
+            mask = pour[0] == self.plan
+            if mask.any():
+                orig_rows = pour[1][mask]
+                dest_rows = pour[2][mask]
+                if forward:
+                    volumes[orig_rows] = pour[3][mask] - pour[5][mask]
+                    volumes[dest_rows] = volumes[dest_rows] + pour[5][mask]
+                    names[dest_rows] = names[orig_rows]
+                    colors[dest_rows] = colors[orig_rows]
+                else:
+                    names[dest_rows] = pour[6][mask]
+                    colors[dest_rows] = pour[7][mask]
+                    volumes[dest_rows] = pour[4][mask]
+                    volumes[orig_rows] = pour[3][mask]
+
+    # Function to return {id: position} after the given step, like simulate_modules records
+    def positions_at(self, step):
+        positions, has_position, _, _, _ = self.state_at(step)
+        return {
+            container_id: tuple(positions[row]) if has_position[row] else self.inventory.containers[row].get('position')
+            for row, container_id in enumerate(self.inventory.ids)
+        }
+
+    # Function to return the final container states as dicts, like simulate_modules returns
+    def final_containers(self):
+        positions, has_position, volumes, names, colors = (array[self.plan] for array in self.batch.final)
+        strings = self.inventory.strings
+        containers_state = []
+        for row, container in enumerate(self.inventory.containers):
+            container = container.copy()
+            if has_position[row]:
+                container['position'] = tuple(positions[row])
+            if not np.isnan(volumes[row]):
+                container['content_volume'] = float(volumes[row])
+            container['content_name'] = strings[names[row]]
+            container['content_color'] = strings[colors[row]]
+            containers_state.append(container)
+        return containers_state
+
+# Function to simulate one plan; returns a SimulationTrace
+def simulate_plan(modules, containers):
+    return ArrayInventory(containers).simulate(modules)
+
+# Function to simulate many candidate plans against the same starting inventory
+def simulate_batch(plans, containers):
+    return ArrayInventory(containers).simulate_batch(plans)
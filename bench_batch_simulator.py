@@ -0,0 +1,54 @@
+import time
+import tracemalloc
+
+from batch_simulator import ArrayInventory
+from future_positions import simulate_modules
+from synthetic_inventory import make_containers, make_resolved_modules
+
+CASES = [(100, 1000), (1000, 1000), (10000, 1000), (10000, 5000)]
+BATCH_PLANS = 32
+BATCH_STEPS = 500
+
+# Function to time a call, then measure its peak traced memory in a second run
+# (tracing slows allocation-heavy code, so it is kept out of the timed run)
+def measure(function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+if __name__ == '__main__':
+    print("Single plan")
+    print(f"{'containers':>10} {'steps':>6} {'dict ms':>9} {'dict MB':>8} {'array ms':>9} {'array MB':>9} {'state_at ms':>12}")
+    for size, steps in CASES:
+        containers = make_containers(size)
+        modules = make_resolved_modules(steps, containers)
+        _, dict_s, dict_mb = measure(lambda: simulate_modules(modules, containers, collisions=[]))
+        inventory = ArrayInventory(containers)
+        trace, array_s, array_mb = measure(lambda: inventory.simulate(modules))
+        # Random access into the middle of the plan, then back towards the start
+        start = time.perf_counter()
+        trace.state_at(steps // 2)
+        trace.state_at(steps // 4)
+        state_ms = (time.perf_counter() - start) * 1e3
+        print(f"{size:>10} {steps:>6} {dict_s * 1e3:>9.1f} {dict_mb:>8.1f} {array_s * 1e3:>9.1f} {array_mb:>9.1f} {state_ms:>12.2f}")
+
+    print()
+    print(f"Batch of {BATCH_PLANS} plans x {BATCH_STEPS} steps")
+    print(f"{'containers':>10} {'dict loop ms':>13} {'batched ms':>11} {'speedup':>8}")
+    for size in [100, 1000, 10000]:
+        containers = make_containers(size)
+        plans = [make_resolved_modules(BATCH_STEPS, containers, seed=seed) for seed in range(BATCH_PLANS)]
+        start = time.perf_counter()
+        for modules in plans:
+            simulate_modules(modules, containers, collisions=[])
+        loop_s = time.perf_counter() - start
+        inventory = ArrayInventory(containers)
+        start = time.perf_counter()
+        inventory.simulate_batch(plans)
+        batch_s = time.perf_counter() - start
+        print(f"{size:>10} {loop_s * 1e3:>13.1f} {batch_s * 1e3:>11.1f} {loop_s / batch_s:>7.0f}x")
@@ -0,0 +1,55 @@
+import contextlib
+import io
+import time
+import tracemalloc
+
+from asset_mapper import process_module_sequence
+from bt_compiler import compile_module_sequence
+from container_index import ContainerIndex
+from future_positions import parse_module_sequence, simulate_modules
+from synthetic_inventory import make_containers, make_module_sequence
+
+INVENTORY_SIZE = 1000
+PLAN_STEPS = [100, 1000, 10000]
+
+# File-like object that only counts what is written to it
+class NullWriter:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+
+# Function to run the old route: resolve to a string, re-parse it, then simulate
+def round_trip(module_sequence, index):
+    resolved = process_module_sequence(module_sequence, index)
+    modules = parse_module_sequence(resolved)
+    return simulate_modules(modules, index.containers)
+
+# Function to time a call, then measure its peak traced memory in a second run
+def measure(function):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+if __name__ == '__main__':
+    index = ContainerIndex(make_containers(INVENTORY_SIZE))
+    # Build the lazy indexes outside the timed runs
+    index.postings
+    index.fuzzy
+    print(f"{INVENTORY_SIZE} containers")
+    print(f"{'steps':>6} {'round trip ms':>14} {'round trip MB':>14} {'compile ms':>11} {'compile MB':>11} {'YAML KB':>8}")
+    for steps in PLAN_STEPS:
+        module_sequence = make_module_sequence(steps)
+        # Keep the old route's progress prints out of the way
+        with io.StringIO() as sink:
+            with contextlib.redirect_stdout(sink):
+                trip_s, trip_mb = measure(lambda: round_trip(module_sequence, index))
+                writer = NullWriter()
+                compile_s, compile_mb = measure(lambda: compile_module_sequence(module_sequence, index, writer))
+        print(f"{steps:>6} {trip_s * 1e3:>14.1f} {trip_mb:>14.1f} {compile_s * 1e3:>11.1f} {compile_mb:>11.1f} {writer.size / 1024:>8.0f}")
@@ -0,0 +1,38 @@
+import time
+
+from container_index import ContainerIndex, normalize_value
+from synthetic_inventory import make_containers, make_queries
+
+INVENTORY_SIZES = [10, 100, 1000, 10000, 100000]
+QUERY_COUNT = 200
+
+# Function to match containers with the original linear scan
+def linear_match(container_desc, containers):
+    criteria = {k: v for k, v in container_desc.items() if v != 'null' and v is not None}
+    return [
+        container for container in containers
+        if all(normalize_value(container.get(key, '')) == normalize_value(value) for key, value in criteria.items())
+    ]
+
+# Function to time the average latency of a lookup function in microseconds
+def time_per_query(lookup, queries):
+    start = time.perf_counter()
+    for query in queries:
+        lookup(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+if __name__ == '__main__':
+    queries = make_queries(QUERY_COUNT)
+    print(f"{'containers':>10} {'build ms':>10} {'linear us':>12} {'index us':>10} {'speedup':>8}")
+    for size in INVENTORY_SIZES:
+        containers = make_containers(size)
+        start = time.perf_counter()
+        index = ContainerIndex(containers)
+        index.postings
+        build_ms = (time.perf_counter() - start) * 1e3
+        # Sanity check: both paths must return the same containers
+        for query in queries[:20]:
+            assert linear_match(query, containers) == index.match(query)
+        linear_us = time_per_query(lambda query: linear_match(query, containers), queries)
+        index_us = time_per_query(index.match, queries)
+        print(f"{size:>10} {build_ms:>10.2f} {linear_us:>12.1f} {index_us:>10.1f} {linear_us / index_us:>7.0f}x")
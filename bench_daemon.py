@@ -0,0 +1,61 @@
+# Compares one-shot command line runs with calls to a warm pipeline daemon
+# Run from the directory that holds Downloads/container_assets.yaml
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pipeline_client import PipelineClient, is_running, start_daemon
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RUNS = 10
+WARM_CALLS = 200
+MODULE_SEQUENCE = '''pick(container={type: "beaker", content_color: "blue"})
+
+pour(original_container={type: "beaker", content_color: "blue"}, destination_container={type: "beaker", content_name: "empty"}, volume="half")
+
+place(container={type: "beaker", content_color: "blue"}, destination_location=(1,2,3))
+'''
+
+# Function to time a command line run in milliseconds
+def time_command(command, env):
+    start = time.perf_counter()
+    subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1e3
+
+def summary(samples):
+    return f"median {statistics.median(samples):8.1f} ms   min {min(samples):8.1f} ms"
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as scratch:
+        socket_path = os.path.join(scratch, 'bench.sock')
+        sequence_path = os.path.join(scratch, 'sequence.txt')
+        with open(sequence_path, 'w') as file:
+            file.write(MODULE_SEQUENCE)
+        env = dict(os.environ, RAS_DAEMON_SOCKET=socket_path)
+
+        cold = [time_command([sys.executable, os.path.join(HERE, 'bt_compiler.py'), sequence_path], env) for _ in range(RUNS)]
+        print(f"one-shot bt_compiler.py          {summary(cold)}")
+
+        start = time.perf_counter()
+        start_daemon(socket_path)
+        print(f"daemon start until ready         {(time.perf_counter() - start) * 1e3:8.1f} ms")
+
+        client_runs = [time_command([sys.executable, os.path.join(HERE, 'pipeline_client.py'), 'compile', sequence_path], env) for _ in range(RUNS)]
+        print(f"pipeline_client.py compile       {summary(client_runs)}")
+
+        with PipelineClient(socket_path) as client:
+            samples = []
+            for _ in range(WARM_CALLS):
+                start = time.perf_counter()
+                client.call('compile', module_sequence=MODULE_SEQUENCE)
+                samples.append((time.perf_counter() - start) * 1e3)
+            print(f"warm call on an open connection  {summary(samples)}")
+            client.call('shutdown')
+
+        deadline = time.monotonic() + 5
+        while is_running(socket_path) and time.monotonic() < deadline:
+            time.sleep(0.05)
@@ -0,0 +1,59 @@
+import random
+import time
+
+from fuzzy_matcher import FuzzyIndex, normalize_text, similarity, trigrams
+from synthetic_inventory import make_containers, make_queries
+
+INVENTORY_SIZES = [1000, 10000, 100000]
+QUERY_COUNT = 200
+LINEAR_QUERY_COUNT = 10
+
+# Function to garble queries the way the LLM does ("test-tube", "light blue", "Beakers")
+def perturb(queries, seed=4):
+    rng = random.Random(seed)
+    perturbed = []
+    for query in queries:
+        query = dict(query)
+        query['type'] = rng.choice([query['type'].replace(' ', '-'), query['type'] + 's', query['type'].title()])
+        if query['content_color'] != 'null':
+            query['content_color'] = rng.choice(['light ', 'dark ', '']) + query['content_color']
+        perturbed.append(query)
+    return perturbed
+
+# Function to rank containers by scoring every one of them (the baseline)
+def linear_rank(index, criteria, k=5):
+    query = [(key, trigrams(normalize_text(value))) for key, value in criteria.items()
+             if value != 'null' and value is not None and key in index.value_grams]
+    total_weight = sum(index.weights[key] for key, _ in query)
+    scored = []
+    for position, container in enumerate(index.containers):
+        score = 0.0
+        for key, grams in query:
+            value_score = similarity(grams, trigrams(normalize_text(container.get(key, ''))))
+            if value_score >= 0.3:
+                score += index.weights[key] / total_weight * value_score
+        if score > 0:
+            scored.append((-score, position))
+    scored.sort()
+    return [(round(-score, 4), index.containers[position]) for score, position in scored[:k]]
+
+if __name__ == '__main__':
+    queries = perturb(make_queries(QUERY_COUNT))
+    print(f"{'containers':>10} {'build ms':>10} {'linear us':>12} {'index us':>10} {'speedup':>8}")
+    for size in INVENTORY_SIZES:
+        containers = make_containers(size)
+        start = time.perf_counter()
+        index = FuzzyIndex(containers)
+        build_ms = (time.perf_counter() - start) * 1e3
+        # Sanity check: both paths must give the same scores
+        for query in queries[:LINEAR_QUERY_COUNT]:
+            assert [score for score, _ in linear_rank(index, query)] == [score for score, _ in index.rank(query)]
+        start = time.perf_counter()
+        for query in queries[:LINEAR_QUERY_COUNT]:
+            linear_rank(index, query)
+        linear_us = (time.perf_counter() - start) / LINEAR_QUERY_COUNT * 1e6
+        start = time.perf_counter()
+        for query in queries:
+            index.rank(query)
+        index_us = (time.perf_counter() - start) / len(queries) * 1e6
+        print(f"{size:>10} {build_ms:>10.1f} {linear_us:>12.0f} {index_us:>10.1f} {linear_us / index_us:>7.0f}x")
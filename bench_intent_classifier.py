@@ -0,0 +1,35 @@
+import time
+
+import openai
+
+import api_calls
+import fake_llm_server
+import intent_classifier
+
+INSTRUCTIONS = [
+    'Pick the beaker containing the blue solution and pour half of it into the empty beaker. Then place the beaker at (1,2,3).',
+    'Grab the small flask.',
+    'Decant 20 ml from the red vial into the empty test tube.',
+    'Pick up the green flask, then move it to (0.5, 0.2, 0.1).',
+    'Navigate to (1, 1, 0) with the blue beaker.',
+    'Go to the fume hood and fetch the yellow bottle.',
+    'Take the clear test tube and place it at (0.2, 0.4, 0.0).',
+    'Do not pour anything, just pick the purple beaker.',
+    'Empty the red beaker into the empty flask then put the red beaker at (2, 0, 0).',
+    'Weigh 5 g of copper sulphate on the balance.',
+]
+LLM_LATENCY = 0.3
+
+if __name__ == '__main__':
+    server = fake_llm_server.start_in_thread(port=0, latency=LLM_LATENCY)
+    openai.api_base = f'http://127.0.0.1:{server.server_address[1]}/v1'
+    classifier = intent_classifier.get_default_classifier()
+    for instruction in INSTRUCTIONS:
+        start = time.perf_counter()
+        local = classifier.build_module_sequence(instruction)
+        elapsed = time.perf_counter() - start
+        if local is None:
+            api_calls.generate_module_sequence(instruction, 'fake-key', use_cache=False)
+        print(f"{'local' if local else 'llm':>5} {elapsed * 1e6:8.1f} us  {instruction}")
+    print(classifier.stats())
+    server.shutdown()
@@ -0,0 +1,60 @@
+# Throughput of the LLM backends in requests per second
+# Usage: python bench_llm_backends.py [--url http://127.0.0.1:8080/v1 --model name]
+# Without --url a fake server stands in for a CPU inference server that generates one request at a time
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+import fake_llm_server
+import llm_backends
+import prompt_builder
+
+REQUESTS = 64
+CLIENTS = 16
+# Simulated time for one forward pass of the fake server
+FAKE_LATENCY = 0.02
+
+# Function to send requests from concurrent clients and return requests per second
+def throughput(backend, messages, max_tokens, requests, clients):
+    backend.complete(messages, max_tokens)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        responses = list(executor.map(lambda _: backend.complete(messages, max_tokens), range(requests)))
+    elapsed = time.perf_counter() - start
+    assert all(response['choices'][0]['message']['content'] for response in responses)
+    return requests / elapsed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure LLM backend throughput')
+    parser.add_argument('--url', help='OpenAI-compatible server to test (default: a local fake server)')
+    parser.add_argument('--model', default=llm_backends.LOCAL_MODEL)
+    parser.add_argument('--requests', type=int, default=REQUESTS)
+    parser.add_argument('--clients', type=int, default=CLIENTS)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = fake_llm_server.start_in_thread(port=0, latency=FAKE_LATENCY, slots=1)
+        url = f'http://127.0.0.1:{server.server_address[1]}/v1'
+    openai.api_base = url
+    openai.api_key = 'fake-key'
+
+    messages = prompt_builder.build_messages('Pick up the blue beaker and pour half into the empty beaker.')
+    max_tokens = prompt_builder.estimate_max_tokens('Pick up the blue beaker and pour half into the empty beaker.')
+    backends = [
+        ('openai (openai package)', llm_backends.OpenAIBackend(args.model), args.clients),
+        ('local, 1 client', llm_backends.LocalServerBackend(url, args.model), 1),
+        ('local, pooled', llm_backends.LocalServerBackend(url, args.model), args.clients),
+        ('local_batched', llm_backends.BatchingBackend(llm_backends.LocalServerBackend(url, args.model, batch_mode='prompts')), args.clients),
+    ]
+    print(f"{args.requests} requests from up to {args.clients} clients against {url}")
+    print(f"{'backend':<26} {'req/s':>8}")
+    for label, backend, clients in backends:
+        print(f"{label:<26} {throughput(backend, messages, max_tokens, args.requests, clients):>8.1f}")
+        backend.close()
+    if server is not None:
+        server.shutdown()
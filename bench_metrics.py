@@ -0,0 +1,31 @@
+import timeit
+
+import metrics
+
+CALLS = 1_000_000
+
+def plain():
+    pass
+
+@metrics.timed('bench')
+def decorated():
+    pass
+
+def with_span():
+    with metrics.span('bench'):
+        pass
+
+# Function to return the cost of one call in nanoseconds, minus the cost of calling an empty function
+def overhead_ns(function):
+    baseline = min(timeit.repeat(plain, number=CALLS, repeat=5))
+    measured = min(timeit.repeat(function, number=CALLS, repeat=5))
+    return (measured - baseline) / CALLS * 1e9
+
+if __name__ == '__main__':
+    print(f"{'':<24} {'disabled ns':>12} {'enabled ns':>12}")
+    for name, function in (('@metrics.timed', decorated), ('with metrics.span()', with_span)):
+        metrics.set_enabled(False)
+        disabled = overhead_ns(function)
+        metrics.set_enabled(True)
+        enabled = overhead_ns(function)
+        print(f"{name:<24} {disabled:>12.0f} {enabled:>12.0f}")
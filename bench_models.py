@@ -0,0 +1,72 @@
+import gc
+import json
+import time
+import tracemalloc
+
+from container_index import ContainerIndex
+from future_positions import simulate_modules
+from models import compact_containers
+from synthetic_inventory import make_containers, make_queries, make_resolved_modules
+
+INVENTORY_SIZE = 100000
+QUERY_COUNT = 200
+SIMULATE_CONTAINERS = 1000
+SIMULATE_STEPS = 1000
+
+# Function to make containers with fresh strings for every value, as a YAML load would
+def load_containers(size):
+    return json.loads(json.dumps(make_containers(size)))
+
+# Function to measure the memory held by the result of a function, in megabytes
+def retained_mb(function):
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size / 1e6
+
+# Function to time a function in milliseconds (best of three runs)
+def best_ms(function, repeats=3):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - start) * 1e3
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# Function to time the average latency of index lookups in microseconds
+def match_us(index, queries):
+    start = time.perf_counter()
+    for query in queries:
+        index.match(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+def build_index(containers):
+    index = ContainerIndex(containers)
+    index.postings
+    return index
+
+if __name__ == '__main__':
+    queries = make_queries(QUERY_COUNT)
+    dicts, dict_mb = retained_mb(lambda: load_containers(INVENTORY_SIZE))
+    compact, compact_mb = retained_mb(lambda: compact_containers(load_containers(INVENTORY_SIZE)))
+    # Sanity check: both forms must match the same containers
+    dict_index = build_index(dicts)
+    compact_index = build_index(compact)
+    for query in queries[:20]:
+        assert [c['id'] for c in dict_index.match(query)] == [c['id'] for c in compact_index.match(query)]
+
+    small = load_containers(SIMULATE_CONTAINERS)
+    modules = make_resolved_modules(SIMULATE_STEPS, small)
+    small_compact = compact_containers(small)
+
+    print(f"{INVENTORY_SIZE} containers")
+    print(f"{'':>20} {'dicts':>10} {'compact':>10}")
+    print(f"{'memory MB':>20} {dict_mb:>10.1f} {compact_mb:>10.1f}")
+    print(f"{'index build ms':>20} {best_ms(lambda: build_index(dicts)):>10.1f} {best_ms(lambda: build_index(compact)):>10.1f}")
+    print(f"{'match us':>20} {match_us(dict_index, queries):>10.1f} {match_us(compact_index, queries):>10.1f}")
+    print(f"{'simulate ms':>20} {best_ms(lambda: simulate_modules(modules, small, collisions=[])):>10.1f} {best_ms(lambda: simulate_modules(modules, small_compact, collisions=[])):>10.1f}")
+    print(f"  (simulate: {SIMULATE_STEPS} steps over {SIMULATE_CONTAINERS} containers)")
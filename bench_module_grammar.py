@@ -0,0 +1,98 @@
+import random
+import time
+
+import openai
+
+import api_calls
+import fake_llm_server
+import module_grammar
+import prompt_builder
+from synthetic_inventory import make_module_sequence
+
+PLAN_STEPS = [10, 1000, 10000]
+PLANS = 40
+STEPS_PER_PLAN = 20
+# Chance that the fake model writes a step wrongly
+ERROR_RATE = 0.05
+MAX_WHOLE_RETRIES = 10
+
+# Function to break one module call the way models tend to
+def corrupt(call, rng):
+    kind = rng.randrange(3)
+    if kind == 0:
+        return call.replace('content_color', 'colour', 1)
+    if kind == 1:
+        return call[:-2] + ')'
+    return 'grab' + call[call.index('('):]
+
+# Fake model: plans contain occasional broken steps; repair requests get a correct call back
+class FlakyModel:
+    def __init__(self, seed=7):
+        self.rng = random.Random(seed)
+        self.calls = make_module_sequence(STEPS_PER_PLAN).split('\n\n')
+        self.completion_tokens = 0
+
+    def respond(self, body):
+        if body['messages'][0]['content'] == prompt_builder.REPAIR_SYSTEM_PROMPT:
+            completion = self.calls[0]
+        else:
+            completion = '\n\n'.join(corrupt(call, self.rng) if self.rng.random() < ERROR_RATE else call for call in self.calls)
+        self.completion_tokens += len(fake_llm_server.split_tokens(completion))
+        return completion
+
+# Function to generate plans by retrying the whole sequence until it validates
+def whole_sequence_retries(model, instruction):
+    round_trips = 0
+    failed = 0
+    for _ in range(PLANS):
+        for attempt in range(MAX_WHOLE_RETRIES):
+            round_trips += 1
+            sequence = api_calls.request_module_sequence(instruction, 'fake-key', use_cache=False)
+            if all(step.valid for step in module_grammar.validate_sequence(sequence)):
+                break
+        else:
+            failed += 1
+    return round_trips, failed
+
+# Function to generate plans with targeted repair of the invalid steps only
+def targeted_repair(model, instruction):
+    module_grammar.REPAIR_STATS.reset()
+    for _ in range(PLANS):
+        api_calls.request_module_sequence(instruction, 'fake-key', use_cache=False)
+    return module_grammar.REPAIR_STATS.summary()
+
+if __name__ == '__main__':
+    print(f"{'steps':>8} {'parse+validate ms':>18} {'us/step':>8}")
+    for steps in PLAN_STEPS:
+        sequence = make_module_sequence(steps)
+        start = time.perf_counter()
+        results = module_grammar.validate_sequence(sequence)
+        elapsed = time.perf_counter() - start
+        assert len(results) == steps and all(step.valid for step in results)
+        print(f"{steps:>8} {elapsed * 1e3:>18.1f} {elapsed / steps * 1e6:>8.1f}")
+
+    print()
+    print(f"{PLANS} plans of {STEPS_PER_PLAN} steps, {ERROR_RATE:.0%} of generated steps invalid")
+    instruction = 'Run the synthetic plan.'
+    results = {}
+    for label in ('whole sequence retry', 'targeted step repair'):
+        model = FlakyModel()
+        server = fake_llm_server.start_in_thread(port=0, respond=model.respond)
+        openai.api_base = f'http://127.0.0.1:{server.server_address[1]}/v1'
+        if label == 'whole sequence retry':
+            api_calls.VALIDATE_MODULES = False
+            round_trips, failed = whole_sequence_retries(model, instruction)
+            wasted = round_trips - PLANS
+        else:
+            api_calls.VALIDATE_MODULES = True
+            summary = targeted_repair(model, instruction)
+            round_trips = summary['generate_round_trips'] + summary['repair_round_trips']
+            failed = summary['failed']
+            wasted = summary['repair_round_trips']
+        server.shutdown()
+        successful = PLANS - failed
+        results[label] = (round_trips, wasted / successful if successful else float('nan'), model.completion_tokens, failed)
+
+    print(f"{'':<24} {'round trips':>12} {'wasted/plan':>12} {'tokens':>10} {'failed':>7}")
+    for label, (round_trips, wasted, tokens, failed) in results.items():
+        print(f"{label:<24} {round_trips:>12} {wasted:>12.2f} {tokens:>10} {failed:>7}")
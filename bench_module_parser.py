@@ -0,0 +1,16 @@
+import time
+
+from module_parser import parse_calls
+from synthetic_inventory import make_module_sequence
+
+SEQUENCE_STEPS = [10, 100, 1000, 10000]
+
+if __name__ == '__main__':
+    print(f"{'steps':>8} {'chars':>10} {'total ms':>10} {'us/step':>8}")
+    for steps in SEQUENCE_STEPS:
+        module_sequence = make_module_sequence(steps)
+        start = time.perf_counter()
+        calls = parse_calls(module_sequence, strict=True)
+        elapsed = time.perf_counter() - start
+        assert len(calls) == steps
+        print(f"{steps:>8} {len(module_sequence):>10} {elapsed * 1e3:>10.1f} {elapsed / steps * 1e6:>8.1f}")
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+
+import PyPDF2
+
+import pdf_extraction
+
+PAGE_COUNTS = [10, 100, 400]
+LINES_PER_PAGE = 40
+
+# Function to write a plain-text PDF with the given number of pages
+def make_pdf(path, pages):
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for page in range(pages):
+        lines = ''.join(
+            f'({f"Step {page}.{line}: pick the beaker and pour half into the empty flask"}) Tj T* '
+            for line in range(LINES_PER_PAGE)
+        )
+        stream = f'BT /F1 9 Tf 11 TL 40 800 Td {lines}ET'
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        content_number = len(objects)
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {content_number} 0 R >>'
+        )
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {pages} >>'
+    data = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(data)
+    data += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        data += f'{offset:010d} 00000 n \n'.encode()
+    data += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    with open(path, 'wb') as file:
+        file.write(data)
+
+# Function to extract text the way /upload originally did
+def sequential_extract(path):
+    with open(path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        content = ""
+        for page in reader.pages:
+            content += page.extract_text()
+        return content
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as folder:
+        pdf_extraction.TEXT_CACHE_FOLDER = os.path.join(folder, 'cache')
+        print(f"{'pages':>6} {'sequential s':>13} {'parallel s':>11} {'first chunk s':>14} {'cached ms':>10}")
+        for pages in PAGE_COUNTS:
+            path = os.path.join(folder, f'sop_{pages}.pdf')
+            make_pdf(path, pages)
+
+            start = time.perf_counter()
+            expected = sequential_extract(path)
+            sequential = time.perf_counter() - start
+
+            start = time.perf_counter()
+            first = None
+            chunks = []
+            for _, _, text in pdf_extraction.iter_pdf_chunks(path):
+                if first is None:
+                    first = time.perf_counter() - start
+                chunks.append(text)
+            parallel = time.perf_counter() - start
+            assert ''.join(chunks) == expected
+
+            start = time.perf_counter()
+            assert pdf_extraction.extract_text_from_pdf(path) == expected
+            cached = time.perf_counter() - start
+            print(f"{pages:>6} {sequential:>13.2f} {parallel:>11.2f} {first:>14.2f} {cached * 1e3:>10.1f}")
@@ -0,0 +1,183 @@
+# End-to-end benchmark of the NL -> module -> asset -> pose pipeline
+# Usage: python bench_pipeline.py [--output results.json] [--baseline old.json] [--threshold 0.25]
+# Exits with status 1 when a stage is slower than the baseline by more than the threshold
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+import openai
+
+import api_calls
+import fake_llm_server
+from asset_mapper import process_module_sequence
+from batch_simulator import ArrayInventory
+from bt_compiler import compile_bt_yaml
+from container_index import ContainerIndex
+from future_positions import simulate_modules
+from module_parser import parse_calls, parse_module_sequence
+from synthetic_inventory import make_containers, make_module_sequence
+
+INVENTORY_SIZES = [10, 1000, 100000]
+PLAN_STEPS = [10, 1000, 10000]
+STAGES = ['generate', 'flask_submit', 'parse', 'resolve', 'simulate', 'simulate_batch', 'compile']
+# simulate_modules snapshots every container after every step; larger runs are skipped
+SIMULATE_LIMIT = 20_000_000
+# Each stage is repeated until it has run this long (or MAX_REPEATS times) and the fastest run is kept,
+# which is far less sensitive to a busy machine than the mean or median
+MIN_STAGE_SECONDS = 0.2
+MAX_REPEATS = 5
+# Differences below this many milliseconds are treated as noise
+MIN_REGRESSION_MS = 1.0
+DEFAULT_OUTPUT = 'bench_pipeline.json'
+
+# File-like object that only counts what is written to it
+class NullWriter:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+
+# Function to time a stage in milliseconds (best of repeated runs)
+def time_stage(function):
+    samples = []
+    total = 0.0
+    while len(samples) < MAX_REPEATS and total < MIN_STAGE_SECONDS:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed * 1e3)
+        total += elapsed
+    return min(samples)
+
+# Function to run every stage and return {"stage/containers/steps": milliseconds}
+def run_suite(inventory_sizes, plan_steps, stages):
+    plans = {steps: make_module_sequence(steps) for steps in plan_steps}
+    results = {}
+    counter = iter(range(1 << 30))
+
+    # The fake backend answers every request with the plan named in the instruction
+    def respond(body):
+        instruction = body['messages'][-1]['content']
+        for steps in plan_steps:
+            if f'[{steps} steps]' in instruction:
+                return plans[steps]
+        return fake_llm_server.SAMPLE_MODULE_SEQUENCE
+
+    server = fake_llm_server.start_in_thread(port=0, respond=respond)
+    old_api_base = openai.api_base
+    openai.api_base = f'http://127.0.0.1:{server.server_address[1]}/v1'
+    try:
+        # Open the first connection before anything is timed
+        api_calls.generate_module_sequence('Warm up', 'fake-key', use_cache=False, use_local=False)
+        if 'generate' in stages:
+            for steps in plan_steps:
+                results[f'generate/-/{steps}'] = time_stage(lambda: api_calls.generate_module_sequence(
+                    f'Run the synthetic plan [{steps} steps]', 'fake-key', use_cache=False, use_local=False))
+        if 'flask_submit' in stages:
+            os.environ.setdefault('OPENAI_API_KEY', 'fake-key')
+            import user_input_page
+            client = user_input_page.app.test_client()
+            for steps in plan_steps:
+                # A new instruction each time, so neither the cache nor the local classifier answers it
+                def submit():
+                    response = client.post('/submit', json={'rich_text': f'Run the synthetic plan [{steps} steps] #{next(counter)}'})
+                    assert response.status_code == 200, response.get_data(as_text=True)
+                results[f'flask_submit/-/{steps}'] = time_stage(submit)
+    finally:
+        openai.api_base = old_api_base
+        server.shutdown()
+
+    if 'parse' in stages:
+        for steps in plan_steps:
+            results[f'parse/-/{steps}'] = time_stage(lambda: parse_calls(plans[steps]))
+
+    for size in inventory_sizes:
+        containers = make_containers(size)
+
+        def build_index():
+            index = ContainerIndex(containers)
+            index.postings
+            index.fuzzy
+            return index
+        results[f'index_build/{size}/-'] = time_stage(build_index)
+        index = build_index()
+        inventory = ArrayInventory(containers)
+        for steps in plan_steps:
+            # Unmatched containers are reported on stdout; keep them out of the results table
+            with contextlib.redirect_stdout(io.StringIO()):
+                resolved = process_module_sequence(plans[steps], index)
+                modules = parse_module_sequence(resolved)
+                if 'resolve' in stages:
+                    results[f'resolve/{size}/{steps}'] = time_stage(lambda: process_module_sequence(plans[steps], index))
+                if 'simulate' in stages and size * steps <= SIMULATE_LIMIT:
+                    results[f'simulate/{size}/{steps}'] = time_stage(lambda: simulate_modules(modules, containers, collisions=[]))
+                if 'simulate_batch' in stages:
+                    results[f'simulate_batch/{size}/{steps}'] = time_stage(lambda: inventory.simulate(modules))
+                if 'compile' in stages:
+                    results[f'compile/{size}/{steps}'] = time_stage(lambda: compile_bt_yaml(parse_calls(plans[steps]), index, NullWriter()))
+    return results
+
+# Function to compare results with a baseline and return the regressed keys
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'stage':<36} {'baseline ms':>12} {'now ms':>10} {'change':>8}")
+    for key, now in results.items():
+        before = baseline.get(key)
+        if before is None:
+            print(f"{key:<36} {'-':>12} {now:>10.2f} {'new':>8}")
+            continue
+        change = now / before - 1 if before else 0.0
+        regressed = change > threshold and now - before > MIN_REGRESSION_MS
+        marker = '  REGRESSION' if regressed else ''
+        print(f"{key:<36} {before:>12.2f} {now:>10.2f} {change:>+7.0%}{marker}")
+        if regressed:
+            regressions.append(key)
+    return regressions
+
+def parse_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every pipeline stage')
+    parser.add_argument('--inventories', type=parse_list, default=INVENTORY_SIZES, help='comma-separated container counts')
+    parser.add_argument('--steps', type=parse_list, default=PLAN_STEPS, help='comma-separated plan lengths')
+    parser.add_argument('--stages', default=','.join(STAGES), help='comma-separated stages to run')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='where to save the results JSON')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown per stage (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    stages = [stage for stage in args.stages.split(',') if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    results = run_suite(args.inventories, args.steps, stages)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results_ms': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)['results_ms']
+    regressions = compare(results, baseline, args.threshold)
+    print(f"Saved results to {args.output}")
+    if regressions:
+        print(f"Error: {len(regressions)} stage(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
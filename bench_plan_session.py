@@ -0,0 +1,63 @@
+import random
+import re
+import statistics
+import time
+
+from asset_mapper import format_parameters
+from container_index import ContainerIndex
+from future_positions import parse_module_sequence, simulate_modules
+from plan_session import PlanSession
+from synthetic_inventory import make_containers, make_resolved_modules
+
+INVENTORY_SIZE = 1000
+PLAN_STEPS = [500, 1000, 2000, 5000]
+EDITS = 20
+LOCATION = re.compile(r'\(\d+, \d+, \d+\)')
+
+# Function to write resolved modules as plan text, one call per step
+def plan_text(modules):
+    return '\n\n'.join(f"{name}({format_parameters(params)})" for name, params in modules)
+
+# Function to time a function in milliseconds
+def elapsed_ms(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1e3
+
+# Function to time an edit until the edited step has its result, then until the whole plan has
+def time_edit(session, edit, index):
+    edit_ms = elapsed_ms(lambda: (edit(), session.step_positions(index)))
+    final_ms = elapsed_ms(session.final_state)
+    return edit_ms, edit_ms + final_ms
+
+if __name__ == '__main__':
+    rng = random.Random(4)
+    containers = make_containers(INVENTORY_SIZE)
+    index = ContainerIndex(containers)
+    print(f"{INVENTORY_SIZE} containers, median of {EDITS} edits; 'step' is the time until the edited step's result is ready, 'all' until the last step's")
+    print(f"{'steps':>6} {'from scratch ms':>16} {'move step':>10} {'move all':>9} {'insert step':>12} {'insert all':>11} {'delete step':>12} {'delete all':>11} {'text step':>10}")
+    for steps in PLAN_STEPS:
+        text = plan_text(make_resolved_modules(steps, containers))
+        scratch_ms = min(elapsed_ms(lambda: simulate_modules(parse_module_sequence(text), containers, collisions=[])) for _ in range(3))
+        session = PlanSession(index, text)
+        session.final_state()
+        moves = [i for i, step in enumerate(session.steps) if step.name in ('place', 'moveto')]
+        picks = [i for i, step in enumerate(session.steps) if step.name == 'pick']
+        results = {'move': [], 'insert': [], 'delete': [], 'text': []}
+        for _ in range(EDITS):
+            # Operator moves a destination
+            i = rng.choice(moves)
+            new_text = LOCATION.sub(f'({rng.randint(0, 9)}, {rng.randint(0, 9)}, {rng.randint(0, 9)})', session.steps[i].text)
+            results['move'].append(time_edit(session, lambda: session.edit(i, new_text), i))
+            # Operator inserts a copy of an existing step, then deletes it again
+            j = rng.randrange(steps)
+            results['insert'].append(time_edit(session, lambda: session.insert(j, session.steps[rng.choice(picks)].text), j))
+            results['delete'].append(time_edit(session, lambda: session.delete(j), j))
+            # Editor sends the whole text back with one destination changed
+            k = rng.choice(moves)
+            texts = [step.text for step in session.steps]
+            texts[k] = LOCATION.sub(f'({rng.randint(0, 9)}, {rng.randint(0, 9)}, {rng.randint(0, 9)})', texts[k])
+            whole = '\n\n'.join(texts)
+            results['text'].append(time_edit(session, lambda: session.update(whole), k))
+        median = {kind: [statistics.median(times[n] for times in values) for n in (0, 1)] for kind, values in results.items()}
+        print(f"{steps:>6} {scratch_ms:>16.1f} {median['move'][0]:>10.2f} {median['move'][1]:>9.1f} {median['insert'][0]:>12.2f} {median['insert'][1]:>11.1f} {median['delete'][0]:>12.2f} {median['delete'][1]:>11.1f} {median['text'][0]:>10.2f}")
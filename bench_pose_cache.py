@@ -0,0 +1,44 @@
+import contextlib
+import io
+import time
+
+import pose_cache
+from bt_compiler import compile_module_sequence
+from container_index import ContainerIndex
+from pose_cache import DEFAULT_CACHE_ENTRIES, POSE_CACHE
+from synthetic_inventory import make_containers, make_module_sequence
+
+INVENTORY_SIZE = 1000
+PLAN_STEPS = [100, 1000, 10000]
+PLANS = 10
+
+# Function to compile every plan and return the mean time per plan in milliseconds
+def time_plans(sequences, index):
+    start = time.perf_counter()
+    for sequence in sequences:
+        compile_module_sequence(sequence, index)
+    return (time.perf_counter() - start) * 1e3 / len(sequences)
+
+if __name__ == '__main__':
+    index = ContainerIndex(make_containers(INVENTORY_SIZE))
+    # Build the lazy indexes outside the timed runs
+    index.postings
+    index.fuzzy
+    print(f"{INVENTORY_SIZE} containers, {PLANS} plans per size, ms per plan")
+    print(f"{'approach':>8} {'steps':>6} {'uncached':>9} {'cached':>7} {'speedup':>8} {'hit rate':>9}")
+    for height in (0.0, 0.1):
+        pose_cache.APPROACH_HEIGHT = height
+        for steps in PLAN_STEPS:
+            sequences = [make_module_sequence(steps, seed) for seed in range(PLANS)]
+            # Keep the unmatched-container prints out of the way
+            with contextlib.redirect_stdout(io.StringIO()):
+                # Warm the resolution cache so both runs spend the same on resolving
+                time_plans(sequences, index)
+                POSE_CACHE.max_entries = 0
+                uncached_ms = time_plans(sequences, index)
+                POSE_CACHE.max_entries = DEFAULT_CACHE_ENTRIES
+                POSE_CACHE.clear()
+                POSE_CACHE.hits = POSE_CACHE.misses = 0
+                cached_ms = time_plans(sequences, index)
+            hit_rate = POSE_CACHE.stats()['hit_rate']
+            print(f"{height:>8} {steps:>6} {uncached_ms:>9.1f} {cached_ms:>7.1f} {uncached_ms / cached_ms:>7.2f}x {hit_rate:>9.1%}")
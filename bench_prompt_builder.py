@@ -0,0 +1,62 @@
+import time
+
+import openai
+
+import api_calls
+import fake_llm_server
+import prompt_builder
+
+PROTOCOL_STEPS = 120
+# Simulated decoding time per completion token
+SECONDS_PER_TOKEN = 0.0005
+FIXED_MAX_TOKENS = 500
+PICK_CALL = 'pick(container={type: "beaker", size: "null", content_name: "null", content_color: "blue", content_volume: "null", landmark: "null"})'
+
+# Function to make a protocol with the given number of numbered steps
+def make_protocol(steps):
+    return '\n\n'.join(f'Step {i}: pick up beaker {i}, pour all of it into flask {i} and place it on the rack.' for i in range(steps))
+
+# The fake backend answers with one call per action in the request and takes longer for longer answers
+def respond(body):
+    count = prompt_builder.count_actions(body['messages'][-1]['content'])
+    completion = '\n\n'.join([PICK_CALL] * count)
+    time.sleep(min(len(fake_llm_server.split_tokens(completion)), body['max_tokens']) * SECONDS_PER_TOKEN)
+    return completion
+
+# Function to run the old single request with a fixed max_tokens
+def single_request(instruction):
+    response = openai.ChatCompletion.create(
+        model=api_calls.MODEL_NAME,
+        messages=prompt_builder.build_messages(instruction),
+        max_tokens=FIXED_MAX_TOKENS,
+        temperature=0.0,
+    )
+    return response['choices'][0]['message']['content']
+
+def run(label, function, instruction):
+    start = time.perf_counter()
+    sequence = function(instruction)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1e3:>10.0f} {sequence.count('pick('):>8}")
+
+if __name__ == '__main__':
+    server = fake_llm_server.start_in_thread(port=0, respond=respond, truncate=True)
+    openai.api_base = f'http://127.0.0.1:{server.server_address[1]}/v1'
+    openai.api_key = 'fake-key'
+    instruction = make_protocol(PROTOCOL_STEPS)
+    expected = prompt_builder.count_actions(instruction)
+    short = 'Pick up the blue beaker, pour half into the empty beaker and place it at (1, 2, 3).'
+
+    print(f"system prompt: {prompt_builder.system_tokens()} tokens (same for every request)")
+    print(f"short instruction max_tokens: {prompt_builder.estimate_max_tokens(short)} (was {FIXED_MAX_TOKENS})")
+    requests = prompt_builder.plan_requests(instruction)
+    print(f"protocol: {prompt_builder.count_tokens(instruction)} tokens, {expected} actions, "
+          f"{len(requests)} sections, max_tokens {[request.max_tokens for request in requests]}")
+    print()
+    print(f"{'':<32} {'ms':>10} {'calls':>8}")
+    run(f'single request, max_tokens={FIXED_MAX_TOKENS}', single_request, instruction)
+    for workers in (1, 4):
+        api_calls.PROMPT_WORKERS = workers
+        run(f'sections, {workers} worker(s)', lambda text: api_calls.request_module_sequence(text, 'fake-key', use_cache=False), instruction)
+    print(f"(expected {expected} calls)")
+    server.shutdown()
@@ -0,0 +1,34 @@
+import time
+
+from asset_mapper import process_module_sequence
+from container_index import ContainerIndex
+from resolution_cache import DEFAULT_CACHE_ENTRIES, RESOLUTION_CACHE
+from synthetic_inventory import make_containers, make_module_sequence
+
+INVENTORY_SIZES = [1000, 10000, 100000]
+PLAN_STEPS = 200
+REQUESTS = 20
+
+# Function to time REQUESTS plans against one index, in milliseconds per request
+def time_requests(index, sequences):
+    start = time.perf_counter()
+    for sequence in sequences:
+        process_module_sequence(sequence, index)
+    return (time.perf_counter() - start) * 1e3 / len(sequences)
+
+if __name__ == '__main__':
+    # Each request names its own 64 containers, most of them in several steps
+    sequences = [make_module_sequence(PLAN_STEPS, seed) for seed in range(REQUESTS)]
+    print(f"{REQUESTS} requests of {PLAN_STEPS} steps each, ms per request")
+    print(f"{'containers':>10} {'uncached':>9} {'cached':>7} {'speedup':>8} {'hit rate':>9}")
+    for size in INVENTORY_SIZES:
+        index = ContainerIndex(make_containers(size))
+        RESOLUTION_CACHE.max_entries = 0
+        uncached_ms = time_requests(index, sequences)
+        RESOLUTION_CACHE.max_entries = DEFAULT_CACHE_ENTRIES
+        RESOLUTION_CACHE.clear()
+        RESOLUTION_CACHE.hits = RESOLUTION_CACHE.misses = 0
+        cached_ms = time_requests(index, sequences)
+        hit_rate = RESOLUTION_CACHE.stats()['hit_rate']
+        print(f"{size:>10} {uncached_ms:>9.1f} {cached_ms:>7.1f} {uncached_ms / cached_ms:>7.1f}x {hit_rate:>9.1%}")
+
@@ -0,0 +1,74 @@
+# Memory of N worker processes that each load the inventory, against N workers reading one shared copy
+# Memory is proportional set size (Pss): pages shared by k processes count 1/k towards each of them
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+from asset_store import read_snapshot, write_snapshot
+from container_index import ContainerIndex
+from models import compact_containers
+from shared_inventory import SharedInventory, SharedInventoryWriter
+from synthetic_inventory import make_containers, make_queries
+
+INVENTORY_SIZE = 100000
+WORKER_COUNTS = [1, 2, 4, 8]
+QUERY_COUNT = 50
+LOOKUP_COUNT = 1000
+
+# Function to read this process's proportional set size in megabytes
+def pss_mb():
+    with open('/proc/self/smaps_rollup') as file:
+        for line in file:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+# Worker: load the inventory its own way, answer some queries, then report how much memory that added
+def worker(mode, source, barrier, results):
+    before = pss_mb()
+    start = time.perf_counter()
+    if mode == 'private':
+        index = ContainerIndex(compact_containers(read_snapshot(source)))
+    else:
+        index = SharedInventory(source).index()
+    for query in make_queries(QUERY_COUNT):
+        index.match(query)
+    for number in range(0, INVENTORY_SIZE, INVENTORY_SIZE // LOOKUP_COUNT):
+        index.get(f'C{number}')['position']
+    elapsed = time.perf_counter() - start
+    # Measure once every worker is holding its inventory, so shared pages are split between all of them
+    barrier.wait()
+    results.put((pss_mb() - before, elapsed))
+    barrier.wait()
+
+# Function to run N workers at once and return their total added memory and mean load-and-query time
+def run_workers(mode, source, count):
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(count)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, source, barrier, results)) for _ in range(count)]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in range(count)]
+    for process in processes:
+        process.join()
+    return sum(memory for memory, _ in measured), sum(elapsed for _, elapsed in measured) / count
+
+if __name__ == '__main__':
+    containers = make_containers(INVENTORY_SIZE)
+    snapshot_path = os.path.join(tempfile.gettempdir(), f'bench_inventory_{os.getpid()}.snapshot')
+    write_snapshot(snapshot_path, containers, 0, 0, b'\0' * 32)
+    name = f'ras_bench_{os.getpid()}'
+    writer = SharedInventoryWriter(name, containers)
+    print(f"{INVENTORY_SIZE} containers; total memory added by all workers, and mean load + query time per worker")
+    print(f"{'workers':>8} {'private MB':>11} {'shared MB':>10} {'private s':>10} {'shared s':>9}")
+    try:
+        for count in WORKER_COUNTS:
+            private_mb, private_s = run_workers('private', snapshot_path, count)
+            shared_mb, shared_s = run_workers('shared', name, count)
+            print(f"{count:>8} {private_mb:>11.1f} {shared_mb:>10.1f} {private_s:>10.2f} {shared_s:>9.2f}")
+    finally:
+        writer.close(remove=True)
+        os.remove(snapshot_path)
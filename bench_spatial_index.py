@@ -0,0 +1,75 @@
+import heapq
+import math
+import random
+import time
+
+from container_index import ContainerIndex
+from spatial_index import SpatialGrid, as_point
+from synthetic_inventory import make_containers
+
+INVENTORY_SIZES = [1000, 10000, 100000]
+QUERY_COUNT = 500
+RADIUS = 0.05
+NEAREST_K = 5
+MOVE_COUNT = 10000
+
+# Function to find the k nearest containers by measuring every one
+def linear_nearest(containers, point, k):
+    scored = []
+    for container in containers:
+        position = as_point(container.get('position'))
+        if position is not None:
+            scored.append((math.dist(point, position), container['id']))
+    return heapq.nsmallest(k, scored)
+
+# Function to find every container within radius by measuring every one
+def linear_within(containers, point, radius):
+    found = []
+    for container in containers:
+        position = as_point(container.get('position'))
+        if position is not None:
+            distance = math.dist(point, position)
+            if distance <= radius:
+                found.append((distance, container['id']))
+    found.sort()
+    return found
+
+# Function to time a function over all query points, in microseconds per query
+def per_query_us(function, points):
+    start = time.perf_counter()
+    results = [function(point) for point in points]
+    return results, (time.perf_counter() - start) / len(points) * 1e6
+
+if __name__ == '__main__':
+    rng = random.Random(5)
+    print(f"{'containers':>10} {'build ms':>9} {'nearest linear us':>18} {'nearest grid us':>16} {'radius linear us':>17} {'radius grid us':>15} {'move us':>8} {'rebuild ms':>11}")
+    for size in INVENTORY_SIZES:
+        containers = make_containers(size)
+        points = [(rng.uniform(0, 2), rng.uniform(0, 1), 0.0) for _ in range(QUERY_COUNT)]
+
+        start = time.perf_counter()
+        grid = SpatialGrid.from_containers(containers)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        linear, linear_nearest_us = per_query_us(lambda point: linear_nearest(containers, point, NEAREST_K), points)
+        gridded, grid_nearest_us = per_query_us(lambda point: grid.nearest(point, NEAREST_K), points)
+        assert [[round(d, 9) for d, _ in r] for r in linear] == [[round(d, 9) for d, _ in r] for r in gridded]
+        linear, linear_within_us = per_query_us(lambda point: linear_within(containers, point, RADIUS), points)
+        gridded, grid_within_us = per_query_us(lambda point: grid.within(point, RADIUS), points)
+        assert [len(r) for r in linear] == [len(r) for r in gridded]
+
+        # Incremental moves through the index versus rebuilding the grid after a move
+        index = ContainerIndex([container.copy() for container in containers])
+        index.spatial
+        ids = [container['id'] for container in index.containers]
+        start = time.perf_counter()
+        for _ in range(MOVE_COUNT):
+            container = index.get(rng.choice(ids))
+            container['position'] = (round(rng.uniform(0, 2), 3), round(rng.uniform(0, 1), 3), 0.0)
+            index.moved(container)
+        move_us = (time.perf_counter() - start) / MOVE_COUNT * 1e6
+        start = time.perf_counter()
+        SpatialGrid.from_containers(index.containers)
+        rebuild_ms = (time.perf_counter() - start) * 1e3
+
+        print(f"{size:>10} {build_ms:>9.1f} {linear_nearest_us:>18.1f} {grid_nearest_us:>16.1f} {linear_within_us:>17.1f} {grid_within_us:>15.1f} {move_us:>8.2f} {rebuild_ms:>11.1f}")
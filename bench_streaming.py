@@ -0,0 +1,38 @@
+import time
+
+import openai
+
+import api_calls
+import fake_llm_server
+from streaming_pipeline import process_stream
+from synthetic_inventory import make_containers, make_module_sequence
+
+STEPS = 20
+TOKEN_DELAY = 0.002
+
+if __name__ == '__main__':
+    plan = make_module_sequence(STEPS)
+    server = fake_llm_server.start_in_thread(port=0, token_delay=TOKEN_DELAY, respond=lambda body: plan)
+    openai.api_base = f'http://127.0.0.1:{server.server_address[1]}/v1'
+    containers = make_containers(1000)
+    instruction = 'Run the synthetic plan.'
+
+    # Blocking: wait for the full completion, then process
+    start = time.perf_counter()
+    deltas = list(api_calls.stream_module_sequence(instruction, 'fake-key'))
+    steps = list(process_stream(deltas, containers))
+    blocking_first = time.perf_counter() - start
+    blocking_total = blocking_first
+
+    # Streaming: process each call as soon as it closes
+    start = time.perf_counter()
+    first = None
+    for step in process_stream(api_calls.stream_module_sequence(instruction, 'fake-key'), containers):
+        if first is None:
+            first = time.perf_counter() - start
+    streaming_total = time.perf_counter() - start
+
+    print(f"steps: {len(steps)}")
+    print(f"blocking  time to first action: {blocking_first * 1e3:8.1f} ms, total {blocking_total * 1e3:8.1f} ms")
+    print(f"streaming time to first action: {first * 1e3:8.1f} ms, total {streaming_total * 1e3:8.1f} ms")
+    server.shutdown()
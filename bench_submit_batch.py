@@ -0,0 +1,40 @@
+import os
+import time
+
+# Keep the response cache in memory so every run reaches the fake LLM
+os.environ.setdefault('RAS_LLM_CACHE', '')
+os.environ.setdefault('OPENAI_API_KEY', 'fake-key')
+
+import openai
+
+import fake_llm_server
+import user_input_page
+
+BATCH_SIZE = 48
+DISTINCT = 32
+LLM_LATENCY = 0.2
+
+if __name__ == '__main__':
+    server = fake_llm_server.start_in_thread(port=0, latency=LLM_LATENCY)
+    openai.api_base = f'http://127.0.0.1:{server.server_address[1]}/v1'
+    client = user_input_page.app.test_client()
+    run = time.time()
+    # Instructions the local classifier declines, so each one needs the LLM
+    instructions = [f'Weigh sample {i % DISTINCT} on the balance ({run})' for i in range(BATCH_SIZE)]
+
+    start = time.perf_counter()
+    for instruction in instructions[:DISTINCT]:
+        client.post('/submit', json={'rich_text': instruction + ' sequential'})
+    sequential = time.perf_counter() - start
+
+    requests_before = server.request_count
+    start = time.perf_counter()
+    response = client.post('/submit_batch', json={'instructions': instructions})
+    batched = time.perf_counter() - start
+    results = response.get_json()['results']
+
+    print(f"{DISTINCT} distinct instructions, {LLM_LATENCY * 1e3:.0f} ms fake LLM latency, {user_input_page.BATCH_WORKERS} workers")
+    print(f"sequential /submit: {sequential:6.2f} s")
+    print(f"/submit_batch ({BATCH_SIZE} items): {batched:6.2f} s, {server.request_count - requests_before} LLM calls, "
+          f"{sum('error' in result for result in results)} errors")
+    server.shutdown()
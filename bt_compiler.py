@@ -0,0 +1,236 @@
+# bt_compiler.py
+# Compiles module calls straight into the behavior tree's Poses/targets YAML
+# Usage: python bt_compiler.py module_sequence.txt [-o plan.yaml]
+
+import argparse
+import contextlib
+import sys
+
+import yaml
+
+import asset_store
+import metrics
+from asset_mapper import held_after, is_active_container, resolve_containers
+from container_index import ContainerIndex, ensure_index
+from future_positions import apply_module, collision_message
+from module_parser import ModuleCall, parse_calls
+from pose_cache import POSE_CACHE, merge
+
+# Use libyaml's emitter when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as Dumper
+except ImportError:
+    from yaml import SafeDumper as Dumper
+
+# Pour tilts the gripper there and back
+POUR_TARGETS = [1.57, -1.57]
+# Runs of these modules are merged into one pose list, dropping repeated poses between steps
+BATCHED_MODULES = ('place', 'moveto')
+# Poses and targets are dumped this many at a time
+CHUNK_SIZE = 256
+
+CONTAINER_PARAMS = ('container', 'original_container', 'destination_container')
+
+# Function to dump a mapping or list as block YAML, indented by the given number of spaces
+def dump_block(data, indent=0):
+    text = yaml.dump(data, Dumper=Dumper, default_flow_style=False, sort_keys=False)
+    if indent:
+        prefix = ' ' * indent
+        text = ''.join(prefix + line for line in text.splitlines(True))
+    return text
+
+# Compiles module calls one at a time, tracking the simulated container state
+# Problems (unmatched containers, collisions, steps without a pose) are appended to errors as messages when a list is given, printed otherwise
+class BTCompiler:
+    def __init__(self, containers, errors=None):
+        self.index = ensure_index(containers)
+        self.errors = errors
+        self.state_index = ContainerIndex([container.copy() for container in self.index.containers])
+        self.pose_names = {}
+        self.new_poses = {}
+        self.targets = []
+        # Targets of the current run of place/moveto steps, and the containers this plan has moved
+        self.batch = []
+        self.moved = set()
+        # Container picked up and not yet placed, for "active container"
+        self.held = None
+
+    def report(self, message):
+        if self.errors is not None:
+            self.errors.append(message)
+        else:
+            print(message)
+
+    # Function to return the name of a pose key, adding it if it is new
+    def pose_name(self, key):
+        name = self.pose_names.get(key)
+        if name is None:
+            name = self.pose_names[key] = f'pose{len(self.pose_names) + 1}'
+            x, y, z, roll, pitch, yaw = key
+            self.new_poses[name] = {'x': x, 'y': y, 'z': z, 'roll': roll, 'pitch': pitch, 'yaw': yaw}
+        return name
+
+    # Function to return the simulated state of a resolved container parameter
+    def container(self, params, param_name):
+        value = params.get(param_name)
+        if isinstance(value, dict):
+            return self.state_index.get(value.get('id'))
+        return None
+
+    # Function to return the motion poses at a simulated container
+    # Containers this plan has not moved are still where the inventory has them, so their poses are shared across plans
+    def container_poses(self, container):
+        if container is None:
+            return None
+        if container['id'] in self.moved:
+            return POSE_CACHE.at(container['position'])
+        return POSE_CACHE.container(self.index.get(container['id']), self.index)
+
+    # Function to return the motion poses at a destination, or at the landmark when it is not a coordinate
+    def destination_poses(self, destination, landmark):
+        poses = POSE_CACHE.at(destination)
+        if poses is None:
+            poses = POSE_CACHE.landmark(landmark, self.index)
+        return poses
+
+    # Function to add the targets for one module call and update the simulated state
+    def add(self, module_name, params):
+        if any((isinstance(params.get(name), dict) and 'id' not in params[name]) or is_active_container(params.get(name)) for name in CONTAINER_PARAMS):
+            params = resolve_containers(module_name, dict(params), self.index, errors=self.errors, held=self.held)
+        self.held = held_after(module_name, params, self.held)
+
+        if module_name == 'pick':
+            poses = self.container_poses(self.container(params, 'container'))
+            actions = ['grasp']
+            moved = None
+        elif module_name == 'pour':
+            poses = self.container_poses(self.container(params, 'destination_container'))
+            actions = POUR_TARGETS
+            moved = None
+        elif module_name == 'place':
+            poses = self.destination_poses(params.get('destination_location'), params.get('landmark'))
+            actions = ['release']
+            moved = params.get('container')
+        elif module_name == 'moveto':
+            poses = self.destination_poses(params.get('destination'), params.get('landmark'))
+            actions = []
+            moved = params.get('original_container')
+        else:
+            self.report(f"Error compiling {module_name}: unsupported module")
+            return
+
+        if poses is None:
+            self.report(f"Error compiling {module_name}: no pose for {params}")
+            return
+        path = poses.path(module_name, actions)
+        if module_name in BATCHED_MODULES:
+            self.batch.extend(path)
+        else:
+            self.flush()
+            self.add_targets(path)
+        collisions = []
+        apply_module(module_name, params, self.state_index, collisions)
+        for collision in collisions:
+            self.report(collision_message(collision))
+        if isinstance(moved, dict) and 'id' in moved:
+            self.moved.add(moved['id'])
+
+    # Function to append pose keys (as pose names) and actions to the targets
+    def add_targets(self, path):
+        for target in path:
+            self.targets.append(self.pose_name(target) if isinstance(target, tuple) else target)
+
+    # Function to write out the current run of place/moveto targets as one merged pose list
+    def flush(self):
+        if self.batch:
+            self.add_targets(merge(self.batch))
+            self.batch = []
+
+    # Function to take the poses added since the last call
+    def take_new_poses(self):
+        poses = self.new_poses
+        self.new_poses = {}
+        return poses
+
+# Generator that yields the YAML text in chunks
+# Poses are written as soon as CHUNK_SIZE new ones are found; targets are held until the end
+def iter_bt_yaml(module_calls, containers, errors=None):
+    compiler = BTCompiler(containers, errors)
+    poses_started = False
+    for module_call in module_calls:
+        if isinstance(module_call, ModuleCall):
+            compiler.add(module_call.name, module_call.params())
+        else:
+            compiler.add(*module_call)
+        if len(compiler.new_poses) >= CHUNK_SIZE:
+            if not poses_started:
+                poses_started = True
+                yield 'Poses:\n'
+            yield dump_block(compiler.take_new_poses(), indent=2)
+
+    compiler.flush()
+    poses = compiler.take_new_poses()
+    if poses:
+        if not poses_started:
+            poses_started = True
+            yield 'Poses:\n'
+        yield dump_block(poses, indent=2)
+    if not poses_started:
+        yield 'Poses: {}\n'
+
+    targets = compiler.targets
+    if not targets:
+        yield 'targets: []\n'
+        return
+    yield 'targets:\n'
+    for start in range(0, len(targets), CHUNK_SIZE):
+        yield dump_block(targets[start:start + CHUNK_SIZE])
+
+# Function to compile module calls (ModuleCall objects or (name, params) pairs) into BT YAML
+# Writes to the stream when one is given, otherwise returns the YAML text
+# Problems are appended to errors as messages when a list is given, printed otherwise
+@metrics.timed('compile_bt_yaml')
+def compile_bt_yaml(module_calls, containers, stream=None, errors=None):
+    chunks = iter_bt_yaml(module_calls, containers, errors)
+    if stream is None:
+        return ''.join(chunks)
+    for chunk in chunks:
+        stream.write(chunk)
+    return None
+
+# Function to compile a module-sequence string straight from the LLM into BT YAML
+def compile_module_sequence(module_sequence, containers, stream=None, errors=None):
+    if errors is None:
+        return compile_bt_yaml(parse_calls(module_sequence), containers, stream)
+    parse_errors = []
+    module_calls = parse_calls(module_sequence, errors=parse_errors)
+    errors.extend(f"Error parsing module call: {e}" for e in parse_errors)
+    return compile_bt_yaml(module_calls, containers, stream, errors)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile a module sequence into behavior tree YAML')
+    parser.add_argument('input', nargs='?', default='-', help='module sequence file (default: stdin)')
+    parser.add_argument('-o', '--output', help='YAML file to write (default: stdout)')
+    parser.add_argument('--assets', help='container assets YAML (default: asset_store.DEFAULT_ASSETS_PATH)')
+    args = parser.parse_args()
+
+    if args.input == '-':
+        module_sequence = sys.stdin.read()
+    else:
+        with open(args.input, 'r') as file:
+            module_sequence = file.read()
+    # stdout only carries the YAML; problems and any other output go to stderr
+    output = sys.stdout
+    errors = []
+    with contextlib.redirect_stdout(sys.stderr):
+        containers = asset_store.get_store(args.assets).index()
+        if args.output:
+            with open(args.output, 'w') as file:
+                compile_module_sequence(module_sequence, containers, file, errors)
+        else:
+            compile_module_sequence(module_sequence, containers, output, errors)
+        for message in errors:
+            print(message)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import heapq
+import itertools
+import math
+
+from models import INTERNED_FIELDS, MISSING, VOCABULARY, Container, normalize_value
+from spatial_index import SpatialGrid, as_point
+
+# Attributes that get an inverted index (the interned fields of models.Container)
+INDEXED_ATTRIBUTES = INTERNED_FIELDS
+# Nearest-container queries measure up to this many matching candidates directly instead of walking the grid
+LINEAR_NEAREST_LIMIT = 64
+# Each index gets its own token, so caches can tell inventory versions apart
+_tokens = itertools.count(1)
+
+# Function to hand out a token for a new index (for ContainerIndex-compatible views defined elsewhere)
+def new_token():
+    return next(_tokens)
+
+# Function to normalize an attribute name ("content name" -> "content_name")
+def normalize_key(key):
+    return str(key).strip().lower().replace(' ', '_')
+
+# Index over the container list, built once and queried many times
+class ContainerIndex:
+    def __init__(self, containers):
+        self.token = new_token()
+        self.containers = list(containers)
+        self.by_id = {}
+        for container in self.containers:
+            self.by_id.setdefault(container['id'], container)
+        # Compact containers are indexed by their interned codes instead of strings
+        self.compact = bool(self.containers) and all(isinstance(container, Container) for container in self.containers)
+        # Attribute postings and the fuzzy index are built on the first query
+        self._postings = None
+        self._fuzzy = None
+        self._spatial = None
+
+    def __len__(self):
+        return len(self.containers)
+
+    @property
+    def postings(self):
+        if self._postings is None:
+            postings = {attribute: {} for attribute in INDEXED_ATTRIBUTES}
+            for position, container in enumerate(self.containers):
+                for attribute, values in postings.items():
+                    if self.compact:
+                        # Postings are keyed by the normalized form, like the dict branch
+                        value = getattr(container, attribute)
+                        if value is not MISSING:
+                            value = VOCABULARY.keys[value]
+                    else:
+                        value = normalize_value(container.get(attribute, ''))
+                    values.setdefault(value, set()).add(position)
+            self._postings = postings
+        return self._postings
+
+    # Trigram index for ranked fuzzy matching (see fuzzy_matcher.py)
+    @property
+    def fuzzy(self):
+        if self._fuzzy is None:
+            from fuzzy_matcher import FuzzyIndex
+            self._fuzzy = FuzzyIndex(self.containers)
+        return self._fuzzy
+
+    # Grid over container positions for nearest, radius and collision queries (see spatial_index.py)
+    @property
+    def spatial(self):
+        if self._spatial is None:
+            self._spatial = SpatialGrid.from_containers(self.containers)
+        return self._spatial
+
+    # Function to tell the index some attributes of a container changed in place (a pour, a move)
+    # The spatial grid follows the move; attribute and fuzzy indexes are rebuilt on their next use
+    def changed(self, container, attributes):
+        if 'position' in attributes and self._spatial is not None:
+            self._spatial.move(container['id'], container.get('position'))
+        if any(attribute in INDEXED_ATTRIBUTES for attribute in attributes):
+            self._postings = None
+            self._fuzzy = None
+
+    def moved(self, container):
+        self.changed(container, ('position',))
+
+    # Function to return up to k (distance, container) pairs matching the criteria within max_distance of a point, nearest first
+    def nearest(self, criteria, point, k=1, max_distance=math.inf):
+        point = as_point(point)
+        if point is None:
+            return []
+        criteria = {key: value for key, value in criteria.items() if value != 'null' and value is not None}
+        if not criteria:
+            return [(distance, self.by_id[container_id]) for distance, container_id in self.spatial.nearest(point, k, max_distance=max_distance)]
+        candidates = self.match(criteria)
+        if len(candidates) <= LINEAR_NEAREST_LIMIT:
+            scored = []
+            for container in candidates:
+                position = as_point(container.get('position'))
+                if position is not None:
+                    distance = math.dist(point, position)
+                    if distance <= max_distance:
+                        scored.append((distance, container))
+            return heapq.nsmallest(k, scored, key=lambda item: item[0])
+        ids = {container['id'] for container in candidates}
+        return [(distance, self.by_id[container_id]) for distance, container_id in self.spatial.nearest(point, k, ids.__contains__, max_distance)]
+
+    # Function to look up a container by id
+    def get(self, container_id):
+        return self.by_id.get(container_id)
+
+    # Function to find every container matching the criteria, in inventory order
+    def match(self, criteria):
+        postings = self.postings
+        indexed = []
+        remaining = []
+        for key, value in criteria.items():
+            if value == 'null' or value is None:
+                continue
+            key = normalize_key(key)
+            value = normalize_value(value)
+            if key in postings:
+                if self.compact:
+                    value = VOCABULARY.codes.get(value)
+                candidates = postings[key].get(value)
+                if not candidates:
+                    return []
+                indexed.append(candidates)
+            else:
+                remaining.append((key, value))
+
+        # Intersect the candidate sets smallest-first
+        if indexed:
+            indexed.sort(key=len)
+            positions = set(indexed[0])
+            for candidates in indexed[1:]:
+                positions &= candidates
+                if not positions:
+                    return []
+            positions = sorted(positions)
+        else:
+            positions = range(len(self.containers))
+
+        matches = []
+        for position in positions:
+            container = self.containers[position]
+            if all(normalize_value(container.get(key, '')) == value for key, value in remaining):
+                matches.append(container)
+        return matches
+
+    # Function to return the first matching container, or None
+    def match_one(self, criteria):
+        matches = self.match(criteria)
+        if matches:
+            return matches[0]
+        return None
+
+# Function to find the first container in a plain list matching the criteria, without building an index
+# Matches what ContainerIndex.match_one returns for the same list; used for one-off lookups
+def first_match(containers, criteria):
+    criteria = [(normalize_key(key), normalize_value(value)) for key, value in criteria.items() if value != 'null' and value is not None]
+    for container in containers:
+        if all(normalize_value(container.get(key, '')) == value for key, value in criteria):
+            return container
+    return None
+
+# Function to reuse an existing index or build one from a container list
+def ensure_index(containers):
+    if isinstance(containers, ContainerIndex):
+        return containers
+    return ContainerIndex(containers)
+
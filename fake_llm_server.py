@@ -0,0 +1,149 @@
+# Local stand-in for the OpenAI chat completions API, for benchmarks and manual testing
+# Point the client at it with OPENAI_API_BASE=http://127.0.0.1:8001/v1
+
+import argparse
+import contextlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic_inventory import make_module_sequence
+
+# Response returned when no step count is configured (the README example)
+SAMPLE_MODULE_SEQUENCE = '''pick(container={type: "beaker", size: "null", content_name: "null", content_color: "blue", content_volume: "null", landmark: "null"})
+
+pour(original_container={type: "beaker", size: "null", content_name: "null", content_color: "blue", content_volume: "null", landmark: "null"}, destination_container={type: "beaker", size: "null", content_name: "empty", content_color: "null", content_volume: "null", landmark: "null"}, volume="half")
+
+place(container={type: "beaker", size: "null", content_name: "null", content_color: "blue", content_volume: "null", landmark: "null"}, destination_location=(1,2,3), landmark="null")'''
+
+# Function to split a completion into token-sized chunks
+def split_tokens(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this small responses wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+        server.request_count += 1
+        if self.path.endswith('/chat/completions'):
+            with server.slots:
+                completion, finish_reason = self.generate(body)
+                time.sleep(server.latency)
+        elif self.path.endswith('/completions'):
+            self.send_prompt_completions(body)
+            return
+        else:
+            self.send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+            return
+        if body.get('stream'):
+            self.stream_completion(body, completion, finish_reason)
+        else:
+            self.send_json(200, {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion',
+                'model': body.get('model', 'fake'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': completion}, 'finish_reason': finish_reason}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': len(split_tokens(completion)), 'total_tokens': 0},
+            })
+
+    # Function to produce the completion text and finish reason for a chat request
+    def generate(self, body):
+        completion = self.server.respond(body)
+        # Like the real API, stop at max_tokens and report the completion as cut off (only when enabled)
+        max_tokens = body.get('max_tokens')
+        if self.server.truncate and max_tokens and len(split_tokens(completion)) > max_tokens:
+            return ''.join(split_tokens(completion)[:max_tokens]), 'length'
+        return completion, 'stop'
+
+    # Plain completions endpoint; a list of prompts is answered as one batch, paying the latency once
+    def send_prompt_completions(self, body):
+        prompts = body.get('prompt', '')
+        if isinstance(prompts, str):
+            prompts = [prompts]
+        choices = []
+        with self.server.slots:
+            for index, prompt in enumerate(prompts):
+                completion, finish_reason = self.generate(dict(body, messages=[{'role': 'user', 'content': prompt}]))
+                choices.append({'index': index, 'text': completion, 'finish_reason': finish_reason})
+            time.sleep(self.server.latency)
+        self.send_json(200, {'id': 'cmpl-fake', 'object': 'text_completion', 'model': body.get('model', 'fake'), 'choices': choices})
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def stream_completion(self, body, completion, finish_reason='stop'):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        for token in split_tokens(completion):
+            chunk = {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion.chunk',
+                'model': body.get('model', 'fake'),
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}],
+            }
+            self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+            self.wfile.flush()
+            time.sleep(self.server.token_delay)
+        chunk = {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion.chunk',
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': finish_reason}],
+        }
+        self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+
+# Function to create a fake server; respond maps a request body to completion text
+# slots limits how many requests are generated at once, like a CPU inference server (0 = unlimited)
+def make_server(port=8001, latency=0.0, token_delay=0.0, respond=None, truncate=False, slots=0):
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.token_delay = token_delay
+    server.truncate = truncate
+    server.slots = threading.BoundedSemaphore(slots) if slots else contextlib.nullcontext()
+    server.request_count = 0
+    server.respond = respond or (lambda body: SAMPLE_MODULE_SEQUENCE)
+    return server
+
+# Function to run a fake server in a background thread
+def start_in_thread(**kwargs):
+    server = make_server(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Fake OpenAI-compatible chat completions server')
+    arg_parser.add_argument('--port', type=int, default=8001)
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='seconds before the first token')
+    arg_parser.add_argument('--token-delay', type=float, default=0.0, help='seconds between streamed tokens')
+    arg_parser.add_argument('--steps', type=int, default=0, help='answer with a synthetic plan of this many steps')
+    arg_parser.add_argument('--truncate', action='store_true', help='cut completions off at the request max_tokens')
+    arg_parser.add_argument('--slots', type=int, default=0, help='requests generated at once (0 = unlimited)')
+    args = arg_parser.parse_args()
+    respond = None
+    if args.steps:
+        plan = make_module_sequence(args.steps)
+        respond = lambda body: plan
+    server = make_server(args.port, args.latency, args.token_delay, respond, args.truncate, args.slots)
+    print(f"Fake LLM server listening on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
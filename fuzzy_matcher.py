@@ -0,0 +1,150 @@
+import heapq
+import re
+
+from container_index import INDEXED_ATTRIBUTES, normalize_key
+
+# How much each attribute counts towards a container's score
+ATTRIBUTE_WEIGHTS = {
+    'type': 3.0,
+    'content_name': 2.0,
+    'content_color': 2.0,
+    'size': 1.0,
+    'landmark': 1.0,
+}
+# Attribute values less similar than this contribute nothing
+MIN_SIMILARITY = 0.3
+SIMILARITY_CACHE_ENTRIES = 4096
+
+NON_WORD = re.compile(r'[^a-z0-9]+')
+
+# Function to normalize a value for fuzzy comparison ("Test-Tube" -> "test tube")
+def normalize_text(value):
+    return NON_WORD.sub(' ', str(value).lower()).strip()
+
+# Function to split normalized text into padded word trigrams
+def trigrams(text):
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+# Function to score two trigram sets between 0 and 1 (Dice coefficient)
+def similarity(left, right):
+    if not left or not right:
+        return 0.0
+    return 2 * len(left & right) / (len(left) + len(right))
+
+# Trigram index over the distinct attribute values of an inventory
+# Containers with identical indexed attributes share one profile, so a query scores
+# distinct values and profiles rather than every container
+class FuzzyIndex:
+    def __init__(self, containers, weights=None):
+        self.containers = list(containers)
+        self.weights = dict(ATTRIBUTE_WEIGHTS if weights is None else weights)
+        self.attributes = [attribute for attribute in INDEXED_ATTRIBUTES if self.weights.get(attribute)]
+        # Per attribute: value id -> trigram set, trigram -> value ids, value id -> profile ids
+        self.value_grams = {attribute: [] for attribute in self.attributes}
+        self.gram_postings = {attribute: {} for attribute in self.attributes}
+        self.value_profiles = {attribute: [] for attribute in self.attributes}
+        # Profile id -> container positions, in inventory order
+        self.profile_positions = []
+        self._similar = {}
+
+        value_ids = {attribute: {} for attribute in self.attributes}
+        # Raw value -> value id, so each distinct raw value is normalized once
+        raw_ids = {attribute: {} for attribute in self.attributes}
+        profile_ids = {}
+        for position, container in enumerate(self.containers):
+            profile = []
+            for attribute in self.attributes:
+                raw = container.get(attribute, '')
+                value_id = raw_ids[attribute].get(raw)
+                if value_id is None:
+                    value_id = raw_ids[attribute][raw] = self.value_id(attribute, raw, value_ids[attribute])
+                profile.append(value_id)
+            profile = tuple(profile)
+            profile_id = profile_ids.get(profile)
+            if profile_id is None:
+                profile_id = profile_ids[profile] = len(self.profile_positions)
+                self.profile_positions.append([])
+                for attribute, value_id in zip(self.attributes, profile):
+                    self.value_profiles[attribute][value_id].append(profile_id)
+            self.profile_positions[profile_id].append(position)
+
+    def value_id(self, attribute, value, value_ids):
+        text = normalize_text(value)
+        value_id = value_ids.get(text)
+        if value_id is None:
+            value_id = value_ids[text] = len(self.value_grams[attribute])
+            grams = trigrams(text)
+            self.value_grams[attribute].append(grams)
+            self.value_profiles[attribute].append([])
+            postings = self.gram_postings[attribute]
+            for gram in grams:
+                postings.setdefault(gram, []).append(value_id)
+        return value_id
+
+    # Function to find the known values of an attribute similar to the given text
+    # Returns a list of (value_id, similarity)
+    def similar_values(self, attribute, text):
+        key = (attribute, text)
+        similar = self._similar.get(key)
+        if similar is None:
+            grams = trigrams(text)
+            shared = {}
+            for gram in grams:
+                for value_id in self.gram_postings[attribute].get(gram, ()):
+                    shared[value_id] = shared.get(value_id, 0) + 1
+            value_grams = self.value_grams[attribute]
+            similar = []
+            for value_id, count in shared.items():
+                score = 2 * count / (len(grams) + len(value_grams[value_id]))
+                if score >= MIN_SIMILARITY:
+                    similar.append((value_id, score))
+            if len(self._similar) >= SIMILARITY_CACHE_ENTRIES:
+                self._similar.clear()
+            self._similar[key] = similar
+        return similar
+
+    # Function to return up to k (score, container) pairs, best first
+    # Scores are weighted averages of per-attribute similarity (1.0 is an exact match);
+    # ties keep inventory order, and fields with value 'null' or None are ignored
+    # With min_similarity, only containers with every described attribute at least that similar are ranked
+    def rank(self, criteria, k=5, min_similarity=None):
+        query = []
+        for key, value in criteria.items():
+            if value == 'null' or value is None:
+                continue
+            key = normalize_key(key)
+            if key in self.value_grams:
+                query.append((key, normalize_text(value)))
+        if not query:
+            return []
+
+        total_weight = sum(self.weights[attribute] for attribute, _ in query)
+        scores = {}
+        matched = {}
+        for attribute, text in query:
+            weight = self.weights[attribute] / total_weight
+            profiles = self.value_profiles[attribute]
+            for value_id, score in self.similar_values(attribute, text):
+                if min_similarity is not None and score < min_similarity:
+                    continue
+                for profile_id in profiles[value_id]:
+                    scores[profile_id] = scores.get(profile_id, 0.0) + weight * score
+                    matched[profile_id] = matched.get(profile_id, 0) + 1
+        if min_similarity is not None:
+            # A profile gets at most one similar value per attribute, so the count is the number of attributes it matched
+            scores = {profile_id: score for profile_id, score in scores.items() if matched[profile_id] == len(query)}
+
+        # Profile ids follow inventory order, so the lower id wins a tie
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        ranked = []
+        for profile_id, score in best:
+            for position in self.profile_positions[profile_id]:
+                ranked.append((round(score, 4), self.containers[position]))
+                if len(ranked) == k:
+                    return ranked
+        return ranked
@@ -0,0 +1,214 @@
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+EMBEDDINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keyword_to_module_embedding.txt')
+MODULES = ('pick', 'pour', 'place', 'moveto')
+EMBEDDING_SIZE = 10
+
+# Words the local path understands; an instruction with any other word goes to the LLM
+CONTAINER_TYPES = {'beaker', 'flask', 'vial', 'bottle', 'jar', 'cup', 'test_tube', 'petri_dish', 'cylinder'}
+COLORS = {'red', 'blue', 'green', 'yellow', 'orange', 'purple', 'pink', 'black', 'white', 'brown', 'clear', 'colorless'}
+SIZES = {'small', 'medium', 'large', 'big'}
+FILLER_WORDS = {
+    'the', 'a', 'an', 'of', 'with', 'containing', 'contains', 'that', 'has', 'solution', 'liquid',
+    'please', 'up', 'down', 'at', 'to', 'into', 'in', 'from', 'location', 'position', 'coordinates',
+}
+PRONOUNS = {'it', 'them', 'its'}
+VOLUME_WORDS = {'half', 'all', 'everything'}
+
+COORDINATE = re.compile(r'\(\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*\)')
+VOLUME = re.compile(r'(\d+(?:\.\d+)?)\s*ml\b')
+CLAUSE_SPLIT = re.compile(r'[.;!]|\bthen\b|\band\b|,')
+# Every token counts once coordinates and volumes are placeholders, so numbers and symbols ("20", "30%") are never skipped
+WORD = re.compile(r'\S+')
+
+# Function to load the keyword table into one contiguous matrix
+def load_embeddings(path=EMBEDDINGS_PATH):
+    keywords = []
+    rows = []
+    with open(path, 'r') as file:
+        for line in file:
+            fields = line.split()
+            if len(fields) <= EMBEDDING_SIZE:
+                continue
+            # Keywords may be phrases such as "go to"
+            keywords.append(' '.join(fields[:-EMBEDDING_SIZE]).lower())
+            rows.append([float(value) for value in fields[-EMBEDDING_SIZE:]])
+    return keywords, np.ascontiguousarray(rows, dtype=np.float64)
+
+# Function to format a container description the way the LLM writes it
+def format_description(description):
+    fields = ('type', 'size', 'content_name', 'content_color', 'content_volume', 'landmark')
+    return '{' + ', '.join(f'{field}: "{description.get(field, "null")}"' for field in fields) + '}'
+
+# Maps instruction verbs to modules and builds simple module sequences without the LLM
+class IntentClassifier:
+    def __init__(self, path=EMBEDDINGS_PATH, min_similarity=0.99, min_margin=0.02):
+        keywords, vectors = load_embeddings(path)
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        # Each module is the centroid of the rows labelled with the module name itself
+        centroids = np.stack([normalized[[i for i, keyword in enumerate(keywords) if keyword == module]].mean(axis=0) for module in MODULES])
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+        # Cosine similarity of every keyword against every module in one product
+        similarity = normalized @ centroids.T
+        ranked = np.sort(similarity, axis=1)
+        best = similarity.argmax(axis=1)
+        scores = ranked[:, -1]
+        margins = ranked[:, -1] - ranked[:, -2]
+        self.verbs = {}
+        for keyword, module, score, margin in zip(keywords, best, scores, margins):
+            if score >= min_similarity and margin >= min_margin:
+                self.verbs[keyword.replace(' ', '_')] = MODULES[module]
+        self.local_count = 0
+        self.fallback_count = 0
+        self.local_seconds = 0.0
+        self.fallback_seconds = 0.0
+        self._lock = threading.Lock()
+
+    # Function to map a single verb (or "go to" style phrase) to a module, or None
+    def classify_verb(self, verb):
+        return self.verbs.get(verb.strip().lower().replace(' ', '_'))
+
+    # Function to build a module sequence locally, or None when the instruction is not simple enough
+    def build_module_sequence(self, instruction):
+        start = time.perf_counter()
+        module_sequence = self._build(instruction)
+        if module_sequence is not None:
+            with self._lock:
+                self.local_count += 1
+                self.local_seconds += time.perf_counter() - start
+        return module_sequence
+
+    # Function to record the time an instruction spent on the LLM path after the local path declined it
+    def record_fallback(self, seconds):
+        with self._lock:
+            self.fallback_count += 1
+            self.fallback_seconds += seconds
+
+    # Function to report the fallback rate and the latency of each path
+    def stats(self):
+        total = self.local_count + self.fallback_count
+        return {
+            'local': self.local_count,
+            'fallback': self.fallback_count,
+            'fallback_rate': self.fallback_count / total if total else 0.0,
+            'local_mean_ms': self.local_seconds / self.local_count * 1e3 if self.local_count else 0.0,
+            'fallback_mean_ms': self.fallback_seconds / self.fallback_count * 1e3 if self.fallback_count else 0.0,
+        }
+
+    def _build(self, instruction):
+        text = instruction.lower()
+        # Pull out coordinates and volumes before splitting, they contain '.' and ','
+        coordinates = []
+        def keep_coordinate(match):
+            coordinates.append(f'({match.group(1)},{match.group(2)},{match.group(3)})')
+            return f' __coord{len(coordinates) - 1}__ '
+        text = COORDINATE.sub(keep_coordinate, text)
+        volumes = []
+        def keep_volume(match):
+            volumes.append(match.group(1))
+            return f' __volume{len(volumes) - 1}__ '
+        text = VOLUME.sub(keep_volume, text)
+        text = re.sub(r'\btest tube\b', 'test_tube', text)
+        text = re.sub(r'\bpetri dish\b', 'petri_dish', text)
+        text = re.sub(r'\b(go|head) to\b', r'\1_to', text)
+        text = re.sub(r'\bpick up\b', 'pickup', text)
+
+        calls = []
+        active = None
+        for clause in CLAUSE_SPLIT.split(text):
+            words = WORD.findall(clause)
+            if not words:
+                continue
+            module = self.verbs.get(words[0])
+            if module is None:
+                return None
+            call, active = self._build_call(module, words[1:], coordinates, volumes, active)
+            if call is None:
+                return None
+            calls.append(call)
+        if not calls:
+            return None
+        return '\n\n'.join(calls)
+
+    def _build_call(self, module, words, coordinates, volumes, active):
+        # Split the clause into the source description and what follows into/to/at
+        descriptions = [{}]
+        location = None
+        volume = None
+        pronoun = False
+        for word in words:
+            # A second location or volume in one clause would overwrite the first
+            if word.startswith('__coord'):
+                if location is not None:
+                    return None, active
+                location = coordinates[int(word[7:-2])]
+            elif word.startswith('__volume'):
+                if volume is not None:
+                    return None, active
+                volume = volumes[int(word[8:-2])]
+            elif word in ('into', 'onto') or (word == 'to' and module == 'pour'):
+                descriptions.append({})
+            elif word in PRONOUNS:
+                pronoun = True
+            elif word in CONTAINER_TYPES:
+                descriptions[-1]['type'] = word.replace('_', ' ')
+            elif word in COLORS:
+                descriptions[-1]['content_color'] = word
+            elif word in SIZES:
+                descriptions[-1]['size'] = word
+            elif word == 'empty':
+                descriptions[-1]['content_name'] = 'empty'
+            elif word in VOLUME_WORDS and module == 'pour':
+                if volume is not None:
+                    return None, active
+                volume = 'all' if word == 'everything' else word
+            elif word in FILLER_WORDS:
+                continue
+            else:
+                return None, active
+        source = descriptions[0] or (active if pronoun else None)
+        if source is None or 'type' not in source:
+            return None, active
+        # "the beaker" right after a more specific beaker refers back to that container
+        if active is not None and source == {'type': active['type']}:
+            source = active
+        if len(descriptions) > 2:
+            return None, active
+        # Every location and volume the clause gives must end up in the call; the LLM handles anything else
+        if (location is not None and module in ('pick', 'pour')) or (volume is not None and module != 'pour'):
+            return None, active
+
+        if module == 'pick':
+            if len(descriptions) > 1:
+                return None, active
+            return f'pick(container={format_description(source)})', source
+        if module == 'pour':
+            if len(descriptions) != 2 or 'type' not in descriptions[1]:
+                return None, active
+            volume = volume or 'all'
+            return (
+                f'pour(original_container={format_description(source)}, '
+                f'destination_container={format_description(descriptions[1])}, volume="{volume}")'
+            ), source
+        # place and moveto need explicit coordinates
+        if location is None or len(descriptions) > 1:
+            return None, active
+        if module == 'place':
+            return f'place(container={format_description(source)}, destination_location={location}, landmark="null")', source
+        return f'moveto(original_container={format_description(source)}, destination={location}, landmark="null")', source
+
+_default_classifier = None
+_default_classifier_lock = threading.Lock()
+
+# Function to get the process-wide classifier
+def get_default_classifier():
+    global _default_classifier
+    with _default_classifier_lock:
+        if _default_classifier is None:
+            _default_classifier = IntentClassifier()
+        return _default_classifier
@@ -0,0 +1,416 @@
+# llm_backends.py
+# Interchangeable chat completion backends: the OpenAI API or a local OpenAI-compatible server (llama.cpp, vLLM, Ollama, ...)
+# Choose one per request by name (see BACKENDS); RAS_LLM_BACKEND sets the default
+
+import asyncio
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# Backend settings
+DEFAULT_BACKEND = os.environ.get('RAS_LLM_BACKEND', 'openai')
+OPENAI_MODEL = os.environ.get('RAS_OPENAI_MODEL', 'gpt-4')
+LOCAL_URL = os.environ.get('RAS_LOCAL_LLM_URL', 'http://127.0.0.1:8080/v1')
+LOCAL_MODEL = os.environ.get('RAS_LOCAL_LLM_MODEL', 'local')
+LOCAL_API_KEY = os.environ.get('RAS_LOCAL_LLM_KEY')
+LOCAL_POOL_SIZE = int(os.environ.get('RAS_LOCAL_LLM_POOL', 8))
+LOCAL_TIMEOUT = float(os.environ.get('RAS_LOCAL_LLM_TIMEOUT', 120))
+# Request field that carries a GBNF grammar to the local server ('grammar' for llama.cpp; empty to never send one)
+LOCAL_GRAMMAR_FIELD = os.environ.get('RAS_LOCAL_LLM_GRAMMAR_FIELD', 'grammar')
+# Concurrent requests are grouped into batches of up to BATCH_SIZE, waiting at most BATCH_WAIT seconds for more
+BATCH_SIZE = int(os.environ.get('RAS_LLM_BATCH_SIZE', 8))
+BATCH_WAIT = float(os.environ.get('RAS_LLM_BATCH_WAIT', 0.005))
+
+# Error returned by a backend (bad status, malformed response, unreachable server)
+class LLMBackendError(Exception):
+    pass
+
+# Function to render chat messages as one plain prompt, for servers that batch on the completions endpoint
+def render_chat(messages):
+    lines = [f"<|{message['role']}|>\n{message['content']}" for message in messages]
+    lines.append('<|assistant|>\n')
+    return '\n'.join(lines)
+
+# Function to run a blocking generator on a worker thread and iterate it asynchronously
+async def iterate_in_thread(iterator):
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+# Interface every backend implements; responses use the OpenAI chat completion format
+# Backends with supports_grammar constrain decoding to the GBNF grammar passed in; others ignore it
+class LLMBackend:
+    name = None
+    model = None
+    requires_api_key = False
+    supports_grammar = False
+
+    # Function to complete one chat and return the response dict
+    def complete(self, messages, max_tokens, request_timeout=None, api_key=None, grammar=None):
+        raise NotImplementedError
+
+    # Function to complete several chats; the default sends them one by one
+    def complete_batch(self, requests, request_timeout=None, api_key=None, grammar=None):
+        return [self.complete(messages, max_tokens, request_timeout, api_key, grammar) for messages, max_tokens in requests]
+
+    # Function to stream one chat as completion chunk dicts
+    def stream(self, messages, max_tokens, api_key=None, grammar=None):
+        raise NotImplementedError
+
+    async def acomplete(self, messages, max_tokens, request_timeout=None, api_key=None, grammar=None):
+        return await asyncio.to_thread(self.complete, messages, max_tokens, request_timeout, api_key, grammar)
+
+    async def astream(self, messages, max_tokens, api_key=None, grammar=None):
+        async for chunk in iterate_in_thread(iter(self.stream(messages, max_tokens, api_key, grammar))):
+            yield chunk
+
+    def close(self):
+        pass
+
+# The OpenAI API through the openai package (connections are pooled by its HTTP session)
+class OpenAIBackend(LLMBackend):
+    name = 'openai'
+    requires_api_key = True
+
+    def __init__(self, model=OPENAI_MODEL, workers=LOCAL_POOL_SIZE):
+        self.model = model
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def complete(self, messages, max_tokens, request_timeout=None, api_key=None, grammar=None):
+        import openai
+        return openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.0,
+            n=1,
+            stop=None,
+            request_timeout=request_timeout,
+            api_key=api_key
+        )
+
+    # The chat API takes one conversation per call, so a batch is sent concurrently
+    def complete_batch(self, requests, request_timeout=None, api_key=None, grammar=None):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='openai_backend')
+        futures = [self._executor.submit(self.complete, messages, max_tokens, request_timeout, api_key)
+                   for messages, max_tokens in requests]
+        return [future.result() for future in futures]
+
+    def stream(self, messages, max_tokens, api_key=None, grammar=None):
+        import openai
+        return openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.0,
+            n=1,
+            stop=None,
+            stream=True,
+            api_key=api_key
+        )
+
+    async def acomplete(self, messages, max_tokens, request_timeout=None, api_key=None, grammar=None):
+        import openai
+        return await openai.ChatCompletion.acreate(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.0,
+            n=1,
+            stop=None,
+            request_timeout=request_timeout,
+            api_key=api_key
+        )
+
+    async def astream(self, messages, max_tokens, api_key=None, grammar=None):
+        import openai
+        response = await openai.ChatCompletion.acreate(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.0,
+            n=1,
+            stop=None,
+            stream=True,
+            api_key=api_key
+        )
+        async for chunk in response:
+            yield chunk
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+# Keep-alive HTTP connections to one server, shared by every thread
+class ConnectionPool:
+    def __init__(self, url, size=LOCAL_POOL_SIZE, timeout=LOCAL_TIMEOUT):
+        parts = urlsplit(url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        # Bounds the open connections; callers beyond it wait for a free one
+        self.slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    # Function to send a request and return (status, body bytes); a stale keep-alive connection is retried once
+    # timeout overrides the pool's timeout for this request only
+    def request(self, method, path, body=None, headers=None, timeout=None):
+        timeout = timeout or self.timeout
+        with self.slots:
+            for attempt in range(2):
+                try:
+                    connection = self.idle.get_nowait()
+                except queue.Empty:
+                    connection = self._connect()
+                # Pooled connections keep the timeout of the last request, so set it every time
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                try:
+                    connection.request(method, self.prefix + path, body=body, headers=headers or {})
+                    response = connection.getresponse()
+                    data = response.read()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    connection.close()
+                    if attempt:
+                        raise
+                    continue
+                except Exception:
+                    connection.close()
+                    raise
+                if response.will_close:
+                    connection.close()
+                else:
+                    self.idle.put(connection)
+                return response.status, data
+
+    # Function to open a streamed request on its own connection; the caller reads and closes the response
+    def open_stream(self, method, path, body=None, headers=None):
+        connection = self._connect()
+        connection.request(method, self.prefix + path, body=body, headers=headers or {})
+        return connection, connection.getresponse()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+# A local OpenAI-compatible server; batch_mode 'prompts' sends a batch as one completions request with a prompt list
+class LocalServerBackend(LLMBackend):
+    name = 'local'
+
+    def __init__(self, url=LOCAL_URL, model=LOCAL_MODEL, pool_size=LOCAL_POOL_SIZE, batch_mode='concurrent', api_key=LOCAL_API_KEY,
+                 grammar_field=LOCAL_GRAMMAR_FIELD):
+        self.url = url
+        self.model = model
+        self.batch_mode = batch_mode
+        self.api_key = api_key
+        self.grammar_field = grammar_field
+        self.supports_grammar = bool(grammar_field)
+        self.pool = ConnectionPool(url, pool_size)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='local_backend')
+
+    def headers(self):
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        return headers
+
+    def post(self, path, payload, request_timeout=None):
+        try:
+            status, data = self.pool.request('POST', path, json.dumps(payload).encode('utf-8'), self.headers(), request_timeout)
+        except OSError as e:
+            raise LLMBackendError(f"local LLM server at {self.url} is unreachable: {e}")
+        if status >= 400:
+            raise LLMBackendError(f"local LLM server returned {status}: {data[:200].decode('utf-8', 'replace')}")
+        try:
+            return json.loads(data)
+        except ValueError:
+            raise LLMBackendError('local LLM server returned malformed JSON')
+
+    def payload(self, messages, max_tokens, grammar=None, **extra):
+        payload = dict({'model': self.model, 'messages': messages, 'max_tokens': max_tokens, 'temperature': 0.0, 'n': 1}, **extra)
+        if grammar and self.grammar_field:
+            payload[self.grammar_field] = grammar
+        return payload
+
+    def complete(self, messages, max_tokens, request_timeout=None, api_key=None, grammar=None):
+        return self.post('/chat/completions', self.payload(messages, max_tokens, grammar), request_timeout)
+
+    def complete_batch(self, requests, request_timeout=None, api_key=None, grammar=None):
+        if not requests:
+            return []
+        if self.batch_mode == 'prompts' and len(requests) > 1:
+            payload = {
+                'model': self.model,
+                'prompt': [render_chat(messages) for messages, max_tokens in requests],
+                'max_tokens': max(max_tokens for messages, max_tokens in requests),
+                'temperature': 0.0,
+            }
+            if grammar and self.grammar_field:
+                payload[self.grammar_field] = grammar
+            response = self.post('/completions', payload, request_timeout)
+            choices = sorted(response.get('choices', []), key=lambda choice: choice.get('index', 0))
+            if len(choices) != len(requests):
+                raise LLMBackendError(f"local LLM server answered {len(choices)} of {len(requests)} prompts")
+            # Reshape each choice into a chat completion response
+            return [
+                {'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': choice.get('text', '')},
+                              'finish_reason': choice.get('finish_reason')}]}
+                for choice in choices
+            ]
+        # Servers with continuous batching (llama.cpp --parallel, vLLM) batch concurrent requests themselves
+        futures = [self._executor.submit(self.complete, messages, max_tokens, request_timeout, api_key, grammar)
+                   for messages, max_tokens in requests]
+        return [future.result() for future in futures]
+
+    def stream(self, messages, max_tokens, api_key=None, grammar=None):
+        body = json.dumps(self.payload(messages, max_tokens, grammar, stream=True)).encode('utf-8')
+        try:
+            connection, response = self.pool.open_stream('POST', '/chat/completions', body, self.headers())
+        except OSError as e:
+            raise LLMBackendError(f"local LLM server at {self.url} is unreachable: {e}")
+        try:
+            if response.status >= 400:
+                raise LLMBackendError(f"local LLM server returned {response.status}: {response.read(200).decode('utf-8', 'replace')}")
+            # Server-sent events: one 'data: {...}' line per chunk, ending with 'data: [DONE]'
+            for line in response:
+                line = line.strip()
+                if not line.startswith(b'data:'):
+                    continue
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    break
+                yield json.loads(data)
+        finally:
+            connection.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.pool.close()
+
+# Wraps a backend so concurrent single requests are sent to it as batches
+class BatchingBackend(LLMBackend):
+    def __init__(self, backend, name=None, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT, dispatchers=2):
+        self.backend = backend
+        self.name = name or backend.name
+        self.model = backend.model
+        self.requires_api_key = backend.requires_api_key
+        self.supports_grammar = backend.supports_grammar
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.batched_requests = 0
+        self._threads = [threading.Thread(target=self._dispatch, daemon=True, name=f'llm_batcher_{i}') for i in range(dispatchers)]
+        for thread in self._threads:
+            thread.start()
+
+    # Function to gather queued requests into batches and send them
+    def _dispatch(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            # Requests with different keys, timeouts or grammars cannot share one call
+            groups = {}
+            for item in batch:
+                groups.setdefault((item[3], item[2], item[4]), []).append(item)
+            for (api_key, request_timeout, grammar), items in groups.items():
+                try:
+                    responses = self.backend.complete_batch([(item[0], item[1]) for item in items], request_timeout, api_key, grammar)
+                except Exception as e:
+                    for item in items:
+                        item[5].set_exception(e)
+                    continue
+                self.batches += 1
+                self.batched_requests += len(items)
+                for item, response in zip(items, responses):
+                    item[5].set_result(response)
+
+    def complete(self, messages, max_tokens, request_timeout=None, api_key=None, grammar=None):
+        future = Future()
+        self.pending.put((messages, max_tokens, request_timeout, api_key, grammar, future))
+        return future.result()
+
+    def complete_batch(self, requests, request_timeout=None, api_key=None, grammar=None):
+        return self.backend.complete_batch(requests, request_timeout, api_key, grammar)
+
+    def stream(self, messages, max_tokens, api_key=None, grammar=None):
+        return self.backend.stream(messages, max_tokens, api_key, grammar)
+
+    async def astream(self, messages, max_tokens, api_key=None, grammar=None):
+        async for chunk in self.backend.astream(messages, max_tokens, api_key, grammar):
+            yield chunk
+
+    def close(self):
+        self.backend.close()
+
+# Backend name -> factory
+BACKENDS = {
+    'openai': OpenAIBackend,
+    'local': LocalServerBackend,
+    'local_batched': lambda: BatchingBackend(LocalServerBackend(batch_mode='prompts'), 'local_batched'),
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+# Function to add a backend factory under a name
+def register_backend(name, factory):
+    with _backends_lock:
+        BACKENDS[name] = factory
+        _backends.pop(name, None)
+
+# Function to return the shared backend for a name (default RAS_LLM_BACKEND); backends are created once
+def get_backend(name=None):
+    if isinstance(name, LLMBackend):
+        return name
+    name = name or DEFAULT_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                factory = BACKENDS.get(name)
+                if factory is None:
+                    raise ValueError(f"unknown LLM backend {name!r} (choose from {', '.join(sorted(BACKENDS))})")
+                backend = _backends[name] = factory()
+    return backend
+
+# Function to look up the backend named in a request body ('backend', default RAS_LLM_BACKEND) and the API key it needs
+# Returns (backend, api_key, None), or (None, None, ({'error': message}, status)) for the web apps to return as is
+def select_backend(data):
+    try:
+        backend = get_backend(data.get('backend'))
+    except ValueError as e:
+        return None, None, ({'error': str(e)}, 400)
+    openai_api_key = os.environ.get('OPENAI_API_KEY')
+    if backend.requires_api_key and not openai_api_key:
+        return None, None, ({'error': 'OpenAI API key not found in environment variables'}, 500)
+    return backend, openai_api_key, None
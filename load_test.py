@@ -0,0 +1,83 @@
+# Load-test harness for user_input_page.py (Flask) and async_app.py (ASGI)
+# Example: python load_test.py --url http://127.0.0.1:8000 --clients 64 --requests 512
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+# Function to return the given percentile of a sorted list
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    position = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[position]
+
+# Function to fire requests from concurrent clients and collect latencies and status codes
+def run_load(url, path, clients, total_requests, make_body):
+    target = urlsplit(url)
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def client():
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=120)
+        while True:
+            with lock:
+                number = next(counter, None)
+            if number is None:
+                break
+            body = json.dumps(make_body(number))
+            start = time.perf_counter()
+            try:
+                connection.request('POST', path, body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port, timeout=120)
+                status = 'connection error'
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+        connection.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'seconds': wall,
+        'throughput': len(latencies) / wall if wall else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        'max_ms': latencies[-1] * 1e3 if latencies else 0.0,
+        'statuses': dict(statuses),
+    }
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Concurrent load test for the /submit routes')
+    arg_parser.add_argument('--url', default='http://127.0.0.1:5000')
+    arg_parser.add_argument('--path', default='/submit')
+    arg_parser.add_argument('--clients', type=int, default=32)
+    arg_parser.add_argument('--requests', type=int, default=256)
+    arg_parser.add_argument('--instruction', default='Weigh the sample on the balance')
+    arg_parser.add_argument('--unique', action='store_true', help='make every instruction distinct to bypass the response cache')
+    args = arg_parser.parse_args()
+
+    def make_body(number):
+        instruction = f'{args.instruction} #{number}' if args.unique else args.instruction
+        return {'rich_text': instruction}
+
+    print(json.dumps(run_load(args.url, args.path, args.clients, args.requests, make_body), indent=2))
@@ -0,0 +1,179 @@
+# metrics.py
+# Lightweight counters, histograms and stage timing spans, rendered in Prometheus text format
+# Set RAS_METRICS=0 (or call set_enabled(False)) to turn recording off
+
+import bisect
+import inspect
+import os
+import threading
+import time
+from functools import wraps
+
+ENABLED = os.environ.get('RAS_METRICS', '1') != '0'
+
+DURATION_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+_registry = []
+_lock = threading.Lock()
+
+# Function to turn recording on or off at runtime
+def set_enabled(enabled):
+    global ENABLED
+    ENABLED = bool(enabled)
+
+# Function to escape a label value for the text format
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Function to format a series name with its labels
+def series_name(name, labels):
+    labels = [(key, value) for key, value in labels if value is not None]
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels) + '}'
+
+# Monotonic counter, optionally split by one label
+class Counter:
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, label_value=None):
+        if not ENABLED:
+            return
+        with _lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_value, value in self.values.items():
+            lines.append(f'{series_name(self.name, [(self.label, label_value)])} {value}')
+        return lines
+
+# Histogram with fixed buckets, optionally split by one label
+class Histogram:
+    def __init__(self, name, help_text, buckets, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        # label value -> [per-bucket counts (last one is +Inf), sum]
+        self.series = {}
+        _registry.append(self)
+
+    def observe(self, value, label_value=None):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_value, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{series_name(self.name + "_bucket", [(self.label, label_value), ("le", bound)])} {cumulative}')
+            lines.append(f'{series_name(self.name + "_sum", [(self.label, label_value)])} {total}')
+            lines.append(f'{series_name(self.name + "_count", [(self.label, label_value)])} {cumulative}')
+        return lines
+
+STAGE_DURATION = Histogram('ras_stage_duration_seconds', 'Time spent in each pipeline stage.', DURATION_BUCKETS, 'stage')
+STAGE_ERRORS = Counter('ras_stage_errors_total', 'Pipeline stage calls that raised an exception.', 'stage')
+CACHE_REQUESTS = Counter('ras_llm_cache_requests_total', 'LLM response cache lookups by result.', 'result')
+INTENT_REQUESTS = Counter('ras_intent_requests_total', 'Instructions answered by the local classifier or the LLM.', 'path')
+LLM_TOKENS = Counter('ras_llm_tokens_total', 'Tokens used by LLM requests.', 'kind')
+LLM_COMPLETION_TOKENS = Histogram('ras_llm_completion_tokens', 'Completion tokens per LLM request.', TOKEN_BUCKETS)
+UNMATCHED_CONTAINERS = Counter('ras_unmatched_containers_total', 'Container descriptions that matched no container.')
+FUZZY_MATCHES = Counter('ras_fuzzy_matches_total', 'Container descriptions resolved by fuzzy matching.')
+LANDMARK_MATCHES = Counter('ras_landmark_matches_total', 'Container descriptions resolved by distance to a landmark.')
+RESOLUTION_CACHE = Counter('ras_resolution_cache_total', 'Container resolution cache lookups.', 'result')
+POSE_CACHE = Counter('ras_pose_cache_total', 'Motion pose cache lookups.', 'result')
+PLACEMENT_COLLISIONS = Counter('ras_placement_collisions_total', 'Simulated placements closer than the clearance to another container.')
+PLANS = Counter('ras_plans_total', 'Generated plans by validation outcome.', 'result')
+LLM_ROUND_TRIPS = Counter('ras_llm_round_trips_total', 'LLM requests for generated plans, by purpose.', 'kind')
+INVALID_STEPS = Counter('ras_invalid_steps_total', 'Generated steps that failed validation, by outcome.', 'outcome')
+
+# Times a block and records it under a stage name
+class Span:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        STAGE_DURATION.observe(time.perf_counter() - self.start, self.stage)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(1, self.stage)
+
+# Stand-in returned while metrics are disabled
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+NULL_SPAN = NullSpan()
+
+# Function to time a block: with metrics.span('stage'): ...
+def span(stage):
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(stage)
+
+# Decorator that times every call of a function (or coroutine function) as a stage
+def timed(stage):
+    def decorate(function):
+        if inspect.iscoroutinefunction(function):
+            @wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                if not ENABLED:
+                    return await function(*args, **kwargs)
+                with Span(stage):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            with Span(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# Function to record the token usage reported by a chat completion response
+def record_usage(response):
+    usage = response.get('usage') if hasattr(response, 'get') else None
+    if not usage:
+        return
+    LLM_TOKENS.inc(usage.get('prompt_tokens', 0), 'prompt')
+    LLM_TOKENS.inc(usage.get('completion_tokens', 0), 'completion')
+    LLM_COMPLETION_TOKENS.observe(usage.get('completion_tokens', 0))
+
+# Function to render every metric in Prometheus text format
+def render():
+    lines = []
+    with _lock:
+        for metric in _registry:
+            lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# Content type for the /metrics endpoint
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -0,0 +1,194 @@
+import os
+import sys
+import threading
+
+# Store containers from the asset store as compact Container objects (set to 0 for plain dicts)
+COMPACT_CONTAINERS = os.environ.get('RAS_COMPACT_CONTAINERS', '1') != '0'
+
+# Enum-like attributes that are normalized and interned to small integers at load time
+INTERNED_FIELDS = ('type', 'size', 'content_name', 'content_color', 'landmark')
+FIELDS = ('id', 'aruco_id', 'type', 'size', 'content_name', 'content_color', 'content_volume', 'landmark', 'position')
+
+# Function to normalize an attribute value for comparison
+def normalize_value(value):
+    return str(value).strip().lower()
+
+# Intern table for the enum-like values; code 0 is None
+# Every distinct value gets a value code and keeps its original form for display ('Copper Sulphate', 250);
+# values that normalize to the same text share a key code, which is what matching compares
+class Vocabulary:
+    def __init__(self):
+        self.values = [None]
+        self.value_codes = {}
+        self.keys = [0]
+        self.strings = [None]
+        self.codes = {}
+        self._lock = threading.Lock()
+
+    # Function to return the value code of a value, adding it if it is new
+    def encode(self, value):
+        if value is None:
+            return 0
+        try:
+            entry = (type(value), value)
+            code = self.value_codes.get(entry)
+        except TypeError:
+            # Unhashable values are told apart by their repr
+            entry = (type(value), repr(value))
+            code = self.value_codes.get(entry)
+        if code is None:
+            with self._lock:
+                code = self.value_codes.get(entry)
+                if code is None:
+                    text = normalize_value(value)
+                    key = self.codes.get(text)
+                    if key is None:
+                        key = self.codes[text] = len(self.strings)
+                        self.strings.append(sys.intern(text))
+                    code = len(self.values)
+                    self.values.append(sys.intern(value) if type(value) is str else value)
+                    self.keys.append(key)
+                    self.value_codes[entry] = code
+        return code
+
+    # Function to return the key code of a value, or None if no value with that key has been seen
+    def find(self, value):
+        if value is None:
+            return 0
+        return self.codes.get(normalize_value(value))
+
+    def decode(self, code):
+        return self.values[code]
+
+# Shared by every Container so codes compare across inventories
+VOCABULARY = Vocabulary()
+
+# Marks a field the source data did not have
+class Missing:
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'MISSING'
+
+    def __reduce__(self):
+        return 'MISSING'
+
+MISSING = Missing()
+
+_FIELD_SET = frozenset(FIELDS)
+_INTERNED_SET = frozenset(INTERNED_FIELDS)
+
+# Slotted container record; interned fields hold VOCABULARY value codes
+# Supports the dict operations the pipeline uses (container['type'], .get, .copy, ...) and returns the original values
+class Container:
+    __slots__ = FIELDS + ('extra',)
+
+    def __init__(self, data=()):
+        data = dict(data)
+        strings = VOCABULARY
+        self.id = data.pop('id', MISSING)
+        self.aruco_id = data.pop('aruco_id', MISSING)
+        self.type = strings.encode(data.pop('type')) if 'type' in data else MISSING
+        self.size = strings.encode(data.pop('size')) if 'size' in data else MISSING
+        self.content_name = strings.encode(data.pop('content_name')) if 'content_name' in data else MISSING
+        self.content_color = strings.encode(data.pop('content_color')) if 'content_color' in data else MISSING
+        self.content_volume = data.pop('content_volume', MISSING)
+        self.landmark = strings.encode(data.pop('landmark')) if 'landmark' in data else MISSING
+        position = data.pop('position', MISSING)
+        self.position = tuple(position) if isinstance(position, list) else position
+        # Fields outside the standard set are kept as they are
+        self.extra = data or None
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is MISSING:
+                raise KeyError(key)
+            return VOCABULARY.values[value] if key in _INTERNED_SET else value
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is MISSING:
+                return default
+            return VOCABULARY.values[value] if key in _INTERNED_SET else value
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        if key in _INTERNED_SET:
+            setattr(self, key, VOCABULARY.encode(value))
+        elif key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return getattr(self, key) is not MISSING
+        return self.extra is not None and key in self.extra
+
+    def __iter__(self):
+        for field in FIELDS:
+            if getattr(self, field) is not MISSING:
+                yield field
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def copy(self):
+        container = Container.__new__(Container)
+        container.id = self.id
+        container.aruco_id = self.aruco_id
+        container.type = self.type
+        container.size = self.size
+        container.content_name = self.content_name
+        container.content_color = self.content_color
+        container.content_volume = self.content_volume
+        container.landmark = self.landmark
+        container.position = self.position
+        container.extra = dict(self.extra) if self.extra is not None else None
+        return container
+
+    # Function to convert back into a plain dict
+    def to_dict(self):
+        return {key: self[key] for key in self}
+
+    def __eq__(self, other):
+        if isinstance(other, Container):
+            return all(getattr(self, slot) == getattr(other, slot) for slot in Container.__slots__)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+# Function to convert container dicts into compact Container objects
+def compact_containers(containers):
+    return [container if isinstance(container, Container) else Container(container) for container in containers]
+
+# Function to map container ids to positions, for compact containers or plain dicts
+def position_map(containers):
+    if containers and isinstance(containers[0], Container):
+        return {container.id: container.position for container in containers}
+    return {container['id']: container['position'] for container in containers}
@@ -0,0 +1,207 @@
+# module_grammar.py
+# Formal grammar of the pick/pour/place/moveto call language
+# GBNF_GRAMMAR constrains decoding on backends that accept a grammar (llama.cpp); validate_sequence checks any output in one pass
+
+import re
+import threading
+
+import metrics
+from container_index import normalize_key
+from module_parser import NumberNode, ParseError, Parser, StringNode, WordNode
+
+# Keys allowed in a container description (id and aruco_id appear once containers are resolved)
+CONTAINER_KEYS = ('type', 'size', 'content_name', 'content_color', 'content_volume', 'landmark', 'id', 'aruco_id')
+# Words accepted where a coordinate is optional
+NO_LOCATION = ('none', 'null')
+
+# Argument kinds per module: container, location (x, y, z) or a word, or any scalar value
+MODULES = {
+    'pick': {'container': 'container'},
+    'pour': {'original_container': 'container', 'destination_container': 'container', 'volume': 'value'},
+    'place': {'container': 'container', 'destination_location': 'location', 'landmark': 'value'},
+    'moveto': {'original_container': 'container', 'destination': 'location', 'landmark': 'value'},
+}
+REQUIRED = {
+    'pick': ('container',),
+    'pour': ('original_container', 'destination_container'),
+    'place': ('container',),
+    'moveto': ('original_container',),
+}
+
+# Canonical form of the language, in llama.cpp GBNF (also readable as EBNF)
+GBNF_GRAMMAR = r'''root        ::= call ("\n\n" call)* "\n"?
+call        ::= pick | pour | place | moveto
+pick        ::= "pick(container=" container ")"
+pour        ::= "pour(original_container=" container ", destination_container=" destination ", volume=" value ")"
+place       ::= "place(container=" container ", destination_location=" location ", landmark=" value ")"
+moveto      ::= "moveto(original_container=" container ", destination=" location ", landmark=" value ")"
+destination ::= container | "\"active container\""
+container   ::= "{" entry (", " entry)* "}"
+entry       ::= key ": " value
+key         ::= "type" | "size" | "content_name" | "content_color" | "content_volume" | "landmark" | "id" | "aruco_id"
+location    ::= "(" number ", " number ", " number ")" | "\"none\"" | "\"null\""
+value       ::= string | number
+string      ::= "\"" [^"\\\n]* "\""
+number      ::= "-"? [0-9]+ ("." [0-9]+)?
+'''
+# Same grammar for a single call, used when repairing one step
+GBNF_STEP_GRAMMAR = GBNF_GRAMMAR.replace('root        ::= call ("\\n\\n" call)* "\\n"?', 'root        ::= call', 1)
+
+# A step is a call to a known module at the start of a line, optionally numbered or bulleted ("2. pour(", "- place(")
+# Other word( text, such as "The container(s) are...", is prose and not a step
+STEP_START = re.compile(r'^[ \t]*(?:(?:\d+[.)]|[-*])[ \t]*)?(' + '|'.join(MODULES) + r')\(', re.MULTILINE)
+
+# One step of a generated sequence with the problems found in it
+class Step:
+    __slots__ = ('index', 'text', 'call', 'errors')
+
+    def __init__(self, index, text, call, errors):
+        self.index = index
+        self.text = text
+        self.call = call
+        self.errors = errors
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    def __repr__(self):
+        return f"Step({self.index}, {self.text!r}, errors={self.errors!r})"
+
+# Function to check a value that should be a container description
+def check_container(name, node, errors):
+    if isinstance(node, (StringNode, WordNode)) and node.value.strip().lower() == 'active container':
+        if name == 'destination_container':
+            return
+    if not hasattr(node, 'entries'):
+        errors.append(f"{name} must be a {{key: value}} container description")
+        return
+    if not node.entries:
+        errors.append(f"{name} is empty")
+    for key, value in node.entries:
+        if normalize_key(key) not in CONTAINER_KEYS:
+            errors.append(f"unknown key '{key}' in {name} (expected one of {', '.join(CONTAINER_KEYS)})")
+        elif not isinstance(value, (StringNode, NumberNode, WordNode)):
+            errors.append(f"{name}.{normalize_key(key)} must be a string or number")
+
+# Function to check a value that should be an (x, y, z) coordinate or none/null
+def check_location(name, node, errors):
+    if isinstance(node, (StringNode, WordNode)):
+        if node.value.strip().lower() not in NO_LOCATION:
+            errors.append(f"{name} must be an (x, y, z) coordinate or \"none\"")
+        return
+    items = getattr(node, 'items', None)
+    if items is None or len(items) != 3 or not all(isinstance(item, NumberNode) for item in items):
+        errors.append(f"{name} must be an (x, y, z) coordinate of three numbers")
+
+# Function to check a parsed call against the module signatures; returns a list of problems
+def check_call(call):
+    signature = MODULES.get(call.name)
+    if signature is None:
+        return [f"unknown module '{call.name}' (expected one of {', '.join(MODULES)})"]
+    errors = []
+    seen = set()
+    for argument in call.arguments:
+        if argument.name is None:
+            errors.append(f"positional argument in {call.name}(); use name=value")
+            continue
+        name = normalize_key(argument.name)
+        kind = signature.get(name)
+        if kind is None:
+            errors.append(f"unknown argument '{argument.name}' for {call.name} (expected {', '.join(signature)})")
+        elif name in seen:
+            errors.append(f"argument '{name}' given twice")
+        elif kind == 'container':
+            check_container(name, argument.value, errors)
+        elif kind == 'location':
+            check_location(name, argument.value, errors)
+        elif not isinstance(argument.value, (StringNode, NumberNode, WordNode)):
+            errors.append(f"{name} must be a string or number")
+        seen.add(name)
+    for name in REQUIRED[call.name]:
+        if name not in seen:
+            errors.append(f"missing argument '{name}' for {call.name}")
+    return errors
+
+# Function to split generated text into steps and check each one, walking the text once
+# Text that is not a step (prose, calls to unknown modules) is left out rather than repaired
+@metrics.timed('validate_sequence')
+def validate_sequence(module_sequence):
+    parser = Parser(module_sequence)
+    steps = []
+    while True:
+        match = STEP_START.search(module_sequence, parser.position)
+        if not match:
+            return steps
+        parser.position = match.start(1)
+        try:
+            call = parser.parse_call()
+        except ParseError as e:
+            # The broken call runs until the next step
+            following = STEP_START.search(module_sequence, match.end())
+            end = following.start() if following else len(module_sequence)
+            steps.append(Step(len(steps), module_sequence[match.start(1):end].strip(), None, [e.message]))
+            parser.position = end
+            continue
+        steps.append(Step(len(steps), module_sequence[call.start:call.end], call, check_call(call)))
+
+# Function to join step texts back into a module sequence
+def join_steps(texts):
+    return '\n\n'.join(texts)
+
+# Counts of LLM round trips and step repairs, for the wasted-round-trips report
+class RepairStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.plans = 0
+        self.valid_plans = 0
+        self.repaired_plans = 0
+        self.failed_plans = 0
+        self.generate_round_trips = 0
+        self.repair_round_trips = 0
+        self.invalid_steps = 0
+        self.repaired_steps = 0
+        self.dropped_steps = 0
+
+    # Function to record one plan; outcome is 'valid', 'repaired' or 'failed'
+    def record_plan(self, outcome, generate_round_trips, repair_round_trips=0, invalid_steps=0, dropped_steps=0):
+        with self._lock:
+            self.plans += 1
+            if outcome == 'valid':
+                self.valid_plans += 1
+            elif outcome == 'repaired':
+                self.repaired_plans += 1
+            else:
+                self.failed_plans += 1
+            self.generate_round_trips += generate_round_trips
+            self.repair_round_trips += repair_round_trips
+            self.invalid_steps += invalid_steps
+            self.repaired_steps += invalid_steps - dropped_steps
+            self.dropped_steps += dropped_steps
+        metrics.PLANS.inc(1, outcome)
+        metrics.LLM_ROUND_TRIPS.inc(generate_round_trips, 'generate')
+        metrics.LLM_ROUND_TRIPS.inc(repair_round_trips, 'repair')
+        metrics.INVALID_STEPS.inc(invalid_steps - dropped_steps, 'repaired')
+        metrics.INVALID_STEPS.inc(dropped_steps, 'dropped')
+
+    # Function to summarize; wasted round trips are the repair requests spent per plan that came out valid
+    def summary(self):
+        with self._lock:
+            successful = self.valid_plans + self.repaired_plans
+            return {
+                'plans': self.plans,
+                'valid_first_time': self.valid_plans,
+                'repaired': self.repaired_plans,
+                'failed': self.failed_plans,
+                'invalid_steps': self.invalid_steps,
+                'repaired_steps': self.repaired_steps,
+                'dropped_steps': self.dropped_steps,
+                'generate_round_trips': self.generate_round_trips,
+                'repair_round_trips': self.repair_round_trips,
+                'wasted_round_trips_per_successful_plan': self.repair_round_trips / successful if successful else 0.0,
+            }
+
+REPAIR_STATS = RepairStats()
@@ -0,0 +1,452 @@
+import re
+import sys
+
+import metrics
+
+# Patterns used by the scanner; each is matched at an explicit position so the text is walked once
+CALL_START = re.compile(r'(?<!\w)([A-Za-z_]\w*)\(')
+WHITESPACE = re.compile(r'\s*')
+ARGUMENT_NAME = re.compile(r'[^=,()\[\]{}\'"]*')
+DICT_KEY = re.compile(r'[^:,{}()\[\]\'"]*')
+SCALAR = re.compile(r'[^,()\[\]{}\r\n]*')
+STRINGS = {
+    '"': re.compile(r'"((?:[^"\\]|\\.)*)"', re.DOTALL),
+    "'": re.compile(r"'((?:[^'\\]|\\.)*)'", re.DOTALL),
+}
+ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+CLOSING = {')': '(', ']': '[', '}': '{'}
+
+# Error raised when a module call cannot be parsed
+class ParseError(Exception):
+    def __init__(self, message, text, position):
+        self.message = message
+        self.position = position
+        self.line = text.count('\n', 0, position) + 1
+        self.column = position - (text.rfind('\n', 0, position) + 1) + 1
+        line_end = text.find('\n', position)
+        line_start = position - self.column + 1
+        self.snippet = text[line_start:line_end if line_end != -1 else len(text)]
+        super().__init__(f"line {self.line}, column {self.column}: {message}")
+
+# AST node for a quoted string
+class StringNode:
+    __slots__ = ('value', 'start')
+
+    def __init__(self, value, start):
+        self.value = value
+        self.start = start
+
+    def to_python(self):
+        return self.value
+
+    def __repr__(self):
+        return f"StringNode({self.value!r})"
+
+# AST node for an int or float literal
+class NumberNode:
+    __slots__ = ('value', 'start')
+
+    def __init__(self, value, start):
+        self.value = value
+        self.start = start
+
+    def to_python(self):
+        return self.value
+
+    def __repr__(self):
+        return f"NumberNode({self.value!r})"
+
+# AST node for an unquoted word such as half or null
+class WordNode:
+    __slots__ = ('value', 'start')
+
+    def __init__(self, value, start):
+        self.value = value
+        self.start = start
+
+    def to_python(self):
+        return self.value
+
+    def __repr__(self):
+        return f"WordNode({self.value!r})"
+
+# AST node for a {key: value} dictionary
+class DictNode:
+    __slots__ = ('entries', 'start')
+
+    def __init__(self, entries, start):
+        self.entries = entries
+        self.start = start
+
+    def to_python(self):
+        return {key: value.to_python() for key, value in self.entries}
+
+    def __repr__(self):
+        return f"DictNode({self.entries!r})"
+
+# AST node for a (x, y, z) tuple
+class TupleNode:
+    __slots__ = ('items', 'start')
+
+    def __init__(self, items, start):
+        self.items = items
+        self.start = start
+
+    def to_python(self):
+        return tuple(item.to_python() for item in self.items)
+
+    def __repr__(self):
+        return f"TupleNode({self.items!r})"
+
+# AST node for a [a, b] list
+class ListNode:
+    __slots__ = ('items', 'start')
+
+    def __init__(self, items, start):
+        self.items = items
+        self.start = start
+
+    def to_python(self):
+        return [item.to_python() for item in self.items]
+
+    def __repr__(self):
+        return f"ListNode({self.items!r})"
+
+# AST node for one argument; name is None for a positional argument
+class Argument:
+    __slots__ = ('name', 'value', 'start')
+
+    def __init__(self, name, value, start):
+        self.name = name
+        self.value = value
+        self.start = start
+
+    def __repr__(self):
+        return f"Argument({self.name!r}, {self.value!r})"
+
+# AST node for one module call such as pick(container={...})
+class ModuleCall:
+    __slots__ = ('name', 'arguments', 'start', 'end')
+
+    def __init__(self, name, arguments, start, end):
+        self.name = name
+        self.arguments = arguments
+        self.start = start
+        self.end = end
+
+    # Function to return the keyword arguments as plain Python values
+    def params(self):
+        return {argument.name: argument.value.to_python() for argument in self.arguments if argument.name is not None}
+
+    def __repr__(self):
+        return f"ModuleCall({self.name!r}, {self.arguments!r})"
+
+# Function to convert an unquoted scalar into a number when possible
+def scalar_node(text, start):
+    if '.' in text:
+        try:
+            return NumberNode(float(text), start)
+        except ValueError:
+            pass
+    else:
+        try:
+            return NumberNode(int(text), start)
+        except ValueError:
+            pass
+    return WordNode(text, start)
+
+# Recursive-descent parser over a single string
+class Parser:
+    def __init__(self, text):
+        self.text = text
+        self.position = 0
+
+    def error(self, message, position=None):
+        return ParseError(message, self.text, self.position if position is None else position)
+
+    def skip_whitespace(self):
+        self.position = WHITESPACE.match(self.text, self.position).end()
+
+    def peek(self):
+        if self.position < len(self.text):
+            return self.text[self.position]
+        return ''
+
+    # Function to parse a call whose name starts at the current position
+    def parse_call(self):
+        start = self.position
+        match = CALL_START.match(self.text, self.position)
+        if not match:
+            raise self.error("expected a module call such as pick(...)")
+        # Module names repeat on every step; interning makes name comparisons identity checks
+        name = sys.intern(match.group(1))
+        self.position = match.end()
+        arguments = []
+        for argument_start in self.parse_items(')'):
+            arguments.append(self.parse_argument(argument_start))
+        return ModuleCall(name, arguments, start, self.position)
+
+    # Generator that positions the parser on each comma-separated item until the closing char
+    def parse_items(self, closing):
+        opening_position = self.position - 1
+        while True:
+            self.skip_whitespace()
+            char = self.peek()
+            if char == closing:
+                self.position += 1
+                return
+            if not char:
+                raise self.error(f"unclosed '{self.text[opening_position]}'", opening_position)
+            yield self.position
+            self.skip_whitespace()
+            char = self.peek()
+            if char == ',':
+                self.position += 1
+            elif char != closing:
+                found = repr(char) if char else 'end of input'
+                opened = ParseError('', self.text, opening_position)
+                raise self.error(
+                    f"expected ',' or '{closing}' but found {found} "
+                    f"(to close '{self.text[opening_position]}' at line {opened.line}, column {opened.column})"
+                )
+
+    def parse_argument(self, start):
+        if self.peek() not in '{([\'"':
+            match = ARGUMENT_NAME.match(self.text, self.position)
+            end = match.end()
+            if end < len(self.text) and self.text[end] == '=':
+                name = match.group().strip()
+                if not name:
+                    raise self.error("missing argument name before '='")
+                self.position = end + 1
+                return Argument(name, self.parse_value(), start)
+        # Positional arguments are kept in the AST but ignored by params()
+        return Argument(None, self.parse_value(), start)
+
+    # Function to parse any value at the current position
+    def parse_value(self):
+        self.skip_whitespace()
+        start = self.position
+        char = self.peek()
+        if char == '{':
+            self.position += 1
+            entries = []
+            for entry_start in self.parse_items('}'):
+                entry = self.parse_entry(entry_start)
+                if entry is not None:
+                    entries.append(entry)
+            return DictNode(entries, start)
+        if char == '(':
+            self.position += 1
+            return TupleNode([self.parse_value() for _ in self.parse_items(')')], start)
+        if char == '[':
+            self.position += 1
+            return ListNode([self.parse_value() for _ in self.parse_items(']')], start)
+        if char in ('"', "'"):
+            return StringNode(self.parse_string(), start)
+        match = SCALAR.match(self.text, self.position)
+        text = match.group().strip()
+        if not text:
+            found = repr(char) if char else 'end of input'
+            raise self.error(f"expected a value but found {found}")
+        self.position = match.end()
+        return scalar_node(text, start)
+
+    def parse_entry(self, start):
+        char = self.peek()
+        if char in ('"', "'"):
+            key = self.parse_string()
+        else:
+            match = DICT_KEY.match(self.text, self.position)
+            key = match.group().strip()
+            self.position = match.end()
+        self.skip_whitespace()
+        if self.peek() != ':':
+            # Entries without a key are skipped, as the old parser did
+            if self.peek() not in (',', '}'):
+                self.parse_value()
+            return None
+        self.position += 1
+        return key, self.parse_value()
+
+    def parse_string(self):
+        start = self.position
+        match = STRINGS[self.text[start]].match(self.text, start)
+        if not match:
+            raise self.error("unterminated string", start)
+        self.position = match.end()
+        body = match.group(1)
+        if '\\' in body:
+            body = ESCAPE.sub(r'\1', body)
+        return body
+
+# Function to parse a single module call string into a ModuleCall node
+def parse_call(module_call_str):
+    parser = Parser(module_call_str)
+    parser.skip_whitespace()
+    call = parser.parse_call()
+    parser.skip_whitespace()
+    if parser.position != len(module_call_str):
+        raise parser.error("unexpected text after module call")
+    return call
+
+# Function to parse every module call in a block of text
+# In lenient mode text between calls is skipped and failed calls are reported in errors
+@metrics.timed('parse_calls')
+def parse_calls(module_sequence, strict=False, errors=None):
+    parser = Parser(module_sequence)
+    calls = []
+    while True:
+        if strict:
+            parser.skip_whitespace()
+            if parser.position == len(module_sequence):
+                return calls
+            calls.append(parser.parse_call())
+            continue
+        match = CALL_START.search(module_sequence, parser.position)
+        if not match:
+            return calls
+        parser.position = match.start()
+        try:
+            calls.append(parser.parse_call())
+        except ParseError as e:
+            if errors is not None:
+                errors.append(e)
+            else:
+                print(f"Error parsing module call '{match.group(1)}(...)': {e}")
+            parser.position = match.end()
+
+# Function to parse module calls (kept for the old (name, params) interface)
+@metrics.timed('parse_module_call')
+def parse_module_call(module_call_str):
+    try:
+        call = parse_call(module_call_str)
+    except ParseError as e:
+        print(f"Error parsing module call '{module_call_str}': {e}")
+        return None, {}
+    return call.name, call.params()
+
+# Function to parse a module sequence into (name, params) pairs
+def parse_module_sequence(module_sequence):
+    return [(call.name, call.params()) for call in parse_calls(module_sequence)]
+
+# Parser that accepts text in chunks and emits each call as soon as its closing parenthesis arrives
+# Calls that fail to parse are skipped the way parse_calls skips them, so the same text gives the same calls
+class IncrementalParser:
+    def __init__(self):
+        self.buffer = ''
+        self.errors = []
+        self._call_start = None
+        self._name_end = 0
+        self._scan = 0
+        # Open brackets of the current call as [bracket, item state], innermost last
+        self._open = []
+        self._quote = ''
+        self._escaped = False
+
+    # Function to add a chunk of text and return the calls it completed
+    def feed(self, chunk):
+        self.buffer += chunk
+        calls = []
+        while True:
+            if self._call_start is None:
+                match = CALL_START.search(self.buffer, self._scan)
+                if not match:
+                    # Keep a possible partial call name (and the character before it) for the next chunk
+                    tail = len(self.buffer)
+                    while tail > 0 and (self.buffer[tail - 1].isalnum() or self.buffer[tail - 1] == '_'):
+                        tail -= 1
+                    self.buffer = self.buffer[max(tail - 1, 0):]
+                    self._scan = 0
+                    return calls
+                self._call_start = match.start()
+                self._name_end = match.end()
+                self._scan = match.end()
+                self._open = [['(', 'start']]
+                self._quote = ''
+                self._escaped = False
+            end = self._find_call_end()
+            if end is None:
+                return calls
+            call_text = self.buffer[self._call_start:abs(end)]
+            try:
+                calls.append(parse_call(call_text))
+                resume = abs(end)
+            except ParseError as e:
+                self.errors.append(e)
+                # As in parse_calls, look for the next call right after the failed call's name
+                resume = self._name_end
+            self.buffer = self.buffer[resume:]
+            self._call_start = None
+            self._scan = 0
+
+    # Function to advance the bracket/quote state; returns the end of the call once it closes,
+    # or minus the position of a closing bracket that does not match (the call cannot parse)
+    # Each open bracket tracks where its current item is, following Parser: a quote only opens a string at the start
+    # of an item, a key or a value ('start'/'value'); inside an argument name, dict key or unquoted value it is text (it's water)
+    def _find_call_end(self):
+        buffer = self.buffer
+        opened = self._open
+        quote = self._quote
+        escaped = self._escaped
+        position = self._scan
+        length = len(buffer)
+        while position < length:
+            char = buffer[position]
+            position += 1
+            if quote:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == quote:
+                    quote = ''
+                continue
+            if char.isspace():
+                continue
+            level = opened[-1]
+            state = level[1]
+            if char in '"\'':
+                # A dict key stops at a quote and the parser reads a string from there
+                if state in ('start', 'value') or (state == 'name' and level[0] == '{'):
+                    quote = char
+                level[1] = 'token'
+            elif char in '([{':
+                level[1] = 'token'
+                opened.append([char, 'start'])
+            elif char in CLOSING:
+                if CLOSING[char] != level[0]:
+                    return -position
+                opened.pop()
+                if not opened:
+                    return position
+            elif char == ',':
+                level[1] = 'start'
+            elif char == '=' and len(opened) == 1 and state in ('start', 'name'):
+                level[1] = 'value'
+            elif char == ':' and level[0] == '{' and state in ('start', 'name'):
+                level[1] = 'value'
+            elif state == 'start':
+                # Arguments of the call and dict entries start with a name; tuple and list items are values
+                level[1] = 'name' if len(opened) == 1 or level[0] == '{' else 'token'
+            elif state == 'value':
+                level[1] = 'token'
+        self._quote = quote
+        self._escaped = escaped
+        self._scan = position
+        return None
+
+    # Function to finish the stream and return the calls after an unterminated one, as parse_calls finds them
+    # The unterminated call itself is recorded in errors
+    def finish(self):
+        calls = []
+        if self._call_start is not None:
+            calls = parse_calls(self.buffer[self._call_start:], errors=self.errors)
+            self._call_start = None
+        self.buffer = ''
+        return calls
+
+    # Function to finish the stream and return the parse errors; calls still pending are dropped unless finish() ran first
+    def close(self):
+        self.finish()
+        return self.errors
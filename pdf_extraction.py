@@ -0,0 +1,142 @@
+import hashlib
+import io
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+
+# PyPDF2 is imported on first use to keep startup fast
+
+ALLOWED_EXTENSIONS = {'pdf'}
+
+# Page-parallel extraction settings
+PDF_WORKERS = int(os.environ.get('RAS_PDF_WORKERS', os.cpu_count() or 2))
+PAGES_PER_TASK = int(os.environ.get('RAS_PDF_PAGES_PER_TASK', 8))
+
+# Extracted text is cached by the SHA-256 of the uploaded file
+TEXT_CACHE_FOLDER = os.path.join('uploads', '.text_cache')
+TEXT_CACHE_ENTRIES = 32
+
+_pool = None
+_pool_lock = threading.Lock()
+_text_cache = OrderedDict()
+_text_cache_lock = threading.Lock()
+_snapshot_ids = itertools.count(1)
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+# Function to get the shared extraction process pool
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+        return _pool
+
+# Function to read a file's contents and their hash
+# Everything after this works on these bytes, so a re-upload to the same path cannot mix two documents
+def read_document(file_path):
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    return data, hashlib.sha256(data).hexdigest()
+
+# Function to look up previously extracted text by content hash
+def get_cached_text(content_hash):
+    with _text_cache_lock:
+        text = _text_cache.get(content_hash)
+        if text is not None:
+            _text_cache.move_to_end(content_hash)
+            return text
+    cache_path = os.path.join(TEXT_CACHE_FOLDER, content_hash + '.txt')
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            text = file.read()
+    except OSError:
+        return None
+    remember_text(content_hash, text)
+    return text
+
+def remember_text(content_hash, text):
+    with _text_cache_lock:
+        _text_cache[content_hash] = text
+        _text_cache.move_to_end(content_hash)
+        while len(_text_cache) > TEXT_CACHE_ENTRIES:
+            _text_cache.popitem(last=False)
+
+# Function to store extracted text in memory and on disk
+def store_text(content_hash, text):
+    remember_text(content_hash, text)
+    os.makedirs(TEXT_CACHE_FOLDER, exist_ok=True)
+    cache_path = os.path.join(TEXT_CACHE_FOLDER, content_hash + '.txt')
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(temp_path, cache_path)
+
+# Function to write a private copy of a document for the worker processes, which open it by path
+def write_snapshot(data, content_hash):
+    os.makedirs(TEXT_CACHE_FOLDER, exist_ok=True)
+    snapshot_path = os.path.join(TEXT_CACHE_FOLDER, f'{content_hash}.{os.getpid()}.{next(_snapshot_ids)}.pdf')
+    with open(snapshot_path, 'wb') as file:
+        file.write(data)
+    return snapshot_path
+
+# Function to extract the text of pages [start, stop) (runs in a worker process)
+def extract_page_range(file_path, start, stop):
+    import PyPDF2
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return ''.join(reader.pages[number].extract_text() or '' for number in range(start, stop))
+
+# Generator that yields (start_page, stop_page, text) chunks in page order as they finish
+# A cache hit yields the whole text as one chunk with stop_page None
+def iter_pdf_chunks(file_path, pages_per_task=PAGES_PER_TASK):
+    data, content_hash = read_document(file_path)
+    cached = get_cached_text(content_hash)
+    if cached is not None:
+        yield 0, None, cached
+        return
+
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    total_pages = len(reader.pages)
+    # Every task re-opens the document, so keep the task count near a few per worker
+    pages_per_task = max(pages_per_task, -(-total_pages // (PDF_WORKERS * 4)))
+    ranges = [(start, min(start + pages_per_task, total_pages)) for start in range(0, total_pages, pages_per_task)]
+    chunks = []
+    if len(ranges) <= 1 or PDF_WORKERS <= 1:
+        # Small documents or a single worker are not worth a round trip to the pool
+        for start, stop in ranges:
+            text = ''.join(reader.pages[number].extract_text() or '' for number in range(start, stop))
+            chunks.append(text)
+            yield start, stop, text
+    else:
+        # The workers read a private snapshot of the bytes hashed above, never the upload path
+        snapshot_path = write_snapshot(data, content_hash)
+        pool = get_pool()
+        futures = [(start, stop, pool.submit(extract_page_range, snapshot_path, start, stop)) for start, stop in ranges]
+        try:
+            for start, stop, future in futures:
+                text = future.result()
+                chunks.append(text)
+                yield start, stop, text
+        finally:
+            for _, _, future in futures:
+                future.cancel()
+            os.remove(snapshot_path)
+    try:
+        store_text(content_hash, ''.join(chunks))
+    except OSError as e:
+        print(f"Error caching PDF text: {e}")
+
+@metrics.timed('extract_text_from_pdf')
+def extract_text_from_pdf(file_path):
+    # Extract text from the uploaded PDF
+    try:
+        return ''.join(text for _, _, text in iter_pdf_chunks(file_path))
+    except Exception as e:
+        return f"Error reading PDF: {str(e)}"
@@ -0,0 +1,188 @@
+# pipeline_client.py
+# Thin clients for the pipeline daemon (pipeline_daemon.py); only the standard library is imported here
+# Usage: python pipeline_client.py {ping,metrics,generate,resolve,compile,extract,stop} ...
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Daemon settings
+SOCKET_PATH = os.environ.get('RAS_DAEMON_SOCKET') or os.path.join(tempfile.gettempdir(), f'ras_pipeline_{os.getuid()}.sock')
+AUTOSTART = os.environ.get('RAS_DAEMON_AUTOSTART', '1') == '1'
+START_TIMEOUT = float(os.environ.get('RAS_DAEMON_START_TIMEOUT', 30))
+DAEMON_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pipeline_daemon.py')
+# Same default as asset_store.DEFAULT_ASSETS_PATH; it is relative to the caller's directory, not the daemon's
+DEFAULT_ASSETS_PATH = os.environ.get('RAS_CONTAINER_ASSETS', os.path.join('Downloads', 'container_assets.yaml'))
+
+# Error returned by the daemon, or raised when it cannot be reached
+class DaemonError(Exception):
+    pass
+
+# Function to check whether a daemon is accepting connections on the socket
+def is_running(path=SOCKET_PATH):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+        return True
+    except OSError:
+        return False
+
+# Function to start a daemon in the background and wait until it is ready
+def start_daemon(path=SOCKET_PATH, assets=None):
+    command = [sys.executable, DAEMON_SCRIPT, '--socket', path]
+    if assets:
+        command += ['--assets', os.path.abspath(assets)]
+    with open(path + '.log', 'ab') as log:
+        process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if is_running(path):
+            return process
+        if process.poll() is not None:
+            raise DaemonError(f"pipeline daemon exited during startup, see {path}.log")
+        time.sleep(0.02)
+    raise DaemonError(f"pipeline daemon did not start within {START_TIMEOUT:g} seconds")
+
+# One connection to the daemon; requests and responses are JSON lines
+class PipelineClient:
+    def __init__(self, path=SOCKET_PATH, autostart=AUTOSTART):
+        self.path = path
+        self.autostart = autostart
+        self.sock = None
+        self.reader = None
+
+    def connect(self):
+        try:
+            self._open()
+        except (FileNotFoundError, ConnectionRefusedError):
+            if not self.autostart:
+                raise DaemonError(f"pipeline daemon is not running on {self.path}")
+            start_daemon(self.path)
+            self._open()
+
+    def _open(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+
+    # Function to run one operation on the daemon and return its result
+    # Diagnostics the daemon returns (unmatched containers, collisions) are appended to errors when a list is given,
+    # printed to stderr otherwise
+    def call(self, op, errors=None, **params):
+        if self.sock is None:
+            self.connect()
+        self.sock.sendall((json.dumps(dict(params, op=op)) + '\n').encode('utf-8'))
+        line = self.reader.readline()
+        if not line:
+            self.close()
+            raise DaemonError('pipeline daemon closed the connection')
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise DaemonError(response.get('error'))
+        for message in response.get('errors', ()):
+            if errors is not None:
+                errors.append(message)
+            else:
+                print(message, file=sys.stderr)
+        return response.get('result')
+
+    def close(self):
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+            self.sock = None
+            self.reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Function to read a positional argument, a file, or stdin
+def read_input(value):
+    if value is None or value == '-':
+        return sys.stdin.read()
+    with open(value, 'r') as file:
+        return file.read()
+
+# Function to run one daemon operation for a command line entry point and print its result
+def run_command(op, output=None, **params):
+    try:
+        with PipelineClient() as client:
+            result = client.call(op, **params)
+    except DaemonError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not isinstance(result, str):
+        result = json.dumps(result)
+    if output:
+        with open(output, 'w') as file:
+            file.write(result)
+    else:
+        sys.stdout.write(result if result.endswith('\n') else result + '\n')
+
+# Entry point: natural-language instruction -> module sequence
+def nlp_call_main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a module sequence for an instruction')
+    parser.add_argument('instruction', nargs='?', help='instruction text (default: stdin)')
+    parser.add_argument('--backend', help='LLM backend name (default: RAS_LLM_BACKEND on the daemon)')
+    args = parser.parse_args(argv)
+    instruction = args.instruction if args.instruction else sys.stdin.read()
+    run_command('generate', instruction=instruction, api_key=os.environ.get('OPENAI_API_KEY'), backend=args.backend)
+
+# Entry point: module sequence -> behavior tree YAML
+def port_to_bt_main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile a module sequence into behavior tree YAML')
+    parser.add_argument('input', nargs='?', default='-', help='module sequence file (default: stdin)')
+    parser.add_argument('-o', '--output', help='YAML file to write (default: stdout)')
+    parser.add_argument('--assets', help=f'container assets YAML (default: {DEFAULT_ASSETS_PATH})')
+    args = parser.parse_args(argv)
+    run_command('compile', args.output, module_sequence=read_input(args.input), assets=os.path.abspath(args.assets or DEFAULT_ASSETS_PATH))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Talk to the pipeline daemon')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('ping', help='start the daemon if needed and show its status')
+    commands.add_parser('stop', help='stop the daemon')
+    commands.add_parser('metrics', help='show the daemon metrics in Prometheus text format')
+    generate = commands.add_parser('generate', help='instruction -> module sequence')
+    generate.add_argument('instruction', nargs='?')
+    generate.add_argument('--backend')
+    for name, help_text in (('resolve', 'module sequence -> module sequence with container ids'),
+                            ('compile', 'module sequence -> behavior tree YAML')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('input', nargs='?', default='-')
+        command.add_argument('-o', '--output')
+        command.add_argument('--assets')
+    extract = commands.add_parser('extract', help='PDF -> text')
+    extract.add_argument('pdf')
+    args = parser.parse_args(argv)
+
+    if args.command == 'stop':
+        if not is_running():
+            print("Pipeline daemon is not running")
+            return
+        with PipelineClient(autostart=False) as client:
+            client.call('shutdown')
+    elif args.command in ('ping', 'metrics'):
+        run_command(args.command)
+    elif args.command == 'generate':
+        nlp_call_main(([args.instruction] if args.instruction else []) + (['--backend', args.backend] if args.backend else []))
+    elif args.command == 'extract':
+        run_command('extract_pdf', path=os.path.abspath(args.pdf))
+    else:
+        run_command(args.command, args.output, module_sequence=read_input(args.input), assets=os.path.abspath(args.assets or DEFAULT_ASSETS_PATH))
+
+if __name__ == '__main__':
+    main()
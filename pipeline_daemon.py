@@ -0,0 +1,148 @@
+# pipeline_daemon.py
+# Long-lived worker that keeps the asset index, parser and LLM client warm between calls
+# Start with: python pipeline_daemon.py  (pipeline_client.py starts it on demand)
+
+import argparse
+import importlib
+import json
+import os
+import socketserver
+import threading
+import time
+
+import api_calls
+import asset_store
+import llm_backends
+import metrics
+from asset_mapper import process_module_sequence
+from bt_compiler import compile_module_sequence
+from module_parser import parse_calls
+from pdf_extraction import extract_text_from_pdf
+from pipeline_client import SOCKET_PATH, is_running
+
+WARM_UP_SEQUENCE = 'pick(container={type: "beaker", content_color: "blue"})'
+
+# Function to load everything the first request would otherwise pay for
+def warm_up(assets=None):
+    index = asset_store.get_store(assets).index()
+    index.postings
+    index.fuzzy
+    parse_calls(WARM_UP_SEQUENCE)
+    import intent_classifier
+    intent_classifier.get_default_classifier()
+    # Imported for their load time only; the modules that use them import them again on first use
+    for module_name in ('openai', 'PyPDF2', 'yaml'):
+        importlib.import_module(module_name)
+
+def op_ping(server, request):
+    return {
+        'pid': os.getpid(),
+        'uptime': time.monotonic() - server.started,
+        'requests': server.request_count,
+    }
+
+def op_generate(server, request):
+    backend = llm_backends.get_backend(request.get('backend'))
+    api_key = request.get('api_key') or os.environ.get('OPENAI_API_KEY')
+    if backend.requires_api_key and not api_key:
+        raise ValueError('OpenAI API key not found in environment variables')
+    return api_calls.generate_module_sequence(request['instruction'], api_key, backend=backend)
+
+# Unmatched containers, collisions and parse errors go back to the client in the response's errors, not to the daemon log
+def op_resolve(server, request, errors):
+    containers = asset_store.get_store(request.get('assets') or server.assets).index()
+    return process_module_sequence(request['module_sequence'], containers, errors)
+
+def op_compile(server, request, errors):
+    containers = asset_store.get_store(request.get('assets') or server.assets).index()
+    return compile_module_sequence(request['module_sequence'], containers, errors=errors)
+
+def op_extract_pdf(server, request):
+    return extract_text_from_pdf(request['path'])
+
+def op_metrics(server, request):
+    return metrics.render()
+
+def op_shutdown(server, request):
+    # shutdown() waits for serve_forever to return, so it cannot run on this handler's thread
+    threading.Thread(target=server.shutdown, daemon=True).start()
+    return 'shutting down'
+
+OPERATIONS = {
+    'ping': op_ping,
+    'generate': op_generate,
+    'resolve': op_resolve,
+    'compile': op_compile,
+    'extract_pdf': op_extract_pdf,
+    'metrics': op_metrics,
+    'shutdown': op_shutdown,
+}
+# Operations that also take a list for their diagnostics
+DIAGNOSED_OPERATIONS = (op_resolve, op_compile)
+
+# Handles one client connection; each line is a JSON request answered by one JSON line
+class PipelineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                operation = OPERATIONS.get(request.get('op'))
+                if operation is None:
+                    raise ValueError(f"unknown operation {request.get('op')!r}")
+                with self.server.count_lock:
+                    self.server.request_count += 1
+                if operation in DIAGNOSED_OPERATIONS:
+                    errors = []
+                    response = {'ok': True, 'result': operation(self.server, request, errors), 'errors': errors}
+                else:
+                    response = {'ok': True, 'result': operation(self.server, request)}
+            except Exception as e:
+                print(f"Error handling request: {e}")
+                response = {'ok': False, 'error': str(e)}
+            self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+class PipelineServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, assets=None):
+        self.assets = assets
+        self.started = time.monotonic()
+        self.request_count = 0
+        self.count_lock = threading.Lock()
+        # Only the owner may connect
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, PipelineHandler)
+        finally:
+            os.umask(old_umask)
+
+# Function to warm up and serve until a shutdown request arrives
+def serve(path=SOCKET_PATH, assets=None):
+    if os.path.exists(path):
+        if is_running(path):
+            print(f"Error: a pipeline daemon is already running on {path}")
+            return
+        # Left behind by a daemon that did not exit cleanly
+        os.unlink(path)
+    start = time.perf_counter()
+    warm_up(assets)
+    # The socket only appears once warm-up is done, so clients never wait on a cold daemon
+    server = PipelineServer(path, assets)
+    print(f"Pipeline daemon {os.getpid()} ready on {path} after {time.perf_counter() - start:.2f} s", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the pipeline daemon')
+    parser.add_argument('--socket', default=SOCKET_PATH, help='Unix socket path')
+    parser.add_argument('--assets', help='container assets YAML (default: asset_store.DEFAULT_ASSETS_PATH)')
+    args = parser.parse_args()
+    serve(args.socket, args.assets)
+
+if __name__ == '__main__':
+    main()
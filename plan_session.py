@@ -0,0 +1,343 @@
+# plan_session.py
+# Editable plan that re-simulates only what an edit can change
+# Container state is kept as copy-on-write overlays on the starting inventory, checkpointed every CHECKPOINT_INTERVAL steps
+# Results are simulated lazily up to the step asked for; an edit restarts from the last checkpoint before it,
+# and once the new state matches an old checkpoint further on, everything after that checkpoint is kept
+
+import bisect
+import os
+
+from asset_mapper import CONTAINER_PARAMS, held_after, is_active_container, resolve_containers
+from container_index import ensure_index
+from future_positions import apply_module
+from module_grammar import join_steps
+from module_parser import ParseError, parse_call, parse_calls
+
+CHECKPOINT_INTERVAL = int(os.environ.get('RAS_CHECKPOINT_INTERVAL', 64))
+
+# One step of the plan: its text and its parameters resolved against the inventory
+# Steps that say "active container" also keep their parsed parameters, to be resolved again when the held container changes
+class PlanStep:
+    __slots__ = ('text', 'name', 'params', 'raw')
+
+    def __init__(self, text, name, params, raw=None):
+        self.text = text
+        self.name = name
+        self.params = params
+        self.raw = raw
+
+    def __repr__(self):
+        return f"PlanStep({self.text!r})"
+
+# Container state as the containers changed since the start; a container is copied the first time a step touches it
+# Overlays handed out by snapshot() are never written to again, so checkpoints can share container objects
+class CopyOnWriteState:
+    def __init__(self, base, overlay=None):
+        self.base = base
+        self.overlay = dict(overlay) if overlay else {}
+        self.owned = set()
+
+    # Function to return a container for writing (apply_module looks containers up with get)
+    def get(self, container_id):
+        if container_id in self.owned:
+            return self.overlay[container_id]
+        container = self.peek(container_id)
+        if container is None:
+            return None
+        container = container.copy()
+        self.overlay[container_id] = container
+        self.owned.add(container_id)
+        return container
+
+    # Function to return a container for reading only
+    def peek(self, container_id):
+        container = self.overlay.get(container_id)
+        if container is None:
+            container = self.base.get(container_id)
+        return container
+
+    # Function to freeze the current overlay for a checkpoint and keep writing to copies
+    def snapshot(self):
+        self.owned = set()
+        return dict(self.overlay)
+
+    # Function to check whether this state equals a checkpoint overlay taken over the same base
+    def same_as(self, overlay):
+        for container_id in self.overlay.keys() | overlay.keys():
+            mine = self.peek(container_id)
+            theirs = overlay.get(container_id)
+            if theirs is None:
+                theirs = self.base.get(container_id)
+            if mine is not theirs and mine != theirs:
+                return False
+        return True
+
+    # Function to list every container in inventory order
+    def containers(self):
+        overlay = self.overlay
+        return [overlay.get(container['id'], container) for container in self.base.containers]
+
+# Function to find the length of the common prefix of two strings (slice comparisons run in C)
+def common_prefix_length(a, b):
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+# Function to find the length of the common suffix of two strings, not reaching into the first limit characters
+def common_suffix_length(a, b, limit=0):
+    low, high = 0, min(len(a), len(b)) - limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+# Editable, incrementally simulated plan
+class PlanSession:
+    def __init__(self, containers, module_sequence='', checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.index = ensure_index(containers)
+        self.checkpoint_interval = max(1, checkpoint_interval)
+        self.steps = []
+        # Touched {id: position} after each step; valid below the frontier
+        self.records = []
+        # Overlays after the first n steps: verified ones up to the frontier, ones from before an edit after it
+        self.checkpoints = {0: {}}
+        self.pending = {}
+        # Edited step indices at or after the frontier; pending overlays after one of them are not trusted past it
+        self.dirty = []
+        self.frontier = 0
+        self.last_checkpoint = 0
+        self.state = CopyOnWriteState(self.index)
+        self._text = None
+        self._ends = None
+        if module_sequence:
+            self.insert(0, module_sequence)
+
+    def __len__(self):
+        return len(self.steps)
+
+    # Function to parse and resolve the calls in a piece of text; calls that fail to parse are reported and skipped
+    # held is the container picked up before the text, for "active container"
+    def parse_steps(self, text, errors=None, held=None):
+        steps = []
+        for call in parse_calls(text, errors=errors):
+            step = self.resolve_step(text[call.start:call.end], call, held)
+            held = held_after(step.name, step.params, held)
+            steps.append(step)
+        return steps
+
+    # Function to resolve a parsed call into a step, for the container held before it
+    def resolve_step(self, text, call, held):
+        raw = call.params()
+        if not any(is_active_container(raw.get(name)) for name in CONTAINER_PARAMS):
+            raw = None
+        return PlanStep(text, call.name, resolve_containers(call.name, call.params(), self.index, held=held), raw)
+
+    # Function to resolve again the steps from position on that say "active container", up to the next pick or place
+    # (the ones after it do not depend on what was held before); returns the steps up to the last one that changed
+    def resolve_following(self, position, held):
+        steps = []
+        changed = 0
+        for step in self.steps[position:]:
+            if step.raw is not None:
+                params = resolve_containers(step.name, dict(step.raw), self.index, held=held)
+                if params != step.params:
+                    step = PlanStep(step.text, step.name, params, step.raw)
+                    changed = len(steps) + 1
+            steps.append(step)
+            if step.name in ('pick', 'place'):
+                break
+        return steps[:changed]
+
+    # Function to find the container held before step index (steps are resolved against it when they are parsed)
+    def held_before(self, index):
+        for position in range(min(index, len(self.steps)) - 1, -1, -1):
+            step = self.steps[position]
+            if step.name in ('pick', 'place'):
+                return held_after(step.name, step.params, None)
+        return None
+
+    # Plan text with the steps separated by blank lines
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = join_steps([step.text for step in self.steps])
+        return self._text
+
+    # Function to replace one step with a single module call; returns False if the text does not parse
+    def edit(self, index, text, errors=None):
+        try:
+            call = parse_call(text)
+        except ParseError as e:
+            if errors is not None:
+                errors.append(e)
+            else:
+                print(f"Error parsing module call for step {index}: {e}")
+            return False
+        self.replace_steps(index, 1, [self.resolve_step(text.strip(), call, self.held_before(index))])
+        return True
+
+    # Function to insert the module calls in text before step index; returns how many were inserted
+    def insert(self, index, text, errors=None):
+        steps = self.parse_steps(text, errors, self.held_before(index))
+        self.replace_steps(index, 0, steps)
+        return len(steps)
+
+    def delete(self, index, count=1):
+        self.replace_steps(index, count, [])
+
+    # Function to take a whole new plan text and re-parse only the steps whose text changed
+    def update(self, module_sequence, errors=None):
+        old = self.text
+        if old == module_sequence:
+            return
+        prefix = common_prefix_length(old, module_sequence)
+        suffix = common_suffix_length(old, module_sequence, prefix)
+        if self._ends is None:
+            self._ends = []
+            end = -2
+            for step in self.steps:
+                end += len(step.text) + 2
+                self._ends.append(end)
+        ends = self._ends
+        # Steps ending inside the common prefix, and steps starting inside the common suffix, are unchanged
+        first = bisect.bisect_right(ends, prefix)
+        last = bisect.bisect_left(ends, len(old) - suffix)
+        while last < len(self.steps) and ends[last] - len(self.steps[last].text) < len(old) - suffix:
+            last += 1
+        start = ends[first - 1] if first else 0
+        if last < len(self.steps):
+            stop = ends[last] - len(self.steps[last].text) + len(module_sequence) - len(old)
+        else:
+            stop = len(module_sequence)
+        self.replace_steps(first, last - first, self.parse_steps(module_sequence[start:stop], errors, self.held_before(first)))
+
+    # Function to replace steps[index:index + removed] and invalidate the results after index
+    # Later steps that say "active container" and now mean another container are replaced as well
+    def replace_steps(self, index, removed, new_steps):
+        index = max(0, min(index, len(self.steps)))
+        removed = max(0, min(removed, len(self.steps) - index))
+        held = self.held_before(index)
+        for step in new_steps:
+            held = held_after(step.name, step.params, held)
+        following = self.resolve_following(index + removed, held)
+        new_steps = list(new_steps) + following
+        removed += len(following)
+        added = len(new_steps)
+        shift = added - removed
+        self.steps[index:index + removed] = new_steps
+        self.records[index:index + removed] = [None] * added
+        self._text = None
+        self._ends = None
+        # Edits already simulated past no longer matter
+        dirty = [key for key in self.dirty if key >= self.frontier]
+        if self.frontier > index:
+            # The results simulated up to the old frontier are not known to agree with the pending overlays after it
+            dirty.append(self.frontier)
+        dirty = [key + shift if key >= index + removed else min(key, index) for key in dirty]
+        if self.frontier <= index:
+            # Nothing simulated so far depends on the edit
+            self.pending = self.shifted(self.pending, index, removed, shift)
+        else:
+            # Keep the state at the old frontier as a candidate, then restart from the last checkpoint at or before index
+            candidates = {key: overlay for key, overlay in self.checkpoints.items() if key > index}
+            candidates.update(self.pending)
+            candidates[self.frontier] = self.state.snapshot()
+            self.checkpoints = {key: overlay for key, overlay in self.checkpoints.items() if key <= index}
+            self.pending = self.shifted(candidates, index, removed, shift)
+            self.restore(max(self.checkpoints))
+        dirty.append(index)
+        self.dirty = sorted(set(dirty))
+
+    # Function to renumber overlays for steps[index:index + removed] having been replaced; ones inside the range are dropped
+    def shifted(self, overlays, index, removed, shift):
+        kept = {}
+        moved = {}
+        for key, overlay in overlays.items():
+            if key <= index:
+                kept[key] = overlay
+            elif key >= index + removed and key + shift > index:
+                # A state that included removed steps cannot stand for the state before the edit
+                moved[key + shift] = overlay
+        kept.update(moved)
+        return kept
+
+    def restore(self, key):
+        self.frontier = key
+        self.last_checkpoint = key
+        self.state = CopyOnWriteState(self.index, self.checkpoints[key])
+
+    def checkpoint(self):
+        self.checkpoints[self.frontier] = self.state.snapshot()
+        self.last_checkpoint = self.frontier
+
+    # Function to simulate until the first target steps have results
+    def advance(self, target):
+        target = min(target, len(self.steps))
+        while True:
+            position = self.frontier
+            overlay = self.pending.pop(position, None)
+            if overlay is not None:
+                if self.state.same_as(overlay):
+                    # Converged: the old results from here on hold up to the next edit not simulated yet
+                    del self.dirty[:bisect.bisect_left(self.dirty, position)]
+                    limit = self.dirty[0] if self.dirty else len(self.steps)
+                    self.checkpoints[position] = overlay
+                    for key in [key for key in self.pending if key <= limit]:
+                        self.checkpoints[key] = self.pending.pop(key)
+                    self.restore(max(self.checkpoints))
+                    if self.frontier >= target:
+                        return
+                    continue
+                self.checkpoint()
+            elif position - self.last_checkpoint >= self.checkpoint_interval or position == len(self.steps):
+                self.checkpoint()
+            if position >= target:
+                return
+            self.apply(position)
+
+    # Function to apply the step at the frontier and record the positions it touched
+    def apply(self, position):
+        step = self.steps[position]
+        apply_module(step.name, step.params, self.state)
+        touched = {}
+        for value in step.params.values():
+            if isinstance(value, dict) and 'id' in value:
+                container = self.state.peek(value['id'])
+                if container is not None:
+                    touched[container['id']] = container['position']
+        self.records[position] = touched
+        self.frontier = position + 1
+
+    # Function to return {id: position} for the containers step index touched
+    def step_positions(self, index):
+        self.advance(index + 1)
+        return self.records[index]
+
+    # Function to return the containers after the first count steps, replaying from the nearest checkpoint
+    def state_at(self, count):
+        count = max(0, min(count, len(self.steps)))
+        self.advance(count)
+        if count == self.frontier:
+            return self.state.containers()
+        keys = sorted(key for key in self.checkpoints if key <= count)
+        state = CopyOnWriteState(self.index, self.checkpoints[keys[-1]])
+        for position in range(keys[-1], count):
+            step = self.steps[position]
+            apply_module(step.name, step.params, state)
+        return state.containers()
+
+    # Function to return {id: position} for every container after step index, as simulate_modules records
+    def positions_after(self, index):
+        return {container['id']: container['position'] for container in self.state_at(index + 1)}
+
+    # Function to return the containers after the whole plan
+    def final_state(self):
+        return self.state_at(len(self.steps))
@@ -0,0 +1,158 @@
+# pose_cache.py
+# Approach, grasp and release poses for each container, landmark and coordinate, computed once and reused across plans
+# Coordinate entries are shared by every plan; container and landmark entries belong to one inventory index,
+# which plans never change: bt_compiler looks up a container the plan has moved by its new coordinate instead
+
+import os
+import threading
+from collections import OrderedDict
+
+import metrics
+import spatial_index
+
+# Default gripper orientation for every pose
+DEFAULT_ROLL = 0.0
+DEFAULT_PITCH = 0.0
+DEFAULT_YAW = 1.0
+POSE_DECIMALS = 6
+# Heights above the target the gripper approaches from and releases at (0 goes straight to the target, as before)
+APPROACH_HEIGHT = float(os.environ.get('RAS_APPROACH_HEIGHT', 0.0))
+RELEASE_HEIGHT = float(os.environ.get('RAS_RELEASE_HEIGHT', 0.0))
+# Most targets kept, overridable with RAS_POSE_CACHE (0 turns the cache off)
+DEFAULT_CACHE_ENTRIES = int(os.environ.get('RAS_POSE_CACHE', 16384))
+
+# Function to turn a position into a pose key, or None when it is not an (x, y, z) coordinate
+def pose_key(position):
+    if not isinstance(position, (list, tuple)) or len(position) != 3:
+        return None
+    try:
+        x, y, z = (round(float(component), POSE_DECIMALS) for component in position)
+    except (TypeError, ValueError):
+        return None
+    return (x, y, z, DEFAULT_ROLL, DEFAULT_PITCH, DEFAULT_YAW)
+
+# Function to raise a pose key by a height
+def raised(key, height):
+    if not height:
+        return key
+    x, y, z, roll, pitch, yaw = key
+    return (x, y, round(z + height, POSE_DECIMALS), roll, pitch, yaw)
+
+# Poses for reaching one target; each is a pose key
+class MotionPoses:
+    __slots__ = ('approach', 'grasp', 'release')
+
+    def __init__(self, key):
+        self.approach = raised(key, APPROACH_HEIGHT)
+        self.grasp = key
+        self.release = raised(key, RELEASE_HEIGHT)
+
+    # Function to list the pose keys for a module at this target, with its actions in between
+    # Pick and place come down from the approach pose and go back up to it; pour and moveto go straight to the target
+    def path(self, module_name, actions):
+        if module_name == 'pick':
+            target = self.grasp
+        elif module_name == 'place':
+            target = self.release
+        else:
+            return [self.grasp, *actions]
+        if self.approach == target:
+            return [target, *actions]
+        return [self.approach, target, *actions, self.approach]
+
+# Function to drop consecutive repeats of the same pose from a target list (actions are kept)
+def merge(targets):
+    merged = []
+    for target in targets:
+        if not (merged and isinstance(target, tuple) and target == merged[-1]):
+            merged.append(target)
+    return merged
+
+# LRU cache of MotionPoses by target
+# Targets are ('point', pose key), ('container', index token, id) or ('landmark', index token, name)
+class PoseCache:
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _get(self, target):
+        with self._lock:
+            poses = self.entries.get(target)
+            if poses is not None:
+                self.entries.move_to_end(target)
+                self.hits += 1
+                metrics.POSE_CACHE.inc(1, 'hit')
+                return poses
+            self.misses += 1
+        metrics.POSE_CACHE.inc(1, 'miss')
+        return None
+
+    def _put(self, target, poses):
+        with self._lock:
+            self.entries[target] = poses
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return poses
+
+    # Function to return the poses at a coordinate, or None when it is not an (x, y, z) coordinate
+    def at(self, position):
+        key = pose_key(position)
+        if key is None:
+            return None
+        if self.max_entries <= 0:
+            return MotionPoses(key)
+        target = ('point', key)
+        poses = self._get(target)
+        if poses is None:
+            poses = self._put(target, MotionPoses(key))
+        return poses
+
+    # Function to return the poses at a container of an index, as positioned in that index
+    def container(self, container, index):
+        if container is None:
+            return None
+        if self.max_entries <= 0:
+            return self.at(container.get('position'))
+        target = ('container', index.token, container['id'])
+        poses = self._get(target)
+        if poses is None:
+            poses = self.at(container.get('position'))
+            if poses is not None:
+                self._put(target, poses)
+        return poses
+
+    # Function to return the poses at a landmark, placed as spatial_index.landmark_position places it
+    def landmark(self, name, index):
+        if not name or name == 'null':
+            return None
+        if self.max_entries <= 0:
+            return self.at(spatial_index.landmark_position(name, index))
+        target = ('landmark', index.token, str(name).strip().lower())
+        poses = self._get(target)
+        if poses is None:
+            poses = self.at(spatial_index.landmark_position(name, index))
+            if poses is not None:
+                self._put(target, poses)
+        return poses
+
+    # Function to empty the cache
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    # Function to report hit/miss counters
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+            }
+
+# Process-wide cache shared by every plan
+POSE_CACHE = PoseCache()
@@ -0,0 +1,212 @@
+# prompt_builder.py
+# Assembles the chat messages for module sequence generation and sizes each request's token budget
+# The system message is a constant, so every request starts with the same prefix and provider-side prompt caching can apply
+
+import math
+import os
+import re
+
+from module_grammar import GBNF_GRAMMAR, GBNF_STEP_GRAMMAR
+
+# Token limits for the model; override with RAS_CONTEXT_TOKENS / RAS_PROMPT_CHUNK_TOKENS / RAS_MAX_OUTPUT_TOKENS
+CONTEXT_TOKENS = int(os.environ.get('RAS_CONTEXT_TOKENS', 8192))
+# Instructions longer than this are split into sections that are generated separately
+CHUNK_TOKENS = int(os.environ.get('RAS_PROMPT_CHUNK_TOKENS', 1200))
+MAX_OUTPUT_TOKENS = int(os.environ.get('RAS_MAX_OUTPUT_TOKENS', 4096))
+MIN_OUTPUT_TOKENS = 128
+# A generated module call with all its parameters is about this many tokens
+TOKENS_PER_STEP = 110
+# Tokens added by the chat format around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+# The original instruction is included in a repair prompt only when it is shorter than this
+REPAIR_CONTEXT_TOKENS = 300
+
+SYSTEM_PROMPT = """You are an AI assistant that converts natural language instructions into a sequence of module calls with appropriate parameters.
+
+**Container description** (used by every module): a dictionary with the keys
+- type: The type of container (e.g., "beaker", "test tube").
+- size: Any size information if provided; otherwise "null".
+- content_name: Name of the contents (e.g., "copper sulphate solution") if specified, otherwise "null" (**note: "null" is not the same as "empty", treat "empty" as a content name).
+- content_color: Color of the contents (e.g., "blue") if specified, otherwise "null".
+- content_volume: Volume of the content if specified, otherwise "null".
+- landmark: A landmark if specified; otherwise "null".
+
+**Available Modules:**
+
+1. **pick**: container is a container description.
+pick(container={type: ..., size: ..., content_name: ..., content_color: ..., content_volume: ..., landmark: ...})
+
+2. **pour**: original_container and destination_container are container descriptions (use "active container" for the destination if not specified); volume is the volume to pour, "all" if not specified.
+pour(original_container={...}, destination_container={...}, volume=...)
+
+3. **place**: container is a container description; destination_location is the (x, y, z) coordinate if provided, otherwise "none"; landmark is a landmark if specified, otherwise "null".
+place(container={...}, destination_location=..., landmark=...)
+
+4. **moveto**: original_container is a container description; destination is the (x, y, z) coordinate if provided, otherwise "null"; landmark is a landmark if specified, otherwise "null".
+moveto(original_container={...}, destination=..., landmark=...)
+
+**Instructions:**
+
+- **Extract as much information as possible** from the input instruction to fill the parameters.
+- **If a parameter is not specified**, use the default values as described.
+- **Do not query any external data sources**; rely solely on the input instruction.
+- **Handle negations** appropriately. If an action is negated in the instruction (e.g., "Do not pour"), do not include that module in the sequence.
+- **Sequence the modules** in the order that makes sense based on the instruction.
+- Answer with the module calls only, one per line."""
+
+# System message for repairing one invalid step
+REPAIR_SYSTEM_PROMPT = """You fix one invalid robot module call. Keep every detail of the original call that fits the grammar and use "null" for anything unknown. Answer with the corrected call only, on one line, following this grammar:
+
+""" + GBNF_STEP_GRAMMAR
+
+# Verbs that usually become one module call each, for sizing the output budget
+ACTION_PATTERN = re.compile(
+    r"\b(pick|grab|take|lift|hold|pour|transfer|fill|add|place|put|set|drop|move|bring|carry|go|return)\w*\b",
+    re.IGNORECASE,
+)
+# Word pieces and punctuation, for the fallback token estimate
+PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?;])\s+")
+
+_encoder = None
+
+# Function to load the tiktoken encoder when it is installed (False when it is not)
+def get_encoder():
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            _encoder = False
+    return _encoder
+
+# Function to count the tokens of a text, exactly with tiktoken or estimated from word pieces
+def count_tokens(text):
+    encoder = get_encoder()
+    if encoder:
+        return len(encoder.encode(text))
+    # Common words are one token; long words and numbers split roughly every four characters
+    return sum(math.ceil(len(piece) / 4) for piece in PIECE_PATTERN.findall(text))
+
+_system_tokens = None
+
+# Function to count the system prompt tokens once
+def system_tokens():
+    global _system_tokens
+    if _system_tokens is None:
+        _system_tokens = count_tokens(SYSTEM_PROMPT) + MESSAGE_OVERHEAD_TOKENS
+    return _system_tokens
+
+# Function to split text into pieces of at most max_tokens, on paragraph, line and sentence boundaries
+def split_text(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return [text]
+    for pattern in (r"\n\s*\n", r"\n", SENTENCE_PATTERN):
+        parts = [part for part in re.split(pattern, text) if part.strip()]
+        if len(parts) > 1:
+            break
+    else:
+        # One huge sentence: cut it by words
+        words = text.split()
+        size = max(1, len(words) * max_tokens // count_tokens(text))
+        return [' '.join(words[i:i + size]) for i in range(0, len(words), size)]
+    pieces = []
+    for part in parts:
+        pieces.extend(split_text(part, max_tokens))
+    return pieces
+
+# Function to count the actions an instruction describes (at least one)
+def count_actions(text):
+    return max(1, len(ACTION_PATTERN.findall(text)))
+
+# Function to split a long instruction into ordered sections whose input and expected output both fit in one request
+def chunk_instruction(instruction, max_tokens=CHUNK_TOKENS):
+    max_actions = max(1, (MAX_OUTPUT_TOKENS - 32) // TOKENS_PER_STEP)
+    chunks = []
+    current = []
+    current_tokens = 0
+    current_actions = 0
+    for piece in split_text(instruction.strip(), max_tokens):
+        tokens = count_tokens(piece)
+        actions = count_actions(piece)
+        if current and (current_tokens + tokens > max_tokens or current_actions + actions > max_actions):
+            chunks.append('\n'.join(current))
+            current = []
+            current_tokens = 0
+            current_actions = 0
+        current.append(piece)
+        current_tokens += tokens
+        current_actions += actions
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks or [instruction]
+
+# Function to build the user message for one instruction or one section of it
+def build_user_message(instruction, part=1, parts=1):
+    if parts == 1:
+        return f'Now, process the following instruction and generate the module sequence:\n\n"""{instruction}"""'
+    return (f'Now, process part {part} of {parts} of a longer protocol and generate the module sequence for this part only:\n\n'
+            f'"""{instruction}"""')
+
+# Function to build the chat messages for an instruction (or one section of it)
+def build_messages(instruction, part=1, parts=1):
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': build_user_message(instruction, part, parts)},
+    ]
+
+# Function to choose max_tokens for a request from the number of actions the instruction describes
+def estimate_max_tokens(instruction):
+    input_tokens = system_tokens() + count_tokens(instruction) + 2 * MESSAGE_OVERHEAD_TOKENS
+    wanted = max(MIN_OUTPUT_TOKENS, count_actions(instruction) * TOKENS_PER_STEP + 32)
+    return max(1, min(wanted, MAX_OUTPUT_TOKENS, CONTEXT_TOKENS - input_tokens))
+
+# One planned request: messages plus its output budget
+# grammar is sent to backends that can constrain decoding with it
+class PromptRequest:
+    __slots__ = ('messages', 'max_tokens', 'grammar')
+
+    def __init__(self, messages, max_tokens, grammar=None):
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.grammar = grammar
+
+    # Function to double the budget after a truncated answer; False when there is no room left
+    def grow(self):
+        input_tokens = sum(count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in self.messages)
+        limit = min(MAX_OUTPUT_TOKENS, CONTEXT_TOKENS - input_tokens)
+        if self.max_tokens >= limit:
+            return False
+        self.max_tokens = min(self.max_tokens * 2, limit)
+        return True
+
+# Function to plan the requests for an instruction: one per section, in order
+def plan_requests(instruction, chunk_tokens=CHUNK_TOKENS):
+    chunks = chunk_instruction(instruction, chunk_tokens)
+    return [
+        PromptRequest(build_messages(chunk, part, len(chunks)), estimate_max_tokens(chunk), GBNF_GRAMMAR)
+        for part, chunk in enumerate(chunks, 1)
+    ]
+
+# Function to plan a short request that regenerates one invalid step, with its neighbours as context
+def plan_repair(step_text, errors, instruction=None, previous=None, following=None):
+    lines = []
+    if instruction and count_tokens(instruction) <= REPAIR_CONTEXT_TOKENS:
+        lines.append(f'Instruction:\n"""{instruction}"""\n')
+    if previous:
+        lines.append(f'Previous step: {previous}')
+    lines.append(f'Invalid step: {step_text}')
+    lines.append('Problems:')
+    lines.extend(f'- {error}' for error in errors)
+    if following:
+        lines.append(f'Next step: {following}')
+    messages = [
+        {'role': 'system', 'content': REPAIR_SYSTEM_PROMPT},
+        {'role': 'user', 'content': '\n'.join(lines)},
+    ]
+    return PromptRequest(messages, 2 * TOKENS_PER_STEP, GBNF_STEP_GRAMMAR)
+
+# Function to merge the module sequences generated for each section, keeping their order
+def merge_sequences(sequences):
+    return '\n\n'.join(sequence.strip() for sequence in sequences if sequence and sequence.strip())
@@ -0,0 +1,73 @@
+import os
+import threading
+from collections import OrderedDict
+
+import metrics
+from container_index import normalize_key
+from models import normalize_value
+
+# Most container descriptions kept, overridable with RAS_RESOLUTION_CACHE (0 turns the cache off)
+DEFAULT_CACHE_ENTRIES = int(os.environ.get('RAS_RESOLUTION_CACHE', 4096))
+
+# Function to normalize a description so equivalent ones share an entry (null fields are ignored, as in matching)
+def description_key(container_desc):
+    return tuple(sorted(
+        (normalize_key(key), normalize_value(value))
+        for key, value in container_desc.items()
+        if value != 'null' and value is not None
+    ))
+
+# LRU cache of resolved container descriptions, per inventory index
+# Descriptions are always resolved against the inventory, which plans never change (they simulate on copies);
+# a reloaded inventory gets a new index, so its entries start empty and the old ones age out of the LRU
+class ResolutionCache:
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        # (index token, description key) -> matched container or None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    # Function to return the cached container for a description, calling resolve(index) on a miss
+    def resolve(self, container_desc, index, resolve):
+        if self.max_entries <= 0:
+            return resolve(index)
+        key = (index.token, description_key(container_desc))
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                metrics.RESOLUTION_CACHE.inc(1, 'hit')
+                return self.entries[key]
+            self.misses += 1
+        metrics.RESOLUTION_CACHE.inc(1, 'miss')
+        container = resolve(index)
+        with self._lock:
+            self.entries[key] = container
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return container
+
+    # Function to empty the cache
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    # Function to report hit/miss counters
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+            }
+
+# Process-wide cache shared by every plan and request
+RESOLUTION_CACHE = ResolutionCache()
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# Default on-disk cache location, overridable with RAS_LLM_CACHE
+DEFAULT_CACHE_PATH = os.environ.get('RAS_LLM_CACHE', 'llm_cache.sqlite3')
+# Memory-tier hits are written to the disk tier's accessed column in batches of this many (and before every eviction)
+TOUCH_BATCH = 64
+
+# Function to normalize an instruction so trivially different submissions share a cache entry
+def normalize_instruction(instruction):
+    return ' '.join(instruction.split()).casefold()
+
+# Function to build the cache key for an instruction, model and prompt template version
+def make_key(instruction, model, prompt_version):
+    text = f"{model}\x00{prompt_version}\x00{normalize_instruction(instruction)}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+# Two-tier LLM response cache: in-memory LRU in front of a SQLite table
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_entries=256, disk_entries=10000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+        self.memory = OrderedDict()
+        # key -> time of its latest memory-tier hit not yet written to the disk tier
+        self.touched = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+            self._db.commit()
+
+    # Function to look up a cached response, or None
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created < self.ttl:
+                    self.memory.move_to_end(key)
+                    # Keep the disk LRU in step, or the hottest entries would look idle there and be evicted first
+                    if self._db is not None:
+                        self.touched[key] = now
+                        if len(self.touched) >= TOUCH_BATCH:
+                            self._flush_touched()
+                            self._db.commit()
+                    self.hits += 1
+                    metrics.CACHE_REQUESTS.inc(1, 'hit')
+                    return value
+                del self.memory[key]
+            if self._db is not None:
+                row = self._db.execute('SELECT value, created FROM responses WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    value, created = row
+                    if now - created < self.ttl:
+                        self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+                        self._db.commit()
+                        self._remember(key, value, created)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        metrics.CACHE_REQUESTS.inc(1, 'hit')
+                        return value
+                    self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    self._db.commit()
+            self.misses += 1
+            metrics.CACHE_REQUESTS.inc(1, 'miss')
+            return None
+
+    # Function to store a response in both tiers
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._flush_touched()
+                self._db.execute(
+                    'INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                    (key, value, now, now),
+                )
+                # Drop expired rows, then the least recently used rows over the size limit
+                self._db.execute('DELETE FROM responses WHERE created < ?', (now - self.ttl,))
+                self._db.execute(
+                    'DELETE FROM responses WHERE key IN ('
+                    'SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                    (self.disk_entries,),
+                )
+                self._db.commit()
+
+    # Function to write the pending memory-tier hits to the accessed column (the caller commits)
+    def _flush_touched(self):
+        if self.touched:
+            self._db.executemany('UPDATE responses SET accessed = ? WHERE key = ?', [(accessed, key) for key, accessed in self.touched.items()])
+            self.touched.clear()
+
+    def _remember(self, key, value, created):
+        self.memory[key] = (value, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    # Function to empty both tiers
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            self.touched.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM responses')
+                self._db.commit()
+
+    # Function to report hit/miss counters
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'memory_hits': self.hits - self.disk_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'memory_entries': len(self.memory),
+        }
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+# Function to get the process-wide response cache
+def get_default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
@@ -0,0 +1,619 @@
+# shared_inventory.py
+# Container inventory held once in shared memory for every worker process on the machine
+# One writer publishes the inventory as columns; readers map the same pages and read them in place
+# A sequence number in a small control segment is the version stamp: odd while a write is in progress,
+# so readers retry any read that overlapped a write (a seqlock)
+
+import fcntl
+import json
+import os
+import tempfile
+import time
+import zlib
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from container_index import ContainerIndex, new_token, normalize_key
+from models import INTERNED_FIELDS, normalize_value
+
+# Fields stored as codes into the shared string table; content_volume and position fall back to a code
+# when they are not plain numbers, and fields outside the standard set go into one 'extra' object
+CODE_FIELDS = ('id', 'aruco_id', 'type', 'size', 'content_name', 'content_color', 'landmark', 'content_volume', 'position', 'extra')
+COLUMN = {field: column for column, field in enumerate(CODE_FIELDS)}
+STANDARD_FIELDS = ('id', 'aruco_id', 'type', 'size', 'content_name', 'content_color', 'content_volume', 'landmark', 'position')
+# Kinds of content_volume and position values
+MISSING_KIND, INT_KIND, FLOAT_KIND, CODED_KIND, INT_POSITION_KIND = 0, 1, 2, 3, 4
+
+CONTROL_MAGIC = b'RASI'
+LAYOUT_VERSION = 2
+# magic, layout version, then seq, generation, count as uint64
+CONTROL_SIZE = 32
+DATA_HEADER_SIZE = 24
+# Readers wait this long for a writer that is still publishing the first version
+ATTACH_TIMEOUT = 5.0
+DECODE_CACHE_ENTRIES = 4096
+ABSENT = object()
+
+# Raised when the string table or rows of the current segment are full
+class SegmentFull(Exception):
+    pass
+
+# Function to compute where each array lives in a data segment
+def layout(capacity, string_capacity, byte_capacity):
+    slot_count = 1
+    while slot_count < 2 * string_capacity:
+        slot_count *= 2
+    arrays = [
+        ('codes', np.int32, (capacity, len(CODE_FIELDS))),
+        ('volumes', np.float64, (capacity,)),
+        ('positions', np.float64, (capacity, 3)),
+        ('kinds', np.int8, (capacity, 2)),
+        ('string_offsets', np.uint64, (string_capacity + 1,)),
+        ('row_of_code', np.int32, (string_capacity + 1,)),
+        ('key_of_code', np.int32, (string_capacity + 1,)),
+        ('hash_slots', np.int32, (slot_count,)),
+        ('string_bytes', np.uint8, (byte_capacity,)),
+    ]
+    offset = DATA_HEADER_SIZE
+    placed = []
+    for name, dtype, shape in arrays:
+        offset = (offset + 7) // 8 * 8
+        placed.append((name, dtype, shape, offset))
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return placed, offset
+
+# Function to create numpy views over a data segment (no copies)
+def map_arrays(buffer, capacity, string_capacity, byte_capacity):
+    placed, _ = layout(capacity, string_capacity, byte_capacity)
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset) for name, dtype, shape, offset in placed}
+
+def segment_name(name, generation):
+    return f'{name}_{generation}'
+
+# Segments outlive the processes that use them, so none of them is left to the resource tracker
+# (it would unlink a segment when whichever process registered it exits)
+def untrack(segment):
+    try:
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    except Exception:
+        pass
+    return segment
+
+def attach(name):
+    return untrack(shared_memory.SharedMemory(name=name))
+
+def create(name, size):
+    return untrack(shared_memory.SharedMemory(name=name, create=True, size=size))
+
+def unlink(segment):
+    resource_tracker.register(segment._name, 'shared_memory')
+    segment.unlink()
+
+# Lock file held by the writer; the lock is released when the writer process exits
+def lock_path(name):
+    return os.path.join(tempfile.gettempdir(), f'{name}.lock')
+
+# Function to encode a value for the string table
+def encode_value(value):
+    return json.dumps(value, separators=(',', ':'), sort_keys=True).encode()
+
+# Function to find a string's code through the shared hash table, or None
+def find_code(arrays, data):
+    slots = arrays['hash_slots']
+    offsets = arrays['string_offsets']
+    strings = arrays['string_bytes']
+    mask = len(slots) - 1
+    slot = zlib.crc32(data) & mask
+    while True:
+        code = int(slots[slot])
+        if code == 0:
+            return None
+        start, end = int(offsets[code - 1]), int(offsets[code])
+        if end - start == len(data) and strings[start:end].tobytes() == data:
+            return code
+        slot = (slot + 1) & mask
+
+# Single writer: creates the segments and publishes each version of the inventory
+# A writer that starts after an earlier one stopped takes over its segments, so attached readers carry on
+class SharedInventoryWriter:
+    def __init__(self, name, containers=None, headroom=2.0):
+        self.name = name
+        self.headroom = headroom
+        self.lock = open(lock_path(name), 'a')
+        try:
+            # Fails with BlockingIOError when another process is the writer
+            fcntl.flock(self.lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.lock.close()
+            raise
+        try:
+            self.control = create(name, CONTROL_SIZE)
+            fresh = True
+        except FileExistsError:
+            self.control = attach(name)
+            fresh = bytes(self.control.buf[:8]) != CONTROL_MAGIC + LAYOUT_VERSION.to_bytes(4, 'little')
+        self.control.buf[:8] = CONTROL_MAGIC + LAYOUT_VERSION.to_bytes(4, 'little')
+        self.header = np.ndarray((3,), dtype=np.uint64, buffer=self.control.buf, offset=8)
+        if fresh:
+            self.header[:] = 0
+        self.segment = None
+        self.arrays = None
+        self.capacity = 0
+        self.string_capacity = 0
+        # Readers wait for the first publish (or keep reading a previous writer's inventory)
+        if containers is not None:
+            self.publish(containers)
+
+    @property
+    def version(self):
+        return int(self.header[0]) // 2
+
+    # A sequence left odd by a writer that died mid-write stays odd until this write ends
+    def begin(self):
+        if not int(self.header[0]) & 1:
+            self.header[0] += 1
+
+    def end(self):
+        self.header[0] += 1
+
+    # Function to replace the whole inventory
+    def publish(self, containers):
+        containers = [dict(container.items()) for container in containers]
+        self.begin()
+        try:
+            self.write_all(containers)
+        except SegmentFull:
+            self.grow(containers)
+        self.end()
+
+    def write_all(self, containers):
+        if self.arrays is None or len(containers) > self.capacity:
+            raise SegmentFull()
+        arrays = self.arrays
+        # Old ids stop resolving; rows past the new count are left as they are but never read
+        for row in range(int(self.header[2])):
+            id_code = arrays['codes'][row, COLUMN['id']]
+            if id_code:
+                arrays['row_of_code'][id_code] = 0
+        for row, container in enumerate(containers):
+            self.write_row(row, container)
+        self.header[2] = len(containers)
+
+    # Function to move to a new, larger segment holding only the strings still in use
+    def grow(self, containers):
+        strings = set()
+        for container in containers:
+            for data in self.row_strings(container):
+                strings.add(data)
+        capacity = max(16, int(len(containers) * self.headroom))
+        string_capacity = max(64, int(len(strings) * self.headroom))
+        byte_capacity = max(1024, int(sum(len(data) for data in strings) * self.headroom))
+        _, size = layout(capacity, string_capacity, byte_capacity)
+        generation = int(self.header[1]) + 1
+        try:
+            segment = create(segment_name(self.name, generation), size)
+        except FileExistsError:
+            unlink(attach(segment_name(self.name, generation)))
+            segment = create(segment_name(self.name, generation), size)
+        np.ndarray((3,), dtype=np.uint64, buffer=segment.buf)[:] = (capacity, string_capacity, byte_capacity)
+        old = self.segment
+        self.segment = segment
+        self.arrays = map_arrays(segment.buf, capacity, string_capacity, byte_capacity)
+        self.arrays['hash_slots'][:] = 0
+        self.arrays['row_of_code'][:] = 0
+        self.arrays['key_of_code'][:] = 0
+        self.capacity = capacity
+        self.string_capacity = string_capacity
+        self.codes = {}
+        self.header[2] = 0
+        self.write_all(containers)
+        self.header[1] = generation
+        # Readers still holding the old segment keep their mapping until they reattach
+        if old is not None:
+            old.close()
+            unlink(old)
+        elif generation > 1:
+            try:
+                unlink(attach(segment_name(self.name, generation - 1)))
+            except FileNotFoundError:
+                pass
+
+    # Function to list the strings a container needs in the table
+    def row_strings(self, container):
+        extra = {key: value for key, value in container.items() if key not in STANDARD_FIELDS}
+        for field in CODE_FIELDS:
+            if field == 'extra':
+                value = extra or None
+            elif field in container:
+                value = container[field]
+                if field == 'content_volume' and volume_kind(value) != CODED_KIND:
+                    continue
+                if field == 'position' and position_kind(value) != CODED_KIND:
+                    continue
+                if field in INTERNED_FIELDS and value is not None:
+                    yield encode_value(normalize_value(value))
+            else:
+                continue
+            if value is not None:
+                yield encode_value(value)
+
+    # Function to add a string to the table (or find it) and return its code
+    def intern(self, data):
+        code = self.codes.get(data)
+        if code is not None:
+            return code
+        arrays = self.arrays
+        code = len(self.codes) + 1
+        start = int(arrays['string_offsets'][code - 1])
+        if code > self.string_capacity or start + len(data) > len(arrays['string_bytes']):
+            raise SegmentFull()
+        arrays['string_bytes'][start:start + len(data)] = np.frombuffer(data, dtype=np.uint8)
+        arrays['string_offsets'][code] = start + len(data)
+        # The slot is filled last, so a reader probing at the same time never sees a half-written string
+        slots = arrays['hash_slots']
+        mask = len(slots) - 1
+        slot = zlib.crc32(data) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = code
+        self.codes[data] = code
+        return code
+
+    def write_row(self, row, container):
+        arrays = self.arrays
+        codes = [0] * len(CODE_FIELDS)
+        volume, kinds, position = 0.0, [MISSING_KIND, MISSING_KIND], (0.0, 0.0, 0.0)
+        extra = {key: value for key, value in container.items() if key not in STANDARD_FIELDS}
+        for column, field in enumerate(CODE_FIELDS):
+            if field == 'extra':
+                if extra:
+                    codes[column] = self.intern(encode_value(extra))
+                continue
+            if field not in container:
+                continue
+            value = container[field]
+            if field == 'content_volume':
+                kinds[0] = volume_kind(value)
+                if kinds[0] != CODED_KIND:
+                    if kinds[0] != MISSING_KIND:
+                        volume = float(value)
+                    continue
+            elif field == 'position':
+                kinds[1] = position_kind(value)
+                if kinds[1] != CODED_KIND:
+                    position = tuple(float(item) for item in value)
+                    continue
+            if value is None:
+                codes[column] = -1
+            else:
+                codes[column] = self.intern(encode_value(value))
+                # The original value is kept for display; matching compares the code of its normalized form
+                if field in INTERNED_FIELDS:
+                    arrays['key_of_code'][codes[column]] = self.intern(encode_value(normalize_value(value)))
+        old_id = arrays['codes'][row, COLUMN['id']]
+        if old_id > 0 and arrays['row_of_code'][old_id] == row + 1:
+            arrays['row_of_code'][old_id] = 0
+        arrays['codes'][row] = codes
+        arrays['volumes'][row] = volume
+        arrays['positions'][row] = position
+        arrays['kinds'][row] = kinds
+        if codes[0] > 0 and not arrays['row_of_code'][codes[0]]:
+            arrays['row_of_code'][codes[0]] = row + 1
+
+    # Function to stop publishing; the segments stay for the next writer unless remove is set
+    def close(self, remove=False):
+        self.arrays = None
+        self.header = None
+        for segment in (self.segment, self.control):
+            if segment is not None:
+                segment.close()
+                if remove:
+                    unlink(segment)
+        self.segment = None
+        self.lock.close()
+
+# Function to classify a content_volume value
+def volume_kind(value):
+    if isinstance(value, bool) or value is None:
+        return CODED_KIND if value is not None else MISSING_KIND
+    if isinstance(value, int):
+        return INT_KIND if abs(value) < 2 ** 53 else CODED_KIND
+    if isinstance(value, float):
+        return FLOAT_KIND
+    return CODED_KIND
+
+# Function to classify a position value
+def position_kind(value):
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        if all(isinstance(item, int) and not isinstance(item, bool) and abs(item) < 2 ** 53 for item in value):
+            return INT_POSITION_KIND
+        if all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value):
+            return FLOAT_KIND
+    return CODED_KIND
+
+# Reader: maps the writer's segments and reads containers in place
+class SharedInventory:
+    def __init__(self, name, timeout=ATTACH_TIMEOUT):
+        self.name = name
+        self.control = attach(name)
+        if bytes(self.control.buf[:4]) != CONTROL_MAGIC or int.from_bytes(self.control.buf[4:8], 'little') != LAYOUT_VERSION:
+            self.control.close()
+            raise ValueError(f"'{name}' is not a shared inventory of layout version {LAYOUT_VERSION}")
+        self.header = np.ndarray((3,), dtype=np.uint64, buffer=self.control.buf, offset=8)
+        self.generation = None
+        self.segment = None
+        self.arrays = None
+        self._decoded = {}
+        self._index = None
+        self._index_version = None
+        deadline = time.monotonic() + timeout
+        # The sequence stays below 2 until the writer has published the first version
+        while int(self.header[0]) < 2:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"shared inventory '{name}' was never published")
+            time.sleep(0.001)
+
+    # Version stamp: changes whenever the writer publishes; reading it costs one memory load
+    @property
+    def version(self):
+        return int(self.header[0]) // 2
+
+    # Function to run reader(self) until it completes without a write overlapping it
+    def read(self, reader):
+        while True:
+            sequence = int(self.header[0])
+            if sequence & 1:
+                time.sleep(0)
+                continue
+            error = None
+            try:
+                if int(self.header[1]) != self.generation:
+                    self.reattach()
+                result = reader(self)
+            except (IndexError, ValueError, UnicodeDecodeError) as e:
+                # Possibly a torn read of a row being rewritten; only an error from a clean read is real
+                error = e
+            if int(self.header[0]) == sequence:
+                if error is not None:
+                    raise error
+                return result
+
+    def reattach(self):
+        generation = int(self.header[1])
+        segment = attach(segment_name(self.name, generation))
+        capacity, string_capacity, byte_capacity = (int(value) for value in np.ndarray((3,), dtype=np.uint64, buffer=segment.buf))
+        old = self.segment
+        self.arrays = map_arrays(segment.buf, capacity, string_capacity, byte_capacity)
+        self.segment = segment
+        self.generation = generation
+        self._decoded = {}
+        if old is not None:
+            old.close()
+
+    def __len__(self):
+        return self.read(lambda inventory: int(inventory.header[2]))
+
+    def decode(self, code):
+        value = self._decoded.get(code)
+        if value is None:
+            offsets = self.arrays['string_offsets']
+            data = self.arrays['string_bytes'][int(offsets[code - 1]):int(offsets[code])].tobytes()
+            value = json.loads(data)
+            if len(self._decoded) >= DECODE_CACHE_ENTRIES:
+                self._decoded.clear()
+            self._decoded[code] = value
+        return value
+
+    # Function to read one field of a row (call inside read())
+    def field(self, row, key):
+        arrays = self.arrays
+        if key == 'content_volume':
+            kind = int(arrays['kinds'][row, 0])
+            if kind == INT_KIND:
+                return int(arrays['volumes'][row])
+            if kind == FLOAT_KIND:
+                return float(arrays['volumes'][row])
+            if kind == MISSING_KIND:
+                raise KeyError(key)
+        elif key == 'position':
+            kind = int(arrays['kinds'][row, 1])
+            if kind == INT_POSITION_KIND:
+                return tuple(int(item) for item in arrays['positions'][row])
+            if kind == FLOAT_KIND:
+                return tuple(float(item) for item in arrays['positions'][row])
+            if kind == MISSING_KIND:
+                raise KeyError(key)
+        column = COLUMN.get(key)
+        if column is None:
+            code = int(arrays['codes'][row, COLUMN['extra']])
+            extra = self.decode(code) if code > 0 else {}
+            return extra[key]
+        code = int(arrays['codes'][row, column])
+        if code == 0:
+            raise KeyError(key)
+        return None if code < 0 else self.decode(code)
+
+    # Function to read a whole row as a dict (call inside read())
+    def row_dict(self, row):
+        container = {}
+        for key in STANDARD_FIELDS:
+            try:
+                container[key] = self.field(row, key)
+            except KeyError:
+                pass
+        code = int(self.arrays['codes'][row, COLUMN['extra']])
+        if code > 0:
+            container.update(self.decode(code))
+        return container
+
+    # Function to find the row of a container id, or None
+    def row_of(self, container_id):
+        def find(inventory):
+            code = find_code(inventory.arrays, encode_value(container_id))
+            if code is None:
+                return None
+            row = int(inventory.arrays['row_of_code'][code]) - 1
+            return row if 0 <= row < int(inventory.header[2]) else None
+        return self.read(find)
+
+    def get(self, container_id, default=None):
+        row = self.row_of(container_id)
+        return SharedContainer(self, row) if row is not None else default
+
+    def __getitem__(self, container_id):
+        row = self.row_of(container_id)
+        if row is None:
+            raise KeyError(container_id)
+        return SharedContainer(self, row)
+
+    # Function to return every container matching the criteria, in inventory order (same rules as ContainerIndex.match)
+    def match(self, criteria):
+        def find(inventory):
+            count = int(inventory.header[2])
+            codes = inventory.arrays['codes']
+            mask = None
+            remaining = []
+            for key, value in criteria.items():
+                if value == 'null' or value is None:
+                    continue
+                key = normalize_key(key)
+                value = normalize_value(value)
+                if key in INTERNED_FIELDS:
+                    code = find_code(inventory.arrays, encode_value(value))
+                    if code is None:
+                        return []
+                    # Codes of None (-1) and of missing fields (0) both map to key 0
+                    column = inventory.arrays['key_of_code'][np.maximum(codes[:count, COLUMN[key]], 0)] == code
+                    mask = column if mask is None else mask & column
+                else:
+                    remaining.append((key, value))
+            rows = np.flatnonzero(mask) if mask is not None else range(count)
+            matches = []
+            for row in rows:
+                row = int(row)
+                if all(normalize_value(inventory.field_or(row, key, '')) == value for key, value in remaining):
+                    matches.append(row)
+            return matches
+        return [SharedContainer(self, row) for row in self.read(find)]
+
+    def field_or(self, row, key, default):
+        try:
+            return self.field(row, key)
+        except KeyError:
+            return default
+
+    # Function to return the containers as a sequence of views (nothing is copied)
+    def containers(self):
+        return SharedRows(self)
+
+    # Function to return a ContainerIndex-compatible view for the current version
+    def index(self):
+        version = self.version
+        if self._index is None or self._index_version != version:
+            self._index = SharedContainerIndex(self)
+            self._index_version = version
+        return self._index
+
+    def close(self):
+        self.arrays = None
+        self.header = None
+        self._index = None
+        for segment in (self.segment, self.control):
+            if segment is not None:
+                segment.close()
+
+# Sequence of container views over a shared inventory
+class SharedRows:
+    def __init__(self, inventory):
+        self.inventory = inventory
+
+    def __len__(self):
+        return len(self.inventory)
+
+    def __getitem__(self, row):
+        count = len(self.inventory)
+        if isinstance(row, slice):
+            return [SharedContainer(self.inventory, position) for position in range(*row.indices(count))]
+        if row < 0:
+            row += count
+        if not 0 <= row < count:
+            raise IndexError(row)
+        return SharedContainer(self.inventory, row)
+
+    def __iter__(self):
+        for row in range(len(self.inventory)):
+            yield SharedContainer(self.inventory, row)
+
+# Dict-like view of one shared container; each read sees the latest published version
+class SharedContainer:
+    __slots__ = ('inventory', 'row')
+
+    def __init__(self, inventory, row):
+        self.inventory = inventory
+        self.row = row
+
+    def __getitem__(self, key):
+        result = self.inventory.read(lambda inventory: inventory.field_or(self.row, key, ABSENT))
+        if result is ABSENT:
+            raise KeyError(key)
+        return result
+
+    def get(self, key, default=None):
+        result = self.inventory.read(lambda inventory: inventory.field_or(self.row, key, ABSENT))
+        return default if result is ABSENT else result
+
+    def __contains__(self, key):
+        return key in self.to_dict()
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def __len__(self):
+        return len(self.to_dict())
+
+    def keys(self):
+        return list(self.to_dict())
+
+    def items(self):
+        return list(self.to_dict().items())
+
+    def values(self):
+        return list(self.to_dict().values())
+
+    # Function to read the whole container consistently into a plain dict
+    def to_dict(self):
+        return self.inventory.read(lambda inventory: inventory.row_dict(self.row))
+
+    # Copies are plain dicts, so simulations can change them freely
+    def copy(self):
+        return self.to_dict()
+
+    def __eq__(self, other):
+        if isinstance(other, SharedContainer):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+# ContainerIndex over a shared inventory: lookups and matches run on the shared columns
+# The fuzzy and spatial indexes are still built per process, on first use
+class SharedContainerIndex(ContainerIndex):
+    def __init__(self, inventory):
+        self.token = new_token()
+        self.inventory = inventory
+        self.containers = inventory.containers()
+        self.by_id = inventory
+        self.compact = False
+        self._postings = None
+        self._fuzzy = None
+        self._spatial = None
+
+    def get(self, container_id):
+        return self.inventory.get(container_id)
+
+    def match(self, criteria):
+        return self.inventory.match(criteria)
@@ -0,0 +1,214 @@
+# spatial_index.py
+# Uniform grid over container positions for nearest-neighbour, radius and placement collision queries
+# The grid is over (x, y); distances are 3D, so a container stacked above another is still found
+
+import heapq
+import math
+import os
+
+# Minimum distance between container centres for a placement to count as free (0 disables the check)
+PLACEMENT_CLEARANCE = float(os.environ.get('RAS_PLACEMENT_CLEARANCE', 0.05))
+# Farthest a container can be from a landmark and still count as "near" it
+LANDMARK_MAX_DISTANCE = float(os.environ.get('RAS_LANDMARK_MAX_DISTANCE', 0.5))
+# Optional YAML file mapping landmark names to (x, y, z) positions
+LANDMARKS_PATH = os.environ.get('RAS_LANDMARKS', 'Downloads/landmarks.yaml')
+# The automatic cell size aims for about this many containers per cell
+TARGET_PER_CELL = 2
+DEFAULT_CELL_SIZE = 0.1
+
+# Function to convert a position into an (x, y, z) tuple of floats, or None if it is not a coordinate
+def as_point(value):
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        try:
+            return (float(value[0]), float(value[1]), float(value[2]))
+        except (TypeError, ValueError):
+            return None
+    return None
+
+# Function to pick a cell size from the spread and number of points
+def auto_cell_size(points):
+    if len(points) < 2:
+        return DEFAULT_CELL_SIZE
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    area = max(max(xs) - min(xs), 1e-3) * max(max(ys) - min(ys), 1e-3)
+    return max(math.sqrt(area * TARGET_PER_CELL / len(points)), 1e-3)
+
+# Grid of cells keyed by (column, row), each holding the ids of the containers inside it
+class SpatialGrid:
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.points = {}
+        # Bounding box of the occupied cells; it only grows, which keeps searches bounded
+        self.bounds = None
+
+    # Function to build a grid from containers, sizing the cells to their density
+    @classmethod
+    def from_containers(cls, containers, cell_size=None):
+        points = {}
+        for container in containers:
+            point = as_point(container.get('position'))
+            if point is not None:
+                points.setdefault(container['id'], point)
+        grid = cls(cell_size or auto_cell_size(list(points.values())))
+        for container_id, point in points.items():
+            grid.insert(container_id, point)
+        return grid
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, container_id):
+        return container_id in self.points
+
+    def cell_of(self, point):
+        return (math.floor(point[0] / self.cell_size), math.floor(point[1] / self.cell_size))
+
+    def insert(self, container_id, point):
+        cell = self.cell_of(point)
+        self.cells.setdefault(cell, set()).add(container_id)
+        self.points[container_id] = point
+        if self.bounds is None:
+            self.bounds = [cell[0], cell[1], cell[0], cell[1]]
+        else:
+            bounds = self.bounds
+            bounds[0] = min(bounds[0], cell[0])
+            bounds[1] = min(bounds[1], cell[1])
+            bounds[2] = max(bounds[2], cell[0])
+            bounds[3] = max(bounds[3], cell[1])
+
+    def remove(self, container_id):
+        point = self.points.pop(container_id, None)
+        if point is None:
+            return
+        cell = self.cell_of(point)
+        members = self.cells[cell]
+        members.discard(container_id)
+        if not members:
+            del self.cells[cell]
+
+    # Function to update a container's position; positions that are not coordinates take it out of the grid
+    def move(self, container_id, position):
+        point = as_point(position)
+        old = self.points.get(container_id)
+        if old is not None and point is not None and self.cell_of(old) == self.cell_of(point):
+            self.points[container_id] = point
+            return
+        self.remove(container_id)
+        if point is not None:
+            self.insert(container_id, point)
+
+    def position(self, container_id):
+        return self.points.get(container_id)
+
+    # Function to yield the cells at Chebyshev distance ring from a centre cell, limited to the occupied bounds
+    def ring_cells(self, centre, ring):
+        column, row = centre
+        min_column, min_row, max_column, max_row = self.bounds
+        if ring == 0:
+            yield centre
+            return
+        for x in range(max(column - ring, min_column), min(column + ring, max_column) + 1):
+            if row - ring >= min_row:
+                yield (x, row - ring)
+            if row + ring <= max_row:
+                yield (x, row + ring)
+        for y in range(max(row - ring + 1, min_row), min(row + ring - 1, max_row) + 1):
+            if column - ring >= min_column:
+                yield (column - ring, y)
+            if column + ring <= max_column:
+                yield (column + ring, y)
+
+    # Function to return the k nearest (distance, id) pairs to a point, closest first
+    # predicate(id) can restrict the candidates; max_distance stops the search early
+    def nearest(self, point, k=1, predicate=None, max_distance=math.inf):
+        point = as_point(point)
+        if point is None or not self.points or k <= 0:
+            return []
+        centre = self.cell_of(point)
+        min_column, min_row, max_column, max_row = self.bounds
+        # Rings beyond this one lie entirely outside the occupied cells
+        last_ring = max(centre[0] - min_column, max_column - centre[0], centre[1] - min_row, max_row - centre[1])
+        best = []
+        ring = 0
+        while ring <= last_ring:
+            for cell in self.ring_cells(centre, ring):
+                for container_id in self.cells.get(cell, ()):
+                    if predicate is not None and not predicate(container_id):
+                        continue
+                    distance = math.dist(point, self.points[container_id])
+                    if distance > max_distance:
+                        continue
+                    # Max-heap of the best k by negated distance
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, container_id))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, container_id))
+            # Anything in a later ring is at least this far away
+            reach = ring * self.cell_size
+            if (len(best) == k and -best[0][0] <= reach) or reach > max_distance:
+                break
+            ring += 1
+        return sorted((-distance, container_id) for distance, container_id in best)
+
+    # Function to return (distance, id) pairs for every container within radius of a point, closest first
+    def within(self, point, radius, predicate=None):
+        point = as_point(point)
+        if point is None or not self.points:
+            return []
+        low = self.cell_of((point[0] - radius, point[1] - radius, 0))
+        high = self.cell_of((point[0] + radius, point[1] + radius, 0))
+        min_column, min_row, max_column, max_row = self.bounds
+        found = []
+        for x in range(max(low[0], min_column), min(high[0], max_column) + 1):
+            for y in range(max(low[1], min_row), min(high[1], max_row) + 1):
+                for container_id in self.cells.get((x, y), ()):
+                    if predicate is not None and not predicate(container_id):
+                        continue
+                    distance = math.dist(point, self.points[container_id])
+                    if distance <= radius:
+                        found.append((distance, container_id))
+        found.sort()
+        return found
+
+    # Function to list the containers a placement at point would collide with (excluding the one being placed)
+    def collisions(self, point, clearance=PLACEMENT_CLEARANCE, exclude=None):
+        if clearance <= 0:
+            return []
+        return [container_id for distance, container_id in self.within(point, clearance) if container_id != exclude]
+
+_landmarks = None
+
+# Function to load the landmark positions file once ({name: [x, y, z]}); missing file means no fixed landmarks
+def load_landmarks(path=LANDMARKS_PATH):
+    global _landmarks
+    if _landmarks is None:
+        landmarks = {}
+        if path and os.path.exists(path):
+            from asset_store import parse_yaml
+            try:
+                with open(path, 'r') as file:
+                    data = parse_yaml(file) or {}
+                for name, position in data.items():
+                    point = as_point(position)
+                    if point is not None:
+                        landmarks[str(name).strip().lower()] = point
+            except Exception as e:
+                print(f"Error loading landmarks from {path}: {e}")
+        _landmarks = landmarks
+    return _landmarks
+
+# Function to find where a landmark is: from the landmarks file, else the centre of the containers tagged with it
+def landmark_position(name, containers):
+    if not name or name == 'null':
+        return None
+    key = str(name).strip().lower()
+    point = load_landmarks().get(key)
+    if point is not None:
+        return point
+    points = [as_point(container.get('position')) for container in containers.match({'landmark': name})]
+    points = [point for point in points if point is not None]
+    if not points:
+        return None
+    return tuple(sum(point[axis] for point in points) / len(points) for axis in range(3))
@@ -0,0 +1,79 @@
+import time
+
+import api_calls
+import asset_store
+from asset_mapper import format_parameters, held_after, resolve_containers
+from container_index import ContainerIndex, ensure_index
+from future_positions import apply_module
+from module_parser import IncrementalParser
+
+# Resolves and simulates module calls as their text arrives
+class StreamProcessor:
+    def __init__(self, containers):
+        self.start = time.perf_counter()
+        self.index = ensure_index(containers)
+        self.containers_state = [container.copy() for container in self.index.containers]
+        self.state_index = ContainerIndex(self.containers_state)
+        self.parser = IncrementalParser()
+        self.step = 0
+        self.held = None
+
+    # Function to add a text delta and return the steps it completed
+    def feed(self, delta):
+        return [self.process_call(module_call) for module_call in self.parser.feed(delta)]
+
+    # Function to finish the stream and return the steps recovered after an unterminated call, then any parse errors
+    def close(self):
+        steps = [self.process_call(module_call) for module_call in self.parser.finish()]
+        return steps + [{'error': f"Error parsing module call: {error}"} for error in self.parser.close()]
+
+    def process_call(self, module_call):
+        self.step += 1
+        module_name = module_call.name
+        params = resolve_containers(module_name, module_call.params(), self.index, held=self.held)
+        self.held = held_after(module_name, params, self.held)
+        apply_module(module_name, params, self.state_index)
+        # Report the positions of the containers this step touched
+        positions = {}
+        for value in params.values():
+            if isinstance(value, dict) and 'id' in value:
+                container = self.state_index.get(value['id'])
+                if container:
+                    positions[container['id']] = container['position']
+        return {
+            'step': self.step,
+            'module_call': f"{module_name}({format_parameters(params)})",
+            'positions': positions,
+            'elapsed': time.perf_counter() - self.start,
+        }
+
+# Function to resolve and simulate module calls from an iterable of text deltas
+# The model keeps generating while each finished step is being resolved and simulated
+def process_stream(deltas, containers):
+    processor = StreamProcessor(containers)
+    for delta in deltas:
+        yield from processor.feed(delta)
+    yield from processor.close()
+
+# Function to do the same for an async iterable of text deltas
+async def aprocess_stream(deltas, containers):
+    processor = StreamProcessor(containers)
+    async for delta in deltas:
+        for step in processor.feed(delta):
+            yield step
+    for step in processor.close():
+        yield step
+
+# Function to stream resolved steps for an instruction straight from the LLM
+def stream_module_steps(input_instruction, api_key, containers=None, backend=None):
+    if containers is None:
+        containers = asset_store.get_store().index()
+    deltas = api_calls.stream_module_sequence(input_instruction, api_key, backend)
+    return process_stream(deltas, containers)
+
+# Function to stream resolved steps without blocking the event loop
+def astream_module_steps(input_instruction, api_key, containers=None, backend=None):
+    if containers is None:
+        containers = asset_store.get_store().index()
+    deltas = api_calls.astream_module_sequence(input_instruction, api_key, backend)
+    return aprocess_stream(deltas, containers)
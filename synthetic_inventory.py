@@ -0,0 +1,96 @@
+import random
+
+CONTAINER_TYPES = ['beaker', 'test tube', 'flask', 'vial', 'petri dish', 'graduated cylinder']
+CONTAINER_SIZES = ['small', 'medium', 'large', '50ml', '100ml', '250ml', '500ml']
+CONTENTS = [
+    ('empty', 'null'),
+    ('water', 'clear'),
+    ('copper sulphate solution', 'blue'),
+    ('potassium permanganate solution', 'purple'),
+    ('ferric chloride solution', 'yellow'),
+    ('phenolphthalein', 'pink'),
+    ('sodium chloride solution', 'clear'),
+    ('nickel chloride solution', 'green'),
+]
+LANDMARKS = ['balance', 'fume hood', 'sink', 'shelf', 'hot plate', 'centrifuge', 'null']
+
+# Function to generate a synthetic container inventory for benchmarks
+def make_containers(count, seed=0):
+    rng = random.Random(seed)
+    containers = []
+    for i in range(count):
+        content_name, content_color = rng.choice(CONTENTS)
+        containers.append({
+            'id': f'C{i}',
+            'aruco_id': 100 + i,
+            'type': rng.choice(CONTAINER_TYPES),
+            'size': rng.choice(CONTAINER_SIZES),
+            'content_name': content_name,
+            'content_color': content_color,
+            'content_volume': 0 if content_name == 'empty' else rng.choice([10, 25, 50, 100, 200]),
+            'landmark': rng.choice(LANDMARKS),
+            'position': (round(rng.uniform(0, 2), 3), round(rng.uniform(0, 1), 3), 0.0),
+        })
+    return containers
+
+# Function to generate container descriptions like the ones the LLM produces
+def make_queries(count, seed=1):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        content_name, content_color = rng.choice(CONTENTS)
+        queries.append({
+            'type': rng.choice(CONTAINER_TYPES),
+            'size': rng.choice(CONTAINER_SIZES + ['null'] * 6),
+            'content_name': rng.choice([content_name, 'null']),
+            'content_color': content_color,
+            'content_volume': 'null',
+            'landmark': rng.choice(LANDMARKS + ['null'] * 6),
+        })
+    return queries
+
+# Function to format a container description the way the LLM writes it
+def format_description(description):
+    return '{' + ', '.join(f'{key}: "{value}"' for key, value in description.items()) + '}'
+
+# Function to generate an LLM-style module sequence with the given number of steps
+def make_module_sequence(steps, seed=2):
+    rng = random.Random(seed)
+    queries = make_queries(64, seed)
+    calls = []
+    for _ in range(steps):
+        module = rng.choice(['pick', 'pour', 'place', 'moveto'])
+        source = format_description(rng.choice(queries))
+        target = format_description(rng.choice(queries))
+        location = f'({rng.randint(0, 9)},{rng.randint(0, 9)},{rng.randint(0, 9)})'
+        if module == 'pick':
+            calls.append(f'pick(container={source})')
+        elif module == 'pour':
+            volume = rng.choice(['"half"', '"all"', str(rng.randint(1, 50))])
+            calls.append(f'pour(original_container={source}, destination_container={target}, volume={volume})')
+        elif module == 'place':
+            calls.append(f'place(container={source}, destination_location={location}, landmark="null")')
+        else:
+            calls.append(f'moveto(original_container={source}, destination={location}, landmark="null")')
+    return '\n\n'.join(calls)
+
+# Function to generate resolved (module_name, params) pairs against an inventory, as simulate_modules receives them
+def make_resolved_modules(steps, containers, seed=3):
+    rng = random.Random(seed)
+    modules = []
+    for _ in range(steps):
+        module = rng.choice(['pick', 'pour', 'place', 'moveto'])
+        source, target = rng.choice(containers), rng.choice(containers)
+        source_ref = {'id': source['id'], 'aruco_id': str(source['aruco_id'])}
+        target_ref = {'id': target['id'], 'aruco_id': str(target['aruco_id'])}
+        location = (rng.randint(0, 9), rng.randint(0, 9), rng.randint(0, 9))
+        if module == 'pick':
+            modules.append(('pick', {'container': source_ref}))
+        elif module == 'pour':
+            volume = rng.choice(['half', 'all', str(rng.randint(1, 50))])
+            modules.append(('pour', {'original_container': source_ref, 'destination_container': target_ref, 'volume': volume}))
+        elif module == 'place':
+            modules.append(('place', {'container': source_ref, 'destination_location': location, 'landmark': 'null'}))
+        else:
+            modules.append(('moveto', {'original_container': source_ref, 'destination': location, 'landmark': 'null'}))
+    return modules
@@ -0,0 +1,106 @@
+# legacy_parser.py
+# The regex parser module_parser replaced, as it was in asset_mapper.py and future_positions.py before the change
+# Kept only as a reference for test_module_parser.py; do not use it in the pipeline
+
+import re
+
+# Function to parse module calls
+def parse_module_call(module_call_str):
+    try:
+        # Extract the function name and parameters
+        match = re.match(r'(\w+)\((.*)\)', module_call_str.strip(), re.DOTALL)
+        if not match:
+            print(f"Error parsing module call '{module_call_str}': Invalid format")
+            return None, {}
+        func_name = match.group(1)
+        params_str = match.group(2)
+
+        # Split parameters at the top level
+        param_list = split_top_level(params_str)
+        params = {}
+        for param in param_list:
+            if '=' not in param:
+                continue
+            key, value = param.split('=', 1)
+            key = key.strip()
+            value = value.strip()
+            # Parse the value
+            parsed_value = parse_value(value)
+            params[key] = parsed_value
+        return func_name, params
+    except Exception as e:
+        print(f"Error parsing module call '{module_call_str}': {e}")
+        return None, {}
+
+# Function to split parameters at the top level
+def split_top_level(s):
+    result = []
+    bracket_level = 0
+    current = ''
+    for c in s:
+        if c == ',' and bracket_level == 0:
+            result.append(current)
+            current = ''
+        else:
+            current += c
+            if c in '([{':
+                bracket_level += 1
+            elif c in ')]}':
+                bracket_level -= 1
+    if current:
+        result.append(current)
+    return result
+
+# Function to parse individual values
+def parse_value(value_str):
+    value_str = value_str.strip()
+    # Handle dictionaries
+    if value_str.startswith('{') and value_str.endswith('}'):
+        return parse_dict(value_str)
+    # Handle tuples or lists
+    elif value_str.startswith('(') and value_str.endswith(')'):
+        return parse_tuple(value_str)
+    elif value_str.startswith('[') and value_str.endswith(']'):
+        return parse_list(value_str)
+    # Handle strings
+    elif (value_str.startswith("'") and value_str.endswith("'")) or (value_str.startswith('"') and value_str.endswith('"')):
+        return value_str[1:-1]
+    # Handle numbers
+    else:
+        try:
+            if '.' in value_str:
+                return float(value_str)
+            else:
+                return int(value_str)
+        except ValueError:
+            return value_str  # Return as string if not a number
+
+# Function to parse dictionaries
+def parse_dict(dict_str):
+    dict_str = dict_str.strip()[1:-1].strip()  # Remove braces
+    items = split_top_level(dict_str)
+    result = {}
+    for item in items:
+        if ':' not in item:
+            continue
+        key, value = item.split(':', 1)
+        key = key.strip().strip('\'"')  # Remove quotes from keys
+        value = value.strip()
+        result[key] = parse_value(value)
+    return result
+
+# Function to parse tuples
+def parse_tuple(tuple_str):
+    tuple_str = tuple_str.strip()[1:-1].strip()  # Remove parentheses
+    items = split_top_level(tuple_str)
+    return tuple(parse_value(item) for item in items)
+
+# Function to parse lists
+def parse_list(list_str):
+    list_str = list_str.strip()[1:-1].strip()  # Remove brackets
+    items = split_top_level(list_str)
+    return [parse_value(item) for item in items]
+
+# Function to split a module sequence into calls, as the old process_module_sequence did
+def split_module_sequence(module_sequence):
+    return re.findall(r'(\w+\(.*?\))', module_sequence, re.DOTALL)
@@ -0,0 +1,78 @@
+import pytest
+
+from asset_mapper import find_container, match_container, process_module_sequence
+from container_index import ContainerIndex
+from resolution_cache import RESOLUTION_CACHE
+
+CONTAINERS = [
+    {'id': 'A', 'aruco_id': 101, 'type': 'beaker', 'size': '250ml', 'content_name': 'empty', 'content_color': 'null',
+     'content_volume': 0, 'landmark': 'balance', 'position': [0.5, 0.2, 0.0]},
+    {'id': 'B', 'aruco_id': 102, 'type': 'beaker', 'size': '250ml', 'content_name': 'copper sulphate solution', 'content_color': 'blue',
+     'content_volume': 100, 'landmark': 'shelf', 'position': [0.9, 0.0, 0.0]},
+    {'id': 'C', 'aruco_id': 103, 'type': 'test tube', 'size': 'small', 'content_name': 'water', 'content_color': 'clear',
+     'content_volume': 10, 'landmark': 'shelf', 'position': [1.1, 0.3, 0.0]},
+]
+
+@pytest.fixture
+def index():
+    RESOLUTION_CACHE.clear()
+    return ContainerIndex([container.copy() for container in CONTAINERS])
+
+def resolved_id(description, index):
+    container = match_container(description, index)
+    return container['id'] if container else None
+
+def test_exact_match(index):
+    assert resolved_id({'type': 'beaker', 'content_color': 'blue'}, index) == 'B'
+    assert find_container({'type': 'beaker', 'content_color': 'blue'}, index)['id'] == 'B'
+
+def test_cached_resolutions_belong_to_one_inventory_index(index):
+    assert resolved_id({'type': 'beaker', 'content_color': 'blue'}, index) == 'B'
+    # A reloaded inventory is a new index and does not see the old entries
+    reloaded = ContainerIndex([dict(container, content_color='red') for container in CONTAINERS])
+    assert resolved_id({'type': 'beaker', 'content_color': 'blue'}, reloaded) is None
+    assert resolved_id({'type': 'beaker', 'content_color': 'blue'}, index) == 'B'
+
+@pytest.mark.parametrize('description, expected', [
+    ({'type': 'test-tube'}, 'C'),
+    ({'type': 'beaker', 'content_color': 'light blue'}, 'B'),
+    ({'type': 'beakr', 'content_name': 'copper sulfate'}, 'B'),
+    ({'type': 'test tube', 'content_name': 'watr'}, 'C'),
+])
+def test_fuzzy_match(index, description, expected):
+    assert resolved_id(description, index) == expected
+
+@pytest.mark.parametrize('description', [
+    {'type': 'beaker', 'content_color': 'red'},
+    {'type': 'beaker', 'content_name': 'hydrochloric acid'},
+    {'type': 'beaker', 'content_name': 'sulphuric acid'},
+    {'content_name': 'hydrochloric acid'},
+    {'type': 'flask'},
+])
+def test_no_match_when_an_attribute_is_not_similar(index, description):
+    assert resolved_id(description, index) is None
+
+def test_null_fields_are_ignored(index):
+    assert resolved_id({'type': 'test tube', 'size': 'null', 'content_color': None}, index) == 'C'
+
+def test_active_container_resolves_to_the_held_container(index):
+    sequence = process_module_sequence(
+        'pick(container={type: "test tube"})\n\n'
+        'pour(original_container={type: "beaker", content_color: "blue"}, destination_container="active container", volume="half")',
+        index,
+    )
+    assert 'destination_container={ id: "C", aruco_id: "103" }' in sequence
+
+@pytest.mark.parametrize('sequence', [
+    # Nothing has been picked up
+    'pour(original_container={type: "beaker", content_color: "blue"}, destination_container="active container", volume="half")',
+    # The held container was put down
+    'pick(container={type: "test tube"})\n\nplace(container={type: "test tube"}, destination_location=(1, 2, 3))\n\n'
+    'pour(original_container={type: "beaker", content_color: "blue"}, destination_container="active container", volume="half")',
+    # Pouring the held container into itself
+    'pick(container={type: "beaker", content_color: "blue"})\n\n'
+    'pour(original_container={type: "beaker", content_color: "blue"}, destination_container="active container", volume="half")',
+])
+def test_active_container_without_a_distinct_held_container_is_unknown(index, sequence, capsys):
+    assert 'destination_container={ id: "unknown", aruco_id: "unknown" }' in process_module_sequence(sequence, index)
+    assert 'destination_container' in capsys.readouterr().out
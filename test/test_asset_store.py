@@ -0,0 +1,77 @@
+import os
+import pickle
+
+import asset_store
+from asset_store import SNAPSHOT_HEADER, AssetStore, read_snapshot, write_snapshot
+
+ASSETS = '''containers:
+  - id: A
+    aruco_id: 101
+    type: beaker
+    size: 250ml
+    content_name: empty
+    content_color: "null"
+    content_volume: 0
+    landmark: balance
+    position: [0.5, 0.2, 0.0]
+  - id: B
+    aruco_id: 102
+    type: beaker
+    content_name: copper sulphate solution
+    content_volume: 100.5
+    position: [0.9, 0.0, 0.0]
+    tags: [fragile]
+'''
+
+def write_assets(tmp_path):
+    path = tmp_path / 'container_assets.yaml'
+    path.write_text(ASSETS)
+    return str(path)
+
+def test_snapshot_round_trip(tmp_path):
+    containers = [
+        {'id': 'A', 'type': 'beaker', 'content_color': None, 'position': [0.5, 0.2, 0.0]},
+        {'id': 'B', 'type': 'flask', 'content_volume': 12.5, 'tags': ['fragile']},
+        {'id': 'C', 'size': 250},
+    ]
+    path = str(tmp_path / 'inventory.snapshot')
+    write_snapshot(path, containers, 1, 2, b'\0' * 32)
+    assert read_snapshot(path) == containers
+
+def test_second_load_reads_the_snapshot(tmp_path):
+    path = write_assets(tmp_path)
+    first = [container['id'] for container in AssetStore(path).containers()]
+    assert os.path.exists(path + '.snapshot')
+    with open(path + '.snapshot', 'rb') as file:
+        file.seek(SNAPSHOT_HEADER.size)
+        assert file.read(1) == b'{'
+    second = AssetStore(path)
+    assert [container['id'] for container in second.containers()] == first == ['A', 'B']
+    assert second.containers()[1]['tags'] == ['fragile']
+
+class Exploit:
+    def __reduce__(self):
+        return (os.mkdir, (self.marker,))
+
+def test_tampered_snapshot_is_not_executed(tmp_path, capsys):
+    path = write_assets(tmp_path)
+    AssetStore(path).containers()
+    snapshot_path = path + '.snapshot'
+    with open(snapshot_path, 'rb') as file:
+        header = file.read(SNAPSHOT_HEADER.size)
+    exploit = Exploit()
+    exploit.marker = str(tmp_path / 'pwned')
+    with open(snapshot_path, 'wb') as file:
+        file.write(header + pickle.dumps(exploit))
+    containers = AssetStore(path).containers()
+    assert not os.path.exists(exploit.marker)
+    assert [container['id'] for container in containers] == ['A', 'B']
+    assert 'Error reading snapshot' in capsys.readouterr().out
+
+def test_unserializable_containers_skip_the_snapshot(tmp_path, monkeypatch, capsys):
+    path = write_assets(tmp_path)
+    monkeypatch.setattr(asset_store, 'parse_yaml', lambda file: {'containers': [{'id': 'A', 1: 'numeric key'}]})
+    containers = AssetStore(path).containers()
+    assert containers[0]['id'] == 'A'
+    assert not os.path.exists(path + '.snapshot')
+    assert 'Error writing snapshot' in capsys.readouterr().out
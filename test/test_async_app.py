@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+import api_calls
+import async_app
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    calls = []
+
+    async def agenerate_module_sequence(instruction, api_key, request_timeout=None, backend=None, **kwargs):
+        calls.append(instruction)
+        await asyncio.sleep(0.01)
+        return f'pick(container={{type: "{instruction}"}})'
+
+    monkeypatch.setattr(api_calls, 'agenerate_module_sequence', agenerate_module_sequence)
+    return calls
+
+def post_batch(instructions):
+    async def post():
+        client = async_app.app.test_client()
+        response = await client.post('/submit_batch', json={'instructions': instructions, 'backend': 'openai'})
+        return response.status_code, await response.get_json()
+    return asyncio.run(post())
+
+def test_full_batch_on_idle_server_is_not_throttled(fake_llm, monkeypatch):
+    monkeypatch.setattr(async_app, 'llm_limiter', async_app.Limiter(2, 1))
+    monkeypatch.setattr(async_app, 'batch_semaphore', asyncio.Semaphore(4))
+    instructions = [f'beaker {i}' for i in range(async_app.BATCH_MAX_ITEMS)]
+    status, body = post_batch(instructions)
+    assert status == 200
+    assert [result.get('error') for result in body['results']] == [None] * len(instructions)
+    assert len(fake_llm) == len(instructions)
+
+def test_busy_server_rejects_the_whole_batch_once(fake_llm, monkeypatch):
+    monkeypatch.setattr(async_app, 'llm_limiter', async_app.Limiter(0, 0))
+    status, body = post_batch(['beaker', 'flask'])
+    assert status == 503
+    assert 'busy' in body['error']
+    assert fake_llm == []
+
+def test_duplicate_instructions_share_one_call(fake_llm, monkeypatch):
+    monkeypatch.setattr(async_app, 'llm_limiter', async_app.Limiter(2, 1))
+    monkeypatch.setattr(async_app, 'batch_semaphore', asyncio.Semaphore(4))
+    status, body = post_batch(['beaker', ' Beaker ', 'flask'])
+    assert status == 200
+    assert len(fake_llm) == 2
+    assert body['results'][0] == body['results'][1]
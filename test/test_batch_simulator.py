@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+import pytest
+
+from batch_simulator import simulate_batch, simulate_plan
+from future_positions import simulate_modules
+from synthetic_inventory import make_containers, make_resolved_modules
+
+CONTAINERS = make_containers(40)
+STEPS = 30
+PLANS = [make_resolved_modules(STEPS, CONTAINERS, seed) for seed in range(3, 7)]
+
+# Function to read the volumes, content names and colors out of a trace state, like simulate_modules' containers
+def contents_at(trace, step):
+    _, _, volumes, names, colors = trace.state_at(step)
+    strings = trace.inventory.strings
+    return {
+        container_id: (float(volumes[row]), strings[names[row]], strings[colors[row]])
+        for row, container_id in enumerate(trace.inventory.ids)
+    }
+
+def contents_of(containers):
+    return {container['id']: (float(container['content_volume']), container['content_name'], container['content_color']) for container in containers}
+
+def test_positions_after_each_step_match_simulate_modules():
+    traces = simulate_batch(PLANS, CONTAINERS)
+    for modules, trace in zip(PLANS, traces):
+        positions_after, _ = simulate_modules(modules, CONTAINERS, collisions=[])
+        assert len(trace) == len(positions_after) == STEPS
+        assert trace.module_names == [module_name for module_name, _ in positions_after]
+        # Visit the steps out of order so the trace steps both forwards and backwards
+        steps = list(range(STEPS))
+        random.Random(0).shuffle(steps)
+        for step in steps:
+            assert trace.positions_at(step) == positions_after[step][1]
+
+def test_contents_at_each_step_match_simulate_modules():
+    trace = simulate_plan(PLANS[0], CONTAINERS)
+    assert contents_at(trace, -1) == contents_of(CONTAINERS)
+    for step in [STEPS - 1] + list(range(STEPS - 1, -1, -3)):
+        _, expected = simulate_modules(PLANS[0][:step + 1], CONTAINERS, collisions=[])
+        assert contents_at(trace, step) == pytest.approx(contents_of(expected))
+
+def test_final_containers_match_simulate_modules():
+    for modules, trace in zip(PLANS, simulate_batch(PLANS, CONTAINERS)):
+        _, expected = simulate_modules(modules, CONTAINERS, collisions=[])
+        final = trace.final_containers()
+        assert [container['id'] for container in final] == [container['id'] for container in expected]
+        for container, other in zip(final, expected):
+            assert container['position'] == other['position']
+            assert container['content_volume'] == pytest.approx(other['content_volume'])
+            assert (container['content_name'], container['content_color']) == (other['content_name'], other['content_color'])
+
+def test_batch_leaves_the_starting_inventory_unchanged():
+    positions = {container['id']: container['position'] for container in CONTAINERS}
+    trace = simulate_batch(PLANS, CONTAINERS)[1]
+    trace.state_at(STEPS - 1)
+    assert trace.positions_at(-1) == positions
+    assert np.array_equal(trace.inventory.volumes, [container['content_volume'] for container in CONTAINERS])
+    with pytest.raises(IndexError):
+        trace.state_at(STEPS)
@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+
+import yaml
+
+from bt_compiler import compile_module_sequence
+from container_index import ContainerIndex
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ASSETS = '''containers:
+  - id: A
+    aruco_id: 101
+    type: beaker
+    size: 250ml
+    content_name: empty
+    content_color: "null"
+    content_volume: 0
+    landmark: balance
+    position: [0.5, 0.2, 0.0]
+  - id: B
+    aruco_id: 102
+    type: beaker
+    size: 250ml
+    content_name: copper sulphate solution
+    content_color: blue
+    content_volume: 100
+    landmark: shelf
+    position: [0.9, 0.0, 0.0]
+'''
+
+# Unmatched container, collision with A, unsupported module and a call that does not parse
+PLAN = '''pick(container={type: "flask", content_color: "red"})
+
+place(container={type: "beaker", content_color: "blue"}, destination_location=(0.5, 0.2, 0.0))
+
+fly(container={type: "beaker"})
+
+pick(container={type: "beaker", content_name: "unterminated)
+'''
+
+def test_cli_keeps_diagnostics_out_of_the_yaml(tmp_path):
+    assets = tmp_path / 'assets.yaml'
+    assets.write_text(ASSETS)
+    plan = tmp_path / 'plan.txt'
+    plan.write_text(PLAN)
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO, 'bt_compiler.py'), str(plan), '--assets', str(assets)],
+        capture_output=True, text=True, cwd=tmp_path, check=True,
+    )
+    assert yaml.safe_load(result.stdout) == {
+        'Poses': {'pose1': {'x': 0.5, 'y': 0.2, 'z': 0.0, 'roll': 0.0, 'pitch': 0.0, 'yaw': 1.0}},
+        'targets': ['pose1', 'release'],
+    }
+    assert 'No matching container found for container in pick' in result.stderr
+    assert 'Error compiling fly: unsupported module' in result.stderr
+    assert 'place puts B at' in result.stderr
+    assert 'Error parsing module call' in result.stderr
+
+def test_errors_list_collects_diagnostics(capsys):
+    index = ContainerIndex(yaml.safe_load(ASSETS)['containers'])
+    errors = []
+    text = compile_module_sequence(PLAN, index, errors=errors)
+    assert yaml.safe_load(text)['targets'] == ['pose1', 'release']
+    assert len(errors) == 5
+    assert capsys.readouterr().out == ''
+
+def test_moved_container_gets_poses_at_its_new_position():
+    index = ContainerIndex(yaml.safe_load(ASSETS)['containers'])
+    plan = (
+        'pick(container={type: "beaker", content_name: "empty"})\n\n'
+        'place(container={type: "beaker", content_name: "empty"}, destination_location=(0.1, 0.1, 0.0))\n\n'
+        'pick(container={type: "beaker", content_name: "empty"})'
+    )
+    for _ in range(2):
+        bt = yaml.safe_load(compile_module_sequence(plan, index, errors=[]))
+        poses = [bt['Poses'][target] for target in bt['targets'] if target in bt['Poses']]
+        assert [(pose['x'], pose['y']) for pose in poses] == [(0.5, 0.2), (0.1, 0.1), (0.1, 0.1)]
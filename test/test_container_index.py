@@ -0,0 +1,61 @@
+from container_index import ContainerIndex, ensure_index, first_match
+from models import compact_containers
+from synthetic_inventory import make_containers, make_queries
+
+CONTAINERS = make_containers(500)
+QUERIES = make_queries(200)
+
+# Function to match by checking every container, the behaviour the index has to reproduce
+def scan(containers, criteria):
+    criteria = {key: str(value).lower() for key, value in criteria.items() if value != 'null'}
+    return [container for container in containers if all(str(container.get(key, '')).lower() == value for key, value in criteria.items())]
+
+def test_postings_hold_each_container_under_its_normalized_values():
+    index = ContainerIndex([{'id': 'A', 'type': 'Beaker', 'content_name': ' Water '}, {'id': 'B', 'type': 'beaker'}])
+    assert index.postings['type'] == {'beaker': {0, 1}}
+    assert index.postings['content_name'] == {'water': {0}, '': {1}}
+
+def test_match_agrees_with_a_scan():
+    index = ContainerIndex(CONTAINERS)
+    for query in QUERIES:
+        assert index.match(query) == scan(CONTAINERS, query)
+    # Keys that are not indexed are compared directly
+    assert index.match({'id': 'C7', 'Content Color': 'null'}) == [CONTAINERS[7]]
+
+def test_compact_containers_match_the_same_ids():
+    index = ContainerIndex(CONTAINERS)
+    compact = ContainerIndex(compact_containers(CONTAINERS))
+    assert compact.compact
+    for query in QUERIES:
+        assert [container['id'] for container in compact.match(query)] == [container['id'] for container in index.match(query)]
+
+def test_first_match_on_a_list_agrees_with_the_index():
+    index = ContainerIndex(CONTAINERS)
+    for query in QUERIES:
+        assert first_match(CONTAINERS, query) is index.match_one(query)
+
+def test_changed_rebuilds_the_postings_for_a_pour():
+    containers = [dict(container) for container in CONTAINERS[:50]]
+    index = ensure_index(containers)
+    assert ensure_index(index) is index
+    target = containers[3]
+    assert target not in index.match({'content_name': 'brine'})
+    target['content_name'] = 'brine'
+    index.changed(target, ('content_volume', 'content_name'))
+    assert index.match({'content_name': 'brine'}) == [target]
+
+def test_moved_updates_the_spatial_grid_in_place():
+    containers = [dict(container) for container in CONTAINERS[:50]]
+    index = ContainerIndex(containers)
+    grid = index.spatial
+    postings = index.postings
+    target = containers[10]
+    target['position'] = (5.0, 5.0, 0.0)
+    index.moved(target)
+    # A move keeps both indexes; only the grid entry changes
+    assert index.spatial is grid and index.postings is postings
+    assert grid.position(target['id']) == (5.0, 5.0, 0.0)
+    assert index.nearest({}, (5.0, 5.0, 0.0))[0][1] is target
+    target['position'] = 'shelf'
+    index.moved(target)
+    assert target['id'] not in grid
@@ -0,0 +1,37 @@
+import pytest
+
+from module_parser import IncrementalParser, parse_calls
+
+SEQUENCES = [
+    # Apostrophes inside unquoted values
+    'pick(container={type: beaker, content_name: it\'s water})\n\n'
+    'place(container={type: beaker}, destination_location=(1, 2, 3))',
+    'pour(original_container={content_name: "dad\'s \\"best\\" (blue)"}, destination_container={type: flask}, volume="half")\n'
+    'moveto(original_container={type: o\'brien\'s flask}, destination=(0.5, 0.2, 0))',
+    # Quoted strings with brackets and commas inside
+    "Plan:\n1. pick(container={type: 'test tube', content_name: 'salt (NaCl), dissolved'})\n"
+    '2. place(container={type: "test tube"}, destination_location=(1,2,3), landmark="null")',
+    # A call that does not parse is skipped by both, and later steps still arrive
+    'pick(container={type: "beaker})\n\npick(container={type: beaker})',
+    'pick(container={type: beaker}, volume=[1, 2)\n\nplace(container={type: flask}, destination_location=(1,1,1))',
+]
+
+# Function to feed text in chunks of the given size and return the calls as (name, params)
+def streamed(text, size):
+    parser = IncrementalParser()
+    calls = []
+    for start in range(0, len(text), size):
+        calls.extend(parser.feed(text[start:start + size]))
+    calls.extend(parser.finish())
+    return [(call.name, call.params()) for call in calls]
+
+@pytest.mark.parametrize('text', SEQUENCES)
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 16, 1000])
+def test_streamed_calls_match_batch(text, size):
+    batch = [(call.name, call.params()) for call in parse_calls(text, errors=[])]
+    assert streamed(text, size) == batch
+
+def test_apostrophe_in_unquoted_value_keeps_later_steps():
+    calls = streamed(SEQUENCES[0], 5)
+    assert [name for name, _ in calls] == ['pick', 'place']
+    assert calls[0][1]['container']['content_name'] == "it's water"
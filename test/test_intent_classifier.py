@@ -0,0 +1,29 @@
+import pytest
+
+from intent_classifier import IntentClassifier
+
+@pytest.fixture(scope='module')
+def classifier():
+    return IntentClassifier()
+
+def test_simple_instructions_are_built_locally(classifier):
+    sequence = classifier.build_module_sequence('pour half of the red beaker into the empty flask')
+    assert sequence.startswith('pour(original_container={type: "beaker"')
+    assert sequence.endswith('volume="half")')
+    assert classifier.build_module_sequence('place the beaker at (0.1, 0.2, 0.3)').startswith('place(')
+
+@pytest.mark.parametrize('instruction', [
+    # A volume only pour can use
+    'pick the beaker with 50 ml',
+    'place the beaker with 50 ml at (1, 2, 3)',
+    # A location pick and pour cannot use
+    'pour the red beaker into the flask at (1, 2, 3)',
+    # A second location or volume in one clause
+    'place the beaker at (1, 2, 3) at (2, 3, 4)',
+    'pour half of the red beaker into the flask 20 ml',
+    # Numbers and symbols without a unit
+    'pour 30% of the blue beaker into the flask',
+    'pour 20 of the blue beaker into the flask',
+])
+def test_unused_details_fall_back_to_the_llm(classifier, instruction):
+    assert classifier.build_module_sequence(instruction) is None
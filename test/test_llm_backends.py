@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+import api_calls
+import fake_llm_server
+from llm_backends import LLMBackend, LLMBackendError, LocalServerBackend, select_backend
+
+MESSAGES = [{'role': 'user', 'content': 'pick up the blue beaker'}]
+
+@pytest.fixture
+def slow_server():
+    server = fake_llm_server.start_in_thread(port=0, latency=0.5)
+    yield f'http://127.0.0.1:{server.server_address[1]}/v1'
+    server.shutdown()
+
+def test_local_backend_honours_the_request_timeout(slow_server):
+    backend = LocalServerBackend(slow_server, pool_size=1)
+    try:
+        start = time.monotonic()
+        with pytest.raises(LLMBackendError):
+            backend.complete(MESSAGES, 16, request_timeout=0.1)
+        assert time.monotonic() - start < 0.4
+        # The pooled connection gets the default timeout back for the next request
+        response = backend.complete(MESSAGES, 16)
+        assert response['choices'][0]['message']['content'].startswith('pick(')
+        backend.complete(MESSAGES, 16, request_timeout=5)
+        assert backend.pool.idle.qsize() == 1
+    finally:
+        backend.close()
+
+# Backend answering every request with an invalid step after a delay, recording the timeout each one was given
+class SlowInvalidBackend(LLMBackend):
+    name = 'slow_invalid'
+    model = 'slow'
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.timeouts = []
+
+    def complete(self, messages, max_tokens, request_timeout=None, api_key=None, grammar=None):
+        self.timeouts.append(request_timeout)
+        time.sleep(self.delay)
+        return {'choices': [{'message': {'content': 'pick(container="beaker")'}, 'finish_reason': 'stop'}]}
+
+def test_generation_sends_no_requests_after_the_deadline():
+    backend = SlowInvalidBackend(0.3)
+    with pytest.raises(TimeoutError):
+        api_calls.request_module_sequence('pick the beaker', None, use_cache=False, request_timeout=60, backend=backend,
+                                          deadline=time.monotonic() + 0.2)
+    # The first answer needs a repair, but it arrives after the deadline so none is sent
+    assert backend.timeouts == [1]
+    with pytest.raises(TimeoutError):
+        api_calls.request_module_sequence('pick the beaker', None, use_cache=False, backend=backend, deadline=time.monotonic())
+    assert len(backend.timeouts) == 1
+
+def test_select_backend_reports_unknown_backends_and_missing_keys(monkeypatch):
+    backend, api_key, error = select_backend({'backend': 'nope'})
+    assert backend is None and error[1] == 400 and 'nope' in error[0]['error']
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    assert select_backend({'backend': 'openai'})[2][1] == 500
+    monkeypatch.setenv('OPENAI_API_KEY', 'key')
+    backend, api_key, error = select_backend({'backend': 'openai'})
+    assert backend.name == 'openai' and api_key == 'key' and error is None
@@ -0,0 +1,30 @@
+from container_index import ContainerIndex
+from models import compact_containers
+from shared_inventory import SharedInventory, SharedInventoryWriter
+
+CONTAINERS = [
+    {'id': 'A', 'type': 'Beaker', 'size': 250, 'content_name': 'Copper Sulphate', 'content_color': None},
+    {'id': 'B', 'type': 'beaker', 'size': '250', 'content_name': 'water', 'landmark': 'Fume Hood'},
+]
+
+def test_compact_containers_keep_original_values():
+    containers = compact_containers(CONTAINERS)
+    assert [container.to_dict() for container in containers] == CONTAINERS
+    assert containers[0]['size'] == 250 and containers[1]['size'] == '250'
+
+def test_compact_containers_match_on_normalized_values():
+    index = ContainerIndex(compact_containers(CONTAINERS))
+    assert [container['id'] for container in index.match({'type': 'BEAKER', 'size': '250'})] == ['A', 'B']
+    assert [container['id'] for container in index.match({'content_name': 'copper sulphate'})] == ['A']
+    assert index.match({'landmark': 'fume hood'})[0]['landmark'] == 'Fume Hood'
+
+def test_shared_inventory_keeps_original_values():
+    writer = SharedInventoryWriter(f'ras_test_models_{id(CONTAINERS)}', CONTAINERS)
+    inventory = SharedInventory(writer.name)
+    try:
+        assert [container.to_dict() for container in inventory.containers()] == CONTAINERS
+        assert [container['id'] for container in inventory.match({'type': 'BEAKER', 'size': '250'})] == ['A', 'B']
+        assert inventory.match({'content_name': 'copper sulphate'})[0]['content_name'] == 'Copper Sulphate'
+    finally:
+        inventory.close()
+        writer.close(remove=True)
@@ -0,0 +1,64 @@
+import pytest
+
+import api_calls
+from module_grammar import validate_sequence
+
+VALID_PICK = 'pick(container={type: "beaker", content_color: "blue"})'
+VALID_PLACE = 'place(container={type: "beaker"}, destination_location=(1, 2, 3), landmark="null")'
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    requests = []
+
+    def complete(prompt_request, request_timeout=None, backend=None, api_key=None, deadline=None):
+        requests.append(prompt_request)
+        return VALID_PICK
+
+    monkeypatch.setattr(api_calls, 'complete', complete)
+    return requests
+
+def test_prose_is_not_a_step():
+    text = f'The container(s) are on the shelf (see below).\n\n{VALID_PICK}\n\nThen we place it(carefully).\n\n{VALID_PLACE}'
+    steps = validate_sequence(text)
+    assert [step.text for step in steps] == [VALID_PICK, VALID_PLACE]
+    assert all(step.valid for step in steps)
+
+def test_numbered_and_bulleted_steps():
+    steps = validate_sequence(f'1. {VALID_PICK}\n- {VALID_PLACE}')
+    assert [step.call.name for step in steps] == ['pick', 'place']
+
+def test_unknown_modules_are_dropped():
+    steps = validate_sequence(f'wait(seconds=5)\n\n{VALID_PICK}')
+    assert [step.text for step in steps] == [VALID_PICK]
+
+def test_calls_inside_a_line_are_not_steps():
+    steps = validate_sequence(f'First we pick(the beaker), then:\n{VALID_PICK}')
+    assert [step.text for step in steps] == [VALID_PICK]
+
+def test_invalid_known_step_is_reported():
+    steps = validate_sequence(f'{VALID_PICK}\n\npour(original_container={{type: "beaker"}})\n\n{VALID_PLACE}')
+    assert [step.valid for step in steps] == [True, False, True]
+    assert "missing argument 'destination_container' for pour" in steps[1].errors
+
+def test_broken_step_ends_at_the_next_step():
+    steps = validate_sequence(f'pick(container={{type: "beaker}})\n\n{VALID_PLACE}')
+    assert len(steps) == 2
+    assert not steps[0].valid
+    assert steps[1].valid
+
+def test_active_container_destination_is_valid():
+    steps = validate_sequence('pour(original_container={type: "beaker"}, destination_container="active container", volume="all")')
+    assert steps[0].valid
+
+def test_prose_does_not_trigger_a_repair(no_llm):
+    text = f'Here is the plan. The container(s) are ready.\n\n{VALID_PICK}'
+    sequence, outcome = api_calls.repair_module_sequence(text, 'pick the blue beaker', 'key')
+    assert outcome == 'valid'
+    assert no_llm == []
+
+def test_only_invalid_steps_are_repaired(no_llm):
+    text = f'{VALID_PLACE}\n\npick(container="beaker")'
+    sequence, outcome = api_calls.repair_module_sequence(text, 'pick the blue beaker', 'key')
+    assert outcome == 'repaired'
+    assert len(no_llm) == 1
+    assert sequence == f'{VALID_PLACE}\n\n{VALID_PICK}'
@@ -0,0 +1,59 @@
+import pytest
+
+import legacy_parser
+from module_parser import ParseError, parse_call, parse_calls
+from synthetic_inventory import make_module_sequence
+
+# The README example, as the LLM writes it
+SEQUENCE = '''pick(container={type: "beaker", size: "null", content_name: "null", content_color: "blue", content_volume: "null", landmark: "null"})
+
+pour(original_container={type: "beaker", size: "null", content_name: "null", content_color: "blue", content_volume: "null", landmark: "null"}, destination_container={type: "beaker", size: "null", content_name: "empty", content_color: "null", content_volume: "null", landmark: "null"}, volume="half")
+
+place(container={type: "beaker", size: "null", content_name: "null", content_color: "blue", content_volume: "null", landmark: "null"}, destination_location=(1,2,3))'''
+
+CALLS = SEQUENCE.split('\n\n') + [
+    # Resolved calls, as asset_mapper writes them
+    'pick(container={ id: "B", aruco_id: "102" })',
+    "pour(original_container={'type': 'flask'}, destination_container={type: beaker}, volume=12.5)",
+    'moveto(original_container={ id: "B", aruco_id: "102" }, destination=[1, 2.5, -3], landmark="null")',
+    'pick(\n  container={type: "beaker",\n    size: "250"}\n)',
+    'place(container={type: "vial (small)"}, destination_location=(0.5, -1, 2))',
+    # An entry without a colon is skipped, as before
+    'pick(container={type "beaker", size: "small"})',
+]
+
+def new_parse(text):
+    call = parse_call(text)
+    return call.name, call.params()
+
+@pytest.mark.parametrize('text', CALLS)
+def test_calls_parse_as_the_regex_parser_did(text):
+    assert new_parse(text) == legacy_parser.parse_module_call(text)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_synthetic_plans_parse_as_the_regex_parser_did(seed):
+    for text in make_module_sequence(200, seed).split('\n\n'):
+        assert new_parse(text) == legacy_parser.parse_module_call(text)
+
+def test_sequences_without_nested_calls_split_as_before():
+    sequence = '\n\n'.join(SEQUENCE.split('\n\n')[:2]) + '\n\nSome prose in between.\npick(container={ id: "A" })'
+    old = [legacy_parser.parse_module_call(text) for text in legacy_parser.split_module_sequence(sequence)]
+    assert [(call.name, call.params()) for call in parse_calls(sequence)] == old
+
+# Intended differences: the regex parser cut a call at its first ')' and split quoted values at commas
+
+def test_nested_tuple_is_kept():
+    place = SEQUENCE.split('\n\n')[2]
+    assert parse_calls(place)[0].params()['destination_location'] == (1, 2, 3)
+    truncated = legacy_parser.split_module_sequence(place)[0]
+    assert legacy_parser.parse_module_call(truncated)[1]['destination_location'] == '(1,2,3'
+
+def test_quoted_comma_stays_in_the_value():
+    text = 'pick(container={type: "beaker", content_name: "water, distilled"})'
+    assert new_parse(text)[1]['container']['content_name'] == 'water, distilled'
+    assert legacy_parser.parse_module_call(text)[1]['container'].get('content_name') != 'water, distilled'
+
+def test_errors_point_at_the_line_and_column():
+    with pytest.raises(ParseError) as error:
+        parse_calls('pick(container={type: "a"})\n\npour(volume=)', strict=True)
+    assert (error.value.line, error.value.column) == (3, 13)
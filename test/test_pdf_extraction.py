@@ -0,0 +1,79 @@
+from concurrent.futures import Future
+
+import pytest
+
+import pdf_extraction
+from bench_pdf_extraction import make_pdf, sequential_extract
+
+@pytest.fixture
+def text_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extraction, 'TEXT_CACHE_FOLDER', str(tmp_path / 'cache'))
+    monkeypatch.setattr(pdf_extraction, '_text_cache', pdf_extraction.OrderedDict())
+    return tmp_path / 'cache'
+
+# Pool that runs each task when its result is asked for, so the test decides what happens in between
+class DeferredPool:
+    def __init__(self):
+        self.paths = set()
+
+    def submit(self, function, *args):
+        self.paths.add(args[0])
+        future = Future()
+        future.result = lambda timeout=None: function(*args)
+        return future
+
+def test_chunks_cover_every_page_in_order(tmp_path, text_cache, monkeypatch):
+    path = str(tmp_path / 'sop.pdf')
+    make_pdf(path, 10)
+    monkeypatch.setattr(pdf_extraction, 'PDF_WORKERS', 2)
+    chunks = list(pdf_extraction.iter_pdf_chunks(path, pages_per_task=3))
+    assert [(start, stop) for start, stop, _ in chunks] == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    assert ''.join(text for _, _, text in chunks) == sequential_extract(path)
+    # The workers' snapshot is removed once the document is done
+    assert [entry.suffix for entry in text_cache.iterdir()] == ['.txt']
+
+def test_single_worker_reads_the_pages_in_process(tmp_path, text_cache, monkeypatch):
+    path = str(tmp_path / 'sop.pdf')
+    make_pdf(path, 5)
+    monkeypatch.setattr(pdf_extraction, 'PDF_WORKERS', 1)
+    chunks = list(pdf_extraction.iter_pdf_chunks(path, pages_per_task=2))
+    assert [(start, stop) for start, stop, _ in chunks] == [(0, 2), (2, 4), (4, 5)]
+    assert ''.join(text for _, _, text in chunks) == sequential_extract(path)
+
+def test_reupload_during_extraction_does_not_mix_documents(tmp_path, text_cache, monkeypatch):
+    path = str(tmp_path / 'sop.pdf')
+    make_pdf(path, 9)
+    expected = sequential_extract(path)
+    pool = DeferredPool()
+    monkeypatch.setattr(pdf_extraction, 'PDF_WORKERS', 2)
+    monkeypatch.setattr(pdf_extraction, 'get_pool', lambda: pool)
+    chunks = pdf_extraction.iter_pdf_chunks(path, pages_per_task=3)
+    first = next(chunks)
+    # Another upload with the same secure_filename replaces the file before the later ranges are read
+    make_pdf(path, 4)
+    rest = list(chunks)
+    assert path not in pool.paths
+    assert first[2] + ''.join(text for _, _, text in rest) == expected
+
+def test_text_cache_hits_memory_then_disk(tmp_path, text_cache, monkeypatch):
+    path = str(tmp_path / 'sop.pdf')
+    make_pdf(path, 3)
+    text = pdf_extraction.extract_text_from_pdf(path)
+    assert list(pdf_extraction.iter_pdf_chunks(path)) == [(0, None, text)]
+    # Extraction is not run again once the text is cached, in memory or only on disk
+    monkeypatch.setattr(pdf_extraction, 'extract_page_range', None)
+    pdf_extraction._text_cache.clear()
+    assert list(pdf_extraction.iter_pdf_chunks(path)) == [(0, None, text)]
+    content_hash = pdf_extraction.read_document(path)[1]
+    assert (text_cache / f'{content_hash}.txt').read_text(encoding='utf-8') == text
+
+def test_memory_cache_keeps_the_most_recent_entries(text_cache, monkeypatch):
+    monkeypatch.setattr(pdf_extraction, 'TEXT_CACHE_ENTRIES', 2)
+    for name in ('a', 'b', 'c'):
+        pdf_extraction.store_text(name, name * 3)
+    assert list(pdf_extraction._text_cache) == ['b', 'c']
+    assert pdf_extraction.get_cached_text('b') == 'bbb'
+    # An evicted entry is read back from disk and becomes the most recent again
+    assert pdf_extraction.get_cached_text('a') == 'aaa'
+    assert list(pdf_extraction._text_cache) == ['b', 'a']
+    assert pdf_extraction.get_cached_text('missing') is None
@@ -0,0 +1,56 @@
+import os
+import threading
+
+import pipeline_client
+import pipeline_daemon
+
+ASSETS = '''containers:
+  - id: A
+    aruco_id: 101
+    type: beaker
+    content_color: blue
+    position: [0.5, 0.2, 0.0]
+'''
+PLAN = '''pick(container={type: "flask"})
+
+pick(container={type: "beaker", content_color: "blue"})
+'''
+
+def test_default_assets_resolved_against_the_callers_directory(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(pipeline_client, 'run_command', lambda op, output=None, **params: calls.append((op, params)))
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'sequence.txt').write_text('pick(container={type: "beaker"})')
+    pipeline_client.port_to_bt_main(['sequence.txt'])
+    pipeline_client.main(['resolve', 'sequence.txt'])
+    expected = os.path.join(str(tmp_path), pipeline_client.DEFAULT_ASSETS_PATH)
+    assert [params['assets'] for op, params in calls] == [expected, expected]
+
+def test_explicit_assets_are_made_absolute(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(pipeline_client, 'run_command', lambda op, output=None, **params: calls.append(params))
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'sequence.txt').write_text('')
+    pipeline_client.port_to_bt_main(['sequence.txt', '--assets', 'lab.yaml'])
+    assert calls[0]['assets'] == str(tmp_path / 'lab.yaml')
+
+def test_daemon_returns_diagnostics_to_the_client(tmp_path, capsys):
+    assets = tmp_path / 'assets.yaml'
+    assets.write_text(ASSETS)
+    path = str(tmp_path / 'daemon.sock')
+    server = pipeline_daemon.PipelineServer(path, str(assets))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with pipeline_client.PipelineClient(path, autostart=False) as client:
+            errors = []
+            resolved = client.call('resolve', errors, module_sequence=PLAN)
+            assert resolved.endswith('pick(container={ id: "A", aruco_id: "101" })')
+            assert errors == ['No matching container found for container in pick']
+            client.call('compile', module_sequence=PLAN)
+    finally:
+        server.shutdown()
+        server.server_close()
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert 'No matching container found for container in pick' in captured.err
@@ -0,0 +1,78 @@
+import pytest
+
+from asset_mapper import held_after, resolve_containers
+from container_index import ContainerIndex
+from future_positions import simulate_modules
+from module_parser import parse_calls
+from plan_session import PlanSession
+from synthetic_inventory import make_containers, make_module_sequence
+
+def pick(container_id):
+    return f'pick(container={{id: "{container_id}"}})'
+
+def pour_from_held(destination_id):
+    return f'pour(original_container="active container", destination_container={{id: "{destination_id}"}}, volume="half")'
+
+def place(location):
+    return f'place(container="active container", destination_location={location})'
+
+@pytest.fixture
+def index():
+    return ContainerIndex(make_containers(60))
+
+# Function to run the whole plan from scratch, the way the session must agree with
+def full_run(text, index):
+    modules = []
+    held = None
+    for call in parse_calls(text, errors=[]):
+        params = resolve_containers(call.name, call.params(), index, errors=[], held=held)
+        held = held_after(call.name, params, held)
+        modules.append((call.name, params))
+    return modules, simulate_modules(modules, index.containers, collisions=[])
+
+def assert_matches_full_run(session, index):
+    modules, (positions, state) = full_run(session.text, index)
+    assert [(step.name, step.params) for step in session.steps] == modules
+    assert [container.copy() for container in session.final_state()] == state
+    for step in range(0, len(session), 7):
+        assert session.positions_after(step) == positions[step][1]
+
+def test_edits_match_a_full_run(index, capsys):
+    session = PlanSession(index, make_module_sequence(80, seed=5), checkpoint_interval=8)
+    assert_matches_full_run(session, index)
+    session.edit(10, pick('C3'))
+    assert_matches_full_run(session, index)
+    session.insert(40, place('(1, 1, 0)') + '\n\n' + pick('C7'))
+    assert_matches_full_run(session, index)
+    session.delete(3, 2)
+    assert_matches_full_run(session, index)
+    steps = session.text.split('\n\n')
+    steps[50] = pick('C9')
+    session.update('\n\n'.join(steps))
+    assert_matches_full_run(session, index)
+
+def test_active_container_follows_an_edited_pick(index, capsys):
+    text = '\n\n'.join([pick('C0'), pour_from_held('C5'), place('(0.1, 0.2, 0.0)'), pour_from_held('C6')])
+    session = PlanSession(index, text)
+    assert session.steps[1].params['original_container']['id'] == 'C0'
+    session.final_state()
+    session.edit(0, pick('C1'))
+    assert session.steps[1].params['original_container']['id'] == 'C1'
+    assert session.steps[2].params['container']['id'] == 'C1'
+    # After the place nothing is held, whatever was picked before
+    assert session.steps[3].params['original_container']['id'] == 'unknown'
+    assert_matches_full_run(session, index)
+
+def test_active_container_follows_deleted_and_inserted_picks(index, capsys):
+    text = '\n\n'.join([pick('C0'), pick('C2'), pour_from_held('C5')])
+    session = PlanSession(index, text)
+    session.final_state()
+    session.delete(1)
+    assert session.steps[1].params['original_container']['id'] == 'C0'
+    assert_matches_full_run(session, index)
+    session.insert(1, pick('C4'))
+    assert session.steps[2].params['original_container']['id'] == 'C4'
+    assert_matches_full_run(session, index)
+    session.update(session.text.replace(pick('C4'), pick('C8')))
+    assert session.steps[2].params['original_container']['id'] == 'C8'
+    assert_matches_full_run(session, index)
@@ -0,0 +1,79 @@
+from asset_mapper import match_container
+from container_index import ContainerIndex
+from resolution_cache import RESOLUTION_CACHE, ResolutionCache, description_key
+
+CONTAINERS = [
+    {'id': 'A', 'type': 'beaker', 'content_color': 'blue'},
+    {'id': 'B', 'type': 'flask', 'content_color': 'red'},
+]
+
+# Resolver that records each call, so a hit can be told from a miss
+def counting_resolver(calls, result):
+    def resolve(index):
+        calls.append(index)
+        return result
+    return resolve
+
+def test_equivalent_descriptions_share_a_key():
+    assert description_key({'Content Color': 'Blue', 'type': 'beaker', 'size': 'null', 'landmark': None}) == \
+        description_key({'type': 'beaker', 'content_color': 'blue'})
+    assert description_key({'type': 'beaker'}) != description_key({'type': 'flask'})
+
+def test_hits_misses_and_stats():
+    cache = ResolutionCache(max_entries=4)
+    index = ContainerIndex(CONTAINERS)
+    calls = []
+    resolve = counting_resolver(calls, CONTAINERS[0])
+    assert cache.resolve({'type': 'beaker'}, index, resolve) is CONTAINERS[0]
+    assert cache.resolve({'Type': 'Beaker', 'size': 'null'}, index, resolve) is CONTAINERS[0]
+    assert len(calls) == 1
+    # Unmatched descriptions are cached too
+    missing = counting_resolver(calls, None)
+    assert cache.resolve({'type': 'jar'}, index, missing) is None
+    assert cache.resolve({'type': 'jar'}, index, missing) is None
+    assert len(calls) == 2
+    assert cache.stats() == {'hits': 2, 'misses': 2, 'hit_rate': 0.5, 'evictions': 0, 'entries': 2}
+
+def test_entries_are_per_index():
+    cache = ResolutionCache()
+    calls = []
+    resolve = counting_resolver(calls, None)
+    cache.resolve({'type': 'beaker'}, ContainerIndex(CONTAINERS), resolve)
+    cache.resolve({'type': 'beaker'}, ContainerIndex(CONTAINERS), resolve)
+    assert len(calls) == 2
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResolutionCache(max_entries=2)
+    index = ContainerIndex(CONTAINERS)
+    calls = []
+    resolve = counting_resolver(calls, None)
+    cache.resolve({'type': 'a'}, index, resolve)
+    cache.resolve({'type': 'b'}, index, resolve)
+    # Touching 'a' makes 'b' the oldest entry
+    cache.resolve({'type': 'a'}, index, resolve)
+    cache.resolve({'type': 'c'}, index, resolve)
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['entries'] == 2
+    cache.resolve({'type': 'a'}, index, resolve)
+    assert len(calls) == 3
+    cache.resolve({'type': 'b'}, index, resolve)
+    assert len(calls) == 4
+
+def test_zero_entries_disables_the_cache():
+    cache = ResolutionCache(max_entries=0)
+    index = ContainerIndex(CONTAINERS)
+    calls = []
+    resolve = counting_resolver(calls, None)
+    cache.resolve({'type': 'beaker'}, index, resolve)
+    cache.resolve({'type': 'beaker'}, index, resolve)
+    assert len(calls) == 2
+    assert cache.stats()['entries'] == 0
+
+def test_plain_lists_bypass_the_shared_cache():
+    RESOLUTION_CACHE.clear()
+    before = RESOLUTION_CACHE.stats()
+    assert match_container({'type': 'flask'}, CONTAINERS)['id'] == 'B'
+    assert match_container({'type': 'flask'}, CONTAINERS)['id'] == 'B'
+    after = RESOLUTION_CACHE.stats()
+    assert after['entries'] == 0
+    assert (after['hits'], after['misses']) == (before['hits'], before['misses'])
@@ -0,0 +1,85 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, make_key, normalize_instruction
+
+# Clock the cache reads instead of time.time, advanced by the tests
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache, 'time', clock)
+    return clock
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'llm_cache.sqlite3')
+
+def test_equivalent_instructions_share_a_key():
+    assert normalize_instruction('  Pick the\tBLUE  beaker\n') == 'pick the blue beaker'
+    assert make_key('Pick the blue beaker', 'gpt-4', 2) == make_key('pick  the blue BEAKER ', 'gpt-4', 2)
+    # The model and the prompt version are part of the key
+    assert make_key('pick the blue beaker', 'gpt-4', 2) != make_key('pick the blue beaker', 'local', 2)
+    assert make_key('pick the blue beaker', 'gpt-4', 2) != make_key('pick the blue beaker', 'gpt-4', 3)
+
+def test_entries_expire_after_the_ttl(clock, cache_path):
+    cache = ResponseCache(cache_path, ttl=60)
+    cache.set('a', 'pick()')
+    clock.now += 59
+    assert cache.get('a') == 'pick()'
+    clock.now += 2
+    assert cache.get('a') is None
+    # Expired rows are dropped from disk too, not only from memory
+    assert ResponseCache(cache_path, ttl=3600).get('a') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_disk_tier_serves_a_new_process(clock, cache_path):
+    ResponseCache(cache_path).set('a', 'pick()')
+    cache = ResponseCache(cache_path)
+    assert cache.get('a') == 'pick()'
+    assert cache.get('a') == 'pick()'
+    assert cache.stats()['disk_hits'] == 1 and cache.stats()['memory_hits'] == 1
+
+def test_memory_tier_is_an_lru(clock):
+    cache = ResponseCache(None, memory_entries=2)
+    cache.set('a', '1')
+    cache.set('b', '2')
+    cache.get('a')
+    cache.set('c', '3')
+    assert list(cache.memory) == ['a', 'c']
+    assert cache.get('b') is None
+
+def test_memory_hits_keep_entries_on_disk(clock, cache_path):
+    cache = ResponseCache(cache_path, memory_entries=10, disk_entries=2)
+    cache.set('hot', 'pick()')
+    clock.now += 1
+    cache.set('cold', 'place()')
+    clock.now += 1
+    # Served from memory only; the disk LRU still has to see it as the most recent use
+    assert cache.get('hot') == 'pick()'
+    clock.now += 1
+    cache.set('new', 'pour()')
+    reopened = ResponseCache(cache_path)
+    assert reopened.get('hot') == 'pick()'
+    assert reopened.get('cold') is None
+
+def test_memory_hits_are_written_in_batches(clock, cache_path, monkeypatch):
+    monkeypatch.setattr(response_cache, 'TOUCH_BATCH', 3)
+    cache = ResponseCache(cache_path)
+    for key in ('a', 'b', 'c'):
+        cache.set(key, key)
+    clock.now += 10
+    cache.get('a')
+    cache.get('b')
+    accessed = dict(cache._db.execute('SELECT key, accessed FROM responses'))
+    assert accessed['a'] == accessed['b'] == 1000.0
+    cache.get('c')
+    accessed = dict(cache._db.execute('SELECT key, accessed FROM responses'))
+    assert accessed == {'a': 1010.0, 'b': 1010.0, 'c': 1010.0}
+    assert cache.touched == {}
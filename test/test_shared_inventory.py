@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import asset_store
+from asset_store import AssetStore, shared_name
+from container_index import ContainerIndex
+from models import compact_containers
+from shared_inventory import SharedInventory, SharedInventoryWriter
+from synthetic_inventory import make_containers, make_queries
+
+ASSETS = '''containers:
+  - id: A
+    type: beaker
+    content_name: water
+    position: [0.5, 0.2, 0.0]
+'''
+INVENTORY_SIZE = 20000
+QUERY_COUNT = 20
+
+@pytest.fixture
+def shared_assets(tmp_path, monkeypatch):
+    monkeypatch.setattr(asset_store, 'SHARED_INVENTORY', f'ras_test_{os.getpid()}')
+    path = tmp_path / 'container_assets.yaml'
+    path.write_text(ASSETS)
+    stores = []
+    yield str(path), stores
+    for store in reversed(stores):
+        store.close(remove=store._writer is not None)
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_writer_publishes_reloads_without_serving_requests(shared_assets):
+    path, stores = shared_assets
+    writer = AssetStore(path, check_interval=0.02)
+    stores.append(writer)
+    assert writer.shared() is None
+    reader = AssetStore(path, check_interval=0.02)
+    stores.append(reader)
+    assert reader.shared() is not None
+    assert reader.containers()[0]['content_name'] == 'water'
+    with open(path, 'w') as file:
+        file.write(ASSETS.replace('water', 'ethanol'))
+    # Only the reader is asked for containers; the writer's watcher publishes the reload
+    wait_for(lambda: reader.containers()[0]['content_name'] == 'ethanol')
+    assert reader.index().get('A')['content_name'] == 'ethanol'
+
+def test_reader_loads_privately_until_the_writer_publishes(shared_assets):
+    path, stores = shared_assets
+    loading = SharedInventoryWriter(shared_name(path))
+    try:
+        reader = AssetStore(path, check_interval=0.02)
+        stores.append(reader)
+        # Nothing published yet: no wait, no error, the file is loaded privately
+        assert reader.shared() is None
+        assert reader.containers()[0]['id'] == 'A'
+        loading.publish([{'id': 'A', 'content_name': 'published'}])
+        wait_for(lambda: reader.shared() is not None)
+        assert reader.containers()[0]['content_name'] == 'published'
+        assert reader._containers is None
+    finally:
+        loading.close(remove=True)
+
+def test_reader_takes_over_from_a_stopped_writer(shared_assets):
+    path, stores = shared_assets
+    writer = AssetStore(path, check_interval=0.02)
+    writer.shared()
+    reader = AssetStore(path, check_interval=0.02)
+    stores.append(reader)
+    assert reader.shared() is not None
+    writer.close()
+    wait_for(lambda: reader.shared() is None)
+    assert reader._writer is not None
+    with open(path, 'w') as file:
+        file.write(ASSETS.replace('water', 'ethanol'))
+    other = AssetStore(path, check_interval=0.02)
+    stores.insert(0, other)
+    wait_for(lambda: other.shared() is not None and other.containers()[0]['content_name'] == 'ethanol')
+
+# Function to read this process's unique set size (pages no other process maps) in megabytes
+def private_mb():
+    total = 0
+    with open('/proc/self/smaps_rollup') as file:
+        for line in file:
+            if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                total += int(line.split()[1])
+    return total / 1024
+
+# Worker: load the inventory privately or attach to the shared one, answer queries, then report the memory it added
+def worker(mode, source, barrier, results):
+    before = private_mb()
+    if mode == 'private':
+        index = ContainerIndex(compact_containers(make_containers(source)))
+    else:
+        index = SharedInventory(source).index()
+    for query in make_queries(QUERY_COUNT):
+        index.match(query)
+    for number in range(0, INVENTORY_SIZE, 100):
+        index.get(f'C{number}')['position']
+    barrier.wait()
+    results.put(private_mb() - before)
+    barrier.wait()
+
+def run_workers(mode, source, count):
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(count)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, source, barrier, results)) for _ in range(count)]
+    for process in processes:
+        process.start()
+    added = [results.get(timeout=60) for _ in range(count)]
+    for process in processes:
+        process.join()
+    return added
+
+def test_memory_per_reader_stays_flat():
+    name = f'ras_test_memory_{os.getpid()}'
+    writer = SharedInventoryWriter(name, make_containers(INVENTORY_SIZE))
+    try:
+        private = run_workers('private', INVENTORY_SIZE, 1)[0]
+        shared = run_workers('shared', name, 4)
+    finally:
+        writer.close(remove=True)
+    # Each reader maps the writer's pages instead of copying them, so adding readers adds almost nothing
+    assert max(shared) < private / 4
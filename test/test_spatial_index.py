@@ -0,0 +1,86 @@
+import math
+import random
+
+import pytest
+
+import spatial_index
+from asset_mapper import nearest_to_landmark
+from container_index import ContainerIndex
+from future_positions import parse_module_sequence, simulate_modules
+from spatial_index import SpatialGrid, as_point
+from synthetic_inventory import make_containers
+
+CONTAINERS = make_containers(2000)
+POINTS = {container['id']: as_point(container['position']) for container in CONTAINERS}
+
+@pytest.fixture(scope='module')
+def grid():
+    return SpatialGrid.from_containers(CONTAINERS)
+
+def query_points(count, seed=4):
+    rng = random.Random(seed)
+    # Include points outside the occupied area, where the search has to walk many empty rings
+    return [(rng.uniform(-0.5, 2.5), rng.uniform(-0.5, 1.5), 0.0) for _ in range(count)]
+
+def scan(point):
+    return sorted((math.dist(point, position), container_id) for container_id, position in POINTS.items())
+
+def assert_same_neighbours(point, found, expected):
+    # Equal distances may be returned in either order, so compare distances and check each id's own distance
+    assert [distance for distance, _ in found] == pytest.approx([distance for distance, _ in expected])
+    for distance, container_id in found:
+        assert math.dist(POINTS[container_id], point) == pytest.approx(distance)
+
+@pytest.mark.parametrize('k', [1, 5, 40])
+def test_nearest_matches_a_linear_scan(grid, k):
+    for point in query_points(50):
+        assert_same_neighbours(point, grid.nearest(point, k), scan(point)[:k])
+
+def test_nearest_respects_predicate_and_max_distance(grid):
+    beakers = {container['id'] for container in CONTAINERS if container['type'] == 'beaker'}
+    for point in query_points(30):
+        expected = [(distance, container_id) for distance, container_id in scan(point) if container_id in beakers]
+        assert_same_neighbours(point, grid.nearest(point, 3, beakers.__contains__), expected[:3])
+        limited = [item for item in scan(point) if item[0] <= 0.05][:3]
+        assert_same_neighbours(point, grid.nearest(point, 3, max_distance=0.05), limited)
+
+@pytest.mark.parametrize('radius', [0.0, 0.03, 0.2])
+def test_within_matches_a_linear_scan(grid, radius):
+    for point in query_points(30):
+        expected = [item for item in scan(point) if item[0] <= radius]
+        assert grid.within(point, radius) == expected
+
+def test_collisions_exclude_the_moving_container_and_follow_moves():
+    grid = SpatialGrid.from_containers(CONTAINERS)
+    target = POINTS['C0']
+    assert 'C0' in grid.collisions(target, clearance=0.01)
+    assert 'C0' not in grid.collisions(target, clearance=0.01, exclude='C0')
+    assert grid.collisions(target, clearance=0) == []
+    grid.move('C1', target)
+    assert 'C1' in grid.collisions(target, clearance=0.001, exclude='C0')
+    grid.move('C1', 'shelf')
+    assert 'C1' not in grid
+    assert 'C1' not in grid.collisions(target, clearance=0.001)
+
+def test_nearest_to_landmark_has_a_distance_limit(monkeypatch):
+    index = ContainerIndex([
+        {'id': 'A', 'type': 'beaker', 'position': (0.2, 0.2, 0.0)},
+        {'id': 'B', 'type': 'beaker', 'position': (1.8, 0.2, 0.0)},
+    ])
+    monkeypatch.setattr(spatial_index, '_landmarks', {'sink': (0.0, 0.0, 0.0)})
+    assert nearest_to_landmark({'type': 'beaker', 'landmark': 'sink'}, index)['id'] == 'A'
+    monkeypatch.setattr(spatial_index, 'LANDMARK_MAX_DISTANCE', 0.1)
+    # The closest beaker is too far away to be "near the sink"
+    assert nearest_to_landmark({'type': 'beaker', 'landmark': 'sink'}, index) is None
+
+def test_placement_collisions_are_only_checked_when_collected(capsys):
+    containers = [
+        {'id': 'A', 'type': 'beaker', 'position': (0.5, 0.2, 0.0)},
+        {'id': 'B', 'type': 'flask', 'position': (0.9, 0.0, 0.0)},
+    ]
+    modules = parse_module_sequence('place(container={ id: "B" }, destination_location=(0.5, 0.21, 0))')
+    simulate_modules(modules, containers)
+    assert capsys.readouterr().out == ''
+    collisions = []
+    simulate_modules(modules, containers, collisions)
+    assert collisions == [('place', 'B', (0.5, 0.21, 0), ['A'])]
@@ -1,35 +1,32 @@
 # user_input_page.py
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from werkzeug.utils import secure_filename
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import json
 import os
-import PyPDF2  # For processing PDF files
+import time
 
 # Import functions from api_calls.py
 import api_calls
+import llm_backends
+import metrics
+from pdf_extraction import allowed_file, extract_text_from_pdf, iter_pdf_chunks
+import response_cache
+import streaming_pipeline
 
 app = Flask(__name__)
 
 # Configurations
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'pdf'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def extract_text_from_pdf(file_path):
-    # Extract text from the uploaded PDF
-    try:
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            content = ""
-            for page in reader.pages:
-                content += page.extract_text()
-            return content
-    except Exception as e:
-        return f"Error reading PDF: {str(e)}"
+# Batch submissions share one bounded pool of LLM calls
+BATCH_MAX_ITEMS = int(os.environ.get('RAS_BATCH_MAX_ITEMS', 100))
+BATCH_WORKERS = int(os.environ.get('RAS_BATCH_WORKERS', 8))
+BATCH_TIMEOUT = float(os.environ.get('RAS_BATCH_TIMEOUT', 60))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='submit_batch')
 
 @app.route('/')
 def index():
@@ -46,6 +43,16 @@ def upload_file():
         filename = secure_filename(file.filename)
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(file_path)
+        if request.args.get('stream'):
+            # Send page text as newline-delimited JSON while later pages are still being extracted
+            def generate():
+                try:
+                    for start_page, stop_page, text in iter_pdf_chunks(file_path):
+                        yield json.dumps({'start_page': start_page, 'stop_page': stop_page, 'content': text}) + '\n'
+                    yield json.dumps({'message': 'File uploaded successfully'}) + '\n'
+                except Exception as e:
+                    yield json.dumps({'error': f"Error reading PDF: {str(e)}"}) + '\n'
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
         # Extract text from PDF
         content = extract_text_from_pdf(file_path)
         # You might want to process the content further or pass it to the frontend
@@ -58,9 +65,9 @@ def submit_task():
     data = request.get_json()
     rich_text = data.get('rich_text')
     # Get the OpenAI API key from environment variable
-    openai_api_key = os.environ.get('OPENAI_API_KEY')
-    if not openai_api_key:
-        return jsonify({'error': 'OpenAI API key not found in environment variables'}), 500
+    backend, openai_api_key, error = llm_backends.select_backend(data)
+    if error:
+        return error
 
     if not rich_text:
         return jsonify({'error': 'Rich-text instructions are required.'}), 400
@@ -69,13 +76,88 @@ def submit_task():
         # Generate module sequence using the simplified function
         module_sequence = api_calls.generate_module_sequence(
             input_instruction=rich_text,
-            api_key=openai_api_key
+            api_key=openai_api_key,
+            backend=backend
         )
         # Return the module sequence
         return jsonify({'module_sequence': module_sequence})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/submit_batch', methods=['POST'])
+def submit_batch():
+    data = request.get_json()
+    instructions = data.get('instructions')
+    backend, openai_api_key, error = llm_backends.select_backend(data)
+    if error:
+        return error
+
+    if not isinstance(instructions, list) or not instructions:
+        return jsonify({'error': 'A non-empty list of instructions is required.'}), 400
+    if len(instructions) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'At most {BATCH_MAX_ITEMS} instructions per batch.'}), 400
+
+    # Identical instructions are generated once and share the result
+    # Running generations cannot be cancelled, so each one is given the deadline and stops sending requests once it passes
+    deadline = time.monotonic() + BATCH_TIMEOUT
+    futures = {}
+    for instruction in instructions:
+        if not isinstance(instruction, str) or not instruction.strip():
+            continue
+        key = response_cache.normalize_instruction(instruction)
+        if key not in futures:
+            futures[key] = batch_executor.submit(
+                api_calls.generate_module_sequence,
+                input_instruction=instruction,
+                api_key=openai_api_key,
+                request_timeout=BATCH_TIMEOUT,
+                backend=backend,
+                deadline=deadline
+            )
+
+    # Collect results in input order, with an error entry for each failed item
+    results = []
+    for instruction in instructions:
+        if not isinstance(instruction, str) or not instruction.strip():
+            results.append({'error': 'Rich-text instructions are required.'})
+            continue
+        future = futures[response_cache.normalize_instruction(instruction)]
+        try:
+            module_sequence = future.result(timeout=max(deadline - time.monotonic(), 0))
+            results.append({'module_sequence': module_sequence})
+        except TimeoutError:
+            future.cancel()
+            results.append({'error': f'Timed out after {BATCH_TIMEOUT:g} seconds'})
+        except Exception as e:
+            results.append({'error': str(e)})
+    return jsonify({'results': results})
+
+@app.route('/submit_stream', methods=['POST'])
+def submit_task_stream():
+    data = request.get_json()
+    rich_text = data.get('rich_text')
+    backend, openai_api_key, error = llm_backends.select_backend(data)
+    if error:
+        return error
+
+    if not rich_text:
+        return jsonify({'error': 'Rich-text instructions are required.'}), 400
+
+    # Send each resolved step as one JSON line as soon as the model finishes writing it
+    def generate():
+        try:
+            for step in streaming_pipeline.stream_module_steps(rich_text, openai_api_key, backend=backend):
+                yield json.dumps(step) + '\n'
+        except Exception as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Prometheus scrape endpoint with per-stage timings and pipeline counters
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(debug=True)
 